@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Measures aggregate_run on a synthetic run: a large dataset and many logged
+outputs (simulated replies with injected errors), evaluated with 1..N
+worker processes. Reports logs/sec and speedup over the serial path, and
+checks that every worker count produces the same metrics.
+"""
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.prompts.base import SYSTEM_PROMPT
+from src.prompts.templates import stream_prompt
+from src.runner.orchestrator import TASKS, FORMATS
+from src.runner.simulated import SimulatedBackend
+from src.runner.executor import estimate_tokens
+from src.runner.logger import RunLogger
+from src.aggregation.aggregate import aggregate_run
+
+def build_synthetic_run(base_dir: str, size: int, logs: int, variants: int) -> str:
+    """
+    Writes a run with `logs` entries. Each task/format gets `variants`
+    distinct simulated replies (different seeds), reused round-robin.
+    """
+    records = DatasetGenerator(count=size, seed=42).generate()
+    replies = []
+    for seed in range(variants):
+        backend = SimulatedBackend(seed=seed, drop_rate=0.01, hallucination_rate=0.01, drift_rate=0.02)
+        for task in TASKS:
+            for fmt in FORMATS:
+                prompt = str(stream_prompt(task, fmt, records))
+                text = backend.complete("synthetic-model", SYSTEM_PROMPT, prompt)
+                replies.append((task.TASK_NAME, fmt, estimate_tokens(prompt), text))
+
+    run_id = "run_aggbench"
+    logger = RunLogger(run_id=run_id, base_dir=base_dir)
+    logger.write_dataset(records)
+    for i in range(logs):
+        task_name, fmt, input_tokens, text = replies[i % len(replies)]
+        output_tokens = estimate_tokens(text)
+        logger.log_task_execution(task_name, fmt, "synthetic-model", {
+            "raw_output": text,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens},
+            "timing": {"latency_ms": 0.0}
+        })
+    logger.close()
+    return os.path.join(base_dir, run_id)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel log aggregation")
+    parser.add_argument("--size", type=int, default=2000, help="Dataset size")
+    parser.add_argument("--logs", type=int, default=600, help="Logged executions in the synthetic run")
+    parser.add_argument("--variants", type=int, default=4, help="Distinct replies per task/format")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Worker counts to measure (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Logs per worker batch")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, cpus} | {2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus})
+
+    base_dir = tempfile.mkdtemp(prefix="aggbench_")
+    try:
+        print(f"Building synthetic run: {args.logs} logs over a {args.size}-record dataset...")
+        run_dir = build_synthetic_run(base_dir, args.size, args.logs, args.variants)
+        print(f"CPUs available: {cpus}")
+
+        baseline_s = None
+        baseline_metrics = None
+        print(f"{'workers':>8} {'seconds':>10} {'logs/s':>10} {'speedup':>8}")
+        for workers in worker_counts:
+            start = time.perf_counter()
+            metrics = aggregate_run(run_dir, workers=workers, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - start
+
+            # Parallel evaluation must not change the results or their order
+            if baseline_metrics is None:
+                baseline_s, baseline_metrics = elapsed, metrics
+            elif metrics != baseline_metrics:
+                print(f"ERROR: workers={workers} produced different metrics than workers={worker_counts[0]}")
+                sys.exit(1)
+
+            print(f"{workers:>8} {elapsed:>10.2f} {len(metrics) / elapsed:>10.1f} {baseline_s / elapsed:>7.2f}x")
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measures the HTTP client against the local stub server: pooled keep-alive
+connections vs a fresh connection per request, for the threaded and the
+asyncio backend. Reports requests/sec and TCP connections opened.
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.prompts import base, task_a
+from src.runner.http_backend import HTTPBackend, AsyncHTTPBackend
+from src.runner.simulated import LatencyModel
+from src.runner.stub_server import StubChatServer
+
+def run_sync(base_url: str, prompt: str, requests: int, concurrency: int, keep_alive: bool) -> float:
+    backend = HTTPBackend(base_url, api_key="", pool_size=concurrency)
+
+    def call(_):
+        "".join(backend.stream("stub-model", base.SYSTEM_PROMPT, prompt))
+        if not keep_alive:
+            # Forget pooled connections so the next call has to reconnect
+            backend.pool.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+    backend.close()
+    return elapsed
+
+async def run_async(base_url: str, prompt: str, requests: int, concurrency: int, keep_alive: bool) -> float:
+    backend = AsyncHTTPBackend(base_url, api_key="", pool_size=concurrency)
+    queue = list(range(requests))
+
+    async def worker():
+        while queue:
+            queue.pop()
+            async for _ in backend.stream("stub-model", base.SYSTEM_PROMPT, prompt):
+                pass
+            if not keep_alive:
+                await backend.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await backend.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-request HTTP connections")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--size", type=int, default=20, help="Dataset size embedded in each prompt")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Extra server latency per request")
+    args = parser.parse_args()
+
+    records = DatasetGenerator(count=args.size, seed=42).generate()
+    prompt = task_a.get_prompt("JSON", json.dumps(records, indent=2))
+
+    print(f"{'client':<8} {'connections':<12} {'req/s':>10} {'opened':>8} {'served':>8}")
+    for client in ("sync", "async"):
+        for keep_alive in (True, False):
+            with StubChatServer(latency=LatencyModel(args.latency_ms)) as server:
+                if client == "sync":
+                    elapsed = run_sync(server.url, prompt, args.requests, args.concurrency, keep_alive)
+                else:
+                    elapsed = asyncio.run(run_async(server.url, prompt, args.requests, args.concurrency, keep_alive))
+                stats = server.stats()
+
+            mode = "pooled" if keep_alive else "per-call"
+            print(f"{client:<8} {mode:<12} {args.requests / elapsed:>10.1f} "
+                  f"{stats['connections']:>8} {stats['requests']:>8}")
+
+if __name__ == "__main__":
+    main()
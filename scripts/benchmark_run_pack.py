@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measures reading a run's logs as loose per-file JSON (the legacy layout)
+against the same run packed into one compressed archive. Reports disk
+usage and records/sec of iter_run_logs (the aggregator's reader) for each,
+and checks that both yield the same records.
+"""
+import sys
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.runner.logger import build_log_entry, write_entry_file
+from src.runner.archive import CODECS, DEFAULT_CODEC, pack_run, pack_path, loose_log_paths
+from src.aggregation.aggregate import iter_run_logs
+
+TASKS = ["Task A - Filtering", "Task B - Aggregation", "Task C - Transformation"]
+FORMATS = ["JSON", "TOON"]
+
+def build_loose_run(run_dir: str, calls: int, seed: int = 42):
+    """Writes `calls` pretty-printed per-file logs with small synthetic outputs."""
+    rng = random.Random(seed)
+    for i in range(calls):
+        fmt = FORMATS[i % len(FORMATS)]
+        ids = sorted(rng.sample(range(1, 200), 8))
+        raw_output = (
+            "{\"ids\": [" + ", ".join(map(str, ids)) + "]}" if fmt == "JSON"
+            else f"ids[{len(ids)}]: " + ",".join(map(str, ids))
+        )
+        output_tokens = rng.randint(20, 60)
+        entry = build_log_entry("run_packbench", TASKS[(i // 2) % len(TASKS)], fmt, "synthetic-model", {
+            "raw_output": raw_output,
+            "usage": {"input_tokens": 2000, "output_tokens": output_tokens, "total_tokens": 2000 + output_tokens},
+            "timing": {"latency_ms": rng.lognormvariate(7, 0.5), "ttft_ms": rng.lognormvariate(5, 0.5)}
+        })
+        write_entry_file(run_dir, entry, sequence=i)
+
+def disk_bytes(paths):
+    """Allocated size (file system blocks), which is what many small files cost."""
+    return sum(os.stat(p).st_blocks * 512 for p in paths)
+
+def read_all(run_dir: str):
+    start = time.perf_counter()
+    ids = [raw_log["entry_id"] for _, raw_log in iter_run_logs(run_dir)]
+    return ids, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loose per-file run logs vs a packed archive")
+    parser.add_argument("--calls", type=int, default=100000, help="Logged calls in the synthetic run")
+    parser.add_argument("--codec", choices=sorted(CODECS), default=DEFAULT_CODEC)
+    args = parser.parse_args()
+
+    base_dir = tempfile.mkdtemp(prefix="packbench_")
+    try:
+        run_dir = os.path.join(base_dir, "run_packbench")
+        print(f"Writing {args.calls} per-file logs...")
+        build_loose_run(run_dir, args.calls)
+        loose_bytes = disk_bytes(loose_log_paths(run_dir))
+        loose_ids, loose_s = read_all(run_dir)
+
+        start = time.perf_counter()
+        index = pack_run(run_dir, codec=args.codec)
+        pack_s = time.perf_counter() - start
+        packed_bytes = disk_bytes([pack_path(run_dir)])
+        packed_ids, packed_s = read_all(run_dir)
+
+        if packed_ids != loose_ids:
+            print("ERROR: the packed run yields different records than the loose files")
+            sys.exit(1)
+
+        print(f"Packed {index['records']} records into {len(index['blocks'])} {args.codec} blocks in {pack_s:.2f}s")
+        print(f"{'layout':<10} {'disk MB':>8} {'read s':>8} {'records/s':>10}")
+        print(f"{'loose':<10} {loose_bytes / 1e6:>8.1f} {loose_s:>8.2f} {len(loose_ids) / loose_s:>10.0f}")
+        print(f"{'packed':<10} {packed_bytes / 1e6:>8.1f} {packed_s:>8.2f} {len(packed_ids) / packed_s:>10.0f}")
+        print(f"Packed read speedup: {loose_s / packed_s:.1f}x, disk: {loose_bytes / packed_bytes:.0f}x smaller")
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measures summarizing many call records: accumulators that keep every
+latency value (exact percentiles) against bounded-memory ones (quantile
+sketches), and the same records accumulated on shards then merged.
+Checks the sketch percentiles against the exact ones, and that merged
+shards give the single-pass summary.
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tracemalloc
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.aggregation.accumulators import accumulate, merge_groups
+from src.aggregation.export import summary_row
+
+TASKS = ["Task A - Filtering", "Task B - Aggregation", "Task C - Transformation"]
+FORMATS = ["JSON", "TOON"]
+
+def synthetic_metrics(count: int, seed: int = 42):
+    """Call records with the fields the accumulators read (lognormal tokens and latency)."""
+    rng = random.Random(seed)
+    for i in range(count):
+        output_tokens = int(rng.lognormvariate(6, 0.5))
+        latency_ms = rng.lognormvariate(7, 0.6)
+        yield {
+            "task": TASKS[i % len(TASKS)],
+            "format": FORMATS[(i // len(TASKS)) % len(FORMATS)],
+            "input_tokens": 2000,
+            "output_tokens": output_tokens,
+            "total_tokens": 2000 + output_tokens,
+            "estimated_cost": 0.0003 + output_tokens * 6e-7,
+            "input_cost": 0.0003,
+            "output_cost": output_tokens * 6e-7,
+            "is_correct": rng.random() < 0.9,
+            "ttft_ms": latency_ms * 0.2,
+            "latency_ms": latency_ms,
+            "output_tokens_per_sec": output_tokens / latency_ms * 1000,
+            "failure_category": "success"
+        }
+
+def measure(fn):
+    """(result, seconds, peak MB); memory is traced in a second run, as tracing slows allocation down."""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exact vs sketch-based summary accumulators")
+    parser.add_argument("--count", type=int, default=1000000, help="Call records to summarize")
+    parser.add_argument("--shards", type=int, default=8, help="Shards for the merge check")
+    args = parser.parse_args()
+
+    exact, exact_s, exact_mb = measure(lambda: accumulate(synthetic_metrics(args.count), keep_values=True))
+    sketched, sketch_s, sketch_mb = measure(lambda: accumulate(synthetic_metrics(args.count)))
+    print(f"{'accumulator':<14} {'seconds':>8} {'peak MB':>8}")
+    print(f"{'exact values':<14} {exact_s:>8.2f} {exact_mb:>8.1f}")
+    print(f"{'sketches':<14} {sketch_s:>8.2f} {sketch_mb:>8.1f}")
+
+    worst = 0.0
+    for key, acc in exact.items():
+        for pct in (50, 95, 99):
+            true = acc.percentile("latency_ms", pct)
+            worst = max(worst, abs(sketched[key].percentile("latency_ms", pct) - true) / true)
+    print(f"Largest relative error of sketch latency percentiles: {worst:.4f}")
+    if worst > sketched[key].sketches["latency_ms"].alpha:
+        print("ERROR: sketch error above its relative accuracy")
+        sys.exit(1)
+
+    # Shard i takes every shards-th record starting at i
+    records = list(synthetic_metrics(args.count // 10))
+    single = accumulate(records)
+    merged = merge_groups(*[accumulate(records[i::args.shards]) for i in range(args.shards)])
+    for key, acc in single.items():
+        a, b = summary_row(*key, acc), summary_row(*key, merged[key])
+        if any(abs(a[c] - b[c]) > 1e-6 * max(1.0, abs(a[c])) for c in a if isinstance(a[c], float)):
+            print(f"ERROR: merged shards differ from a single pass for {key}")
+            sys.exit(1)
+    print(f"{args.shards} merged shards match a single pass over {len(records)} records")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measures decode_from_toon on a large event table: a full decode against
+decodes that push a projection (`columns`) and/or Task A's filter
+(`where`) into the decoder. Checks each result against the full decode
+projected / filtered in Python.
+"""
+import sys
+import os
+import time
+import argparse
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.encoding.toon_codec import encode_to_toon, decode_from_toon, PREDICATE_OPS, normalize_where
+from src.evaluation.correctness import TASK_A_FILTER, TASK_C_KEYS, TASK_C_NESTED
+
+# Task C's columns as named in the event schema
+TASK_C_COLUMNS = [f"metadata.{k}" if k in TASK_C_NESTED else k for k in TASK_C_KEYS]
+
+CASES = [
+    ("full decode", None, None),
+    ("Task C columns", TASK_C_COLUMNS, None),
+    ("Task A filter", None, TASK_A_FILTER),
+    ("Task A ids", ["id"], TASK_A_FILTER)
+]
+
+def reference(records, columns, where):
+    """The same result computed from fully decoded records."""
+    def cell(r, col):
+        if "." in col:
+            parent, child = col.split(".", 1)
+            return r[parent][child]
+        return r[col]
+
+    def project(r):
+        if columns is None:
+            return r
+        out = {}
+        for col in columns:
+            if "." in col:
+                parent, child = col.split(".", 1)
+                out.setdefault(parent, {})[child] = r[parent][child]
+            else:
+                out[col] = r[col]
+        # Nested objects follow the flat columns, as decode_from_toon builds them
+        return {**{k: v for k, v in out.items() if not isinstance(v, dict)},
+                **{k: v for k, v in out.items() if isinstance(v, dict)}}
+
+    predicates = normalize_where(where)
+    return [
+        project(r) for r in records
+        if all(PREDICATE_OPS[op](cell(r, col), value) for col, op, value in predicates)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TOON decoding with projection and predicate pushdown")
+    parser.add_argument("--size", type=int, default=20000, help="Records in the table")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best is reported)")
+    args = parser.parse_args()
+
+    text = encode_to_toon(DatasetGenerator(count=args.size, seed=42).generate())
+    full = decode_from_toon(text)
+    print(f"Decoding a {len(text) / 1e6:.1f} MB TOON table of {args.size} records")
+
+    baseline_s = None
+    print(f"{'case':<16} {'rows':>8} {'seconds':>9} {'speedup':>8}")
+    for label, columns, where in CASES:
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            rows = decode_from_toon(text, columns=columns, where=where)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        if rows != reference(full, columns, where):
+            print(f"ERROR: {label} differs from the full decode")
+            sys.exit(1)
+        baseline_s = baseline_s or best
+        print(f"{label:<16} {len(rows):>8} {best:>9.3f} {baseline_s / best:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
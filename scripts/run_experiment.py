@@ -13,13 +13,31 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.dataset.generator import DatasetGenerator
 from src.runner.orchestrator import run_orchestrator, TASKS, FORMATS
 from src.aggregation.aggregate import aggregate_run
-from src.aggregation.export import export_all
+from src.runner.logger import DATASET_FILENAME, load_run_manifest
+from src.evaluation.memo import EvaluationMemo
+from src.runner.backends import add_backend_arguments, backend_options_from_args
+from src.runner.resilience import add_resilience_arguments, resilience_options_from_args
+from src.runner.adaptive import add_adaptive_arguments, adaptive_options_from_args
+from src.aggregation import warehouse
 
 def main():
     parser = argparse.ArgumentParser(description="Run full experiment pipeline")
     parser.add_argument("--size", type=int, required=True, help="Dataset size")
     parser.add_argument("--iterations", type=int, required=True, help="Number of iterations")
     parser.add_argument("--model", type=str, default="mock-model", help="Model to evaluate")
+    add_backend_arguments(parser)
+    add_resilience_arguments(parser)
+    parser.add_argument("--samples-per-request", type=int, default=1,
+                        help="Ask for n completions per request; iterations are grouped into requests of n")
+    parser.add_argument("--stream-prompts", action="store_true",
+                        help="Encode each prompt while it is sent instead of keeping full encodings in memory")
+    parser.add_argument("--aggregate-workers", type=int, default=1,
+                        help="Processes used to evaluate logs during aggregation")
+    parser.add_argument("--eval-memo", type=str, default=None,
+                        help="JSONL file caching evaluation verdicts across aggregations")
+    add_adaptive_arguments(parser)
+    parser.add_argument("--warehouse", type=str, default=warehouse.DEFAULT_WAREHOUSE_PATH,
+                        help="SQLite results warehouse the run is added to (CSVs are exported from it)")
     
     args = parser.parse_args()
     
@@ -29,56 +47,64 @@ def main():
     os.makedirs(runs_root, exist_ok=True)
     os.makedirs(results_dir, exist_ok=True)
     
-    # 1. Identify pre-existing runs to detect the new one
-    existing_runs = set(os.listdir(runs_root))
-    
-    # 2. Run Orchestrator
+    # 1. Run Orchestrator
     # Note: Orchestrator currently hardcodes seed=42
     print(f"Running experiment with size={args.size}, iterations={args.iterations}...")
     start_time = datetime.datetime.now().isoformat()
     
-    run_orchestrator(
+    run_id = run_orchestrator(
         model_name=args.model,
         iterations=args.iterations,
-        dataset_size=args.size
+        dataset_size=args.size,
+        backend=args.backend,
+        backend_options=backend_options_from_args(args),
+        resilience_options=resilience_options_from_args(args),
+        samples_per_request=args.samples_per_request,
+        stream_prompts=args.stream_prompts,
+        adaptive=adaptive_options_from_args(args)
     )
-    
-    # 3. Detect new run
-    current_runs = set(os.listdir(runs_root))
-    new_runs = current_runs - existing_runs
-    
-    if not new_runs:
-        print("Error: No new run directory detected.")
-        sys.exit(1)
-        
-    # Assuming the most recent one if multiple (unlikely)
-    # But strictly we expect exactly one new run
-    run_id = list(new_runs)[0]
     run_path = os.path.join(runs_root, run_id)
-    print(f"Detected new run: {run_id}")
     
-    # 4. Re-generate dataset (Seed 42 is hardcoded in orchestrator, so we match it here)
-    # We need the exact records for correctness checking
-    print("Regenerating dataset for verification (Seed 42)...")
-    generator = DatasetGenerator(seed=42, count=args.size)
-    records = generator.generate()
+    # 2. The aggregator checks against the exact dataset the run used (stored
+    # by the orchestrator, with its cached ground truth); regenerate only if missing
+    records = None
+    if not os.path.exists(os.path.join(run_path, DATASET_FILENAME)):
+        # Seed 42 is hardcoded in orchestrator, so we match it here
+        print("Regenerating dataset for verification (Seed 42)...")
+        generator = DatasetGenerator(seed=42, count=args.size)
+        records = generator.generate()
     
-    # 5. Aggregation
+    # 3. Aggregation
     print("Aggregating results...")
-    metrics = aggregate_run(run_path, dataset_records=records)
+    memo = EvaluationMemo(args.eval_memo)
+    metrics = aggregate_run(run_path, dataset_records=records, workers=args.aggregate_workers, memo=memo)
+    memo.close()
     
-    # 6. Export Artifacts
+    # 4. Store the run with earlier ones, and export its CSVs from the warehouse
     print("Exporting artifacts...")
-    export_all(metrics, results_dir)
+    run_manifest = load_run_manifest(run_path) or {}
+    conn = warehouse.connect(args.warehouse)
+    warehouse.ingest_run(conn, run_id, metrics, run_manifest)
+    warehouse.export_views(conn, results_dir, run_ids=[run_id])
+    conn.close()
     
-    # 7. Write Manifest
+    # 5. Write Manifest
     manifest = {
         "run_id": run_id,
         "timestamp": start_time,
         "dataset_size": args.size,
         "seed": 42,  # Hardcoded in orchestrator
         "number_of_iterations": args.iterations,
+        "samples_per_request": args.samples_per_request,
+        "stream_prompts": args.stream_prompts,
         "model": args.model,
+        "backend": args.backend,
+        "backend_options": backend_options_from_args(args),
+        "resilience_options": resilience_options_from_args(args),
+        "adaptive": adaptive_options_from_args(args),
+        # Per task: why sampling stopped, after how many iterations, final intervals
+        "adaptive_stopping": run_manifest.get("adaptive_stopping"),
+        "evaluation_memo": memo.summary(),
         "formats_evaluated": FORMATS,
         "tasks_evaluated": [t.TASK_NAME for t in TASKS]
     }
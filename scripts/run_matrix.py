@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import sys
+import os
+import json
+import argparse
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.runner.matrix import SPEC_DEFAULTS, load_sweep_spec, normalize_spec, run_matrix
+from src.runner.backends import add_backend_arguments, backend_options_from_args
+from src.runner.resilience import add_resilience_arguments, resilience_options_from_args
+from src.evaluation.memo import EvaluationMemo
+from src.aggregation import warehouse
+
+def parse_concurrency(values):
+    """Parses repeated MODEL=N options into {model: N}."""
+    caps = {}
+    for value in values or []:
+        model, sep, n = value.rpartition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected MODEL=N, got '{value}'")
+        caps[model] = int(n)
+    return caps
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a sweep over models x dataset sizes x formats x tasks")
+    parser.add_argument("--spec", type=str, default=None,
+                        help="JSON sweep spec (see src/runner/matrix.py); other sweep flags are ignored")
+    parser.add_argument("--models", type=str, default=",".join(SPEC_DEFAULTS["models"]), help="Comma-separated models")
+    parser.add_argument("--sizes", type=str, default="10", help="Comma-separated dataset sizes")
+    parser.add_argument("--iterations", type=int, default=1, help="Iterations per model/size/task/format")
+    parser.add_argument("--workers", type=int, default=4, help="Worker pool size")
+    parser.add_argument("--model-concurrency", action="append", metavar="MODEL=N",
+                        help="Max in-flight calls for a model (repeatable)")
+    parser.add_argument("--default-model-concurrency", type=int, default=2,
+                        help="Max in-flight calls for models without --model-concurrency")
+    parser.add_argument("--early-abort", action="store_true", help="Validate streamed replies row by row")
+    add_backend_arguments(parser)
+    add_resilience_arguments(parser)
+    parser.add_argument("--results-dir", type=str, default=os.path.join("results", "matrix"),
+                        help="Per-run exports are written to <results-dir>/<run_id>/")
+    parser.add_argument("--warehouse", type=str, default=warehouse.DEFAULT_WAREHOUSE_PATH,
+                        help="SQLite results warehouse the runs are added to")
+    args = parser.parse_args()
+
+    if args.spec:
+        spec = load_sweep_spec(args.spec)
+    else:
+        spec = normalize_spec({
+            "models": [m for m in args.models.split(",") if m],
+            "sizes": [int(s) for s in args.sizes.split(",") if s],
+            "iterations": args.iterations,
+            "workers": args.workers,
+            "model_concurrency": parse_concurrency(args.model_concurrency),
+            "default_model_concurrency": args.default_model_concurrency,
+            "backend": args.backend,
+            "backend_options": backend_options_from_args(args),
+            "resilience_options": resilience_options_from_args(args),
+            "early_abort": args.early_abort
+        })
+
+    matrix = run_matrix(spec)
+
+    # Aggregate and export each run on its own: runs differ in model and dataset.
+    # One memo for all runs: models often repeat each other's outputs on the same dataset
+    memo = EvaluationMemo()
+    conn = warehouse.connect(args.warehouse)
+    for run in matrix["runs"]:
+        run_dir = os.path.join("runs", run["run_id"])
+        print(f"Aggregating {run['run_id']} ({run['model']}, size={run['dataset_size']})...")
+        warehouse.ingest_run_dir(conn, run_dir, memo=memo)
+        warehouse.export_views(conn, os.path.join(args.results_dir, run["run_id"]), run_ids=[run["run_id"]])
+    conn.close()
+    matrix["evaluation_memo"] = memo.summary()
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    manifest_path = os.path.join(args.results_dir, f"{matrix['matrix_id']}.json")
+    with open(manifest_path, "w") as f:
+        json.dump({**matrix, "spec": spec}, f, indent=2)
+    print(f"Matrix manifest written to {manifest_path}")
+
+if __name__ == "__main__":
+    main()
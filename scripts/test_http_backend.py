@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import sys
+import os
+import socket
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.prompts import base, task_a
+from src.runner.backends import create_backend
+from src.runner.http_backend import HTTPBackend
+from src.runner.orchestrator import encode_run_inputs, build_prompt
+from src.runner.stub_server import StubChatServer
+
+REQUESTS = 20
+
+def reply(backend, prompt) -> str:
+    return "".join(backend.stream("stub-model", base.SYSTEM_PROMPT, prompt))
+
+def main():
+    records = DatasetGenerator(seed=42, count=20).generate()
+    prompt = build_prompt(task_a, "TOON", encode_run_inputs(records))
+    expected = reply(create_backend("simulated"), prompt)
+
+    with StubChatServer() as server:
+        # 1. Sequential requests share one keep-alive connection
+        print("Testing Connection Reuse...")
+        backend = HTTPBackend(server.url, api_key="", pool_size=4)
+        replies = [reply(backend, prompt) for _ in range(REQUESTS)]
+        stats = server.stats()
+        if stats["requests"] != REQUESTS or stats["connections"] >= REQUESTS or backend.pool.stats["reused"] == 0:
+            print(f"FAILURE Connection Reuse: server {stats}, pool {backend.pool.stats}")
+            sys.exit(1)
+        if any(r != expected for r in replies):
+            print("FAILURE Connection Reuse: reply differs from the simulated backend's")
+            sys.exit(1)
+        print(f"SUCCESS: {stats['requests']} requests over {stats['connections']} connection(s).")
+
+        # 2. A pooled connection the server dropped is replaced once, transparently
+        print("Testing Stale Connection Retry...")
+        for conn in list(backend.pool._idle.queue):
+            conn.sock.shutdown(socket.SHUT_RDWR)
+        text = reply(backend, prompt)
+        if backend.pool.stats["stale_retries"] != 1 or text != expected:
+            print(f"FAILURE Stale Connection Retry: pool {backend.pool.stats}")
+            sys.exit(1)
+        backend.close()
+        print("SUCCESS: The stale connection was replaced and the request succeeded.")
+
+        # 3. gzip-compressed request bodies round-trip
+        print("Testing Compressed Requests...")
+        backend = HTTPBackend(server.url, api_key="", compress=True, compress_min_bytes=0)
+        text = reply(backend, prompt)
+        completion = backend.complete("stub-model", base.SYSTEM_PROMPT, prompt)["choices"][0]["message"]["content"]
+        backend.close()
+        if text != expected or completion != expected:
+            print("FAILURE Compressed Requests: reply differs from the uncompressed one")
+            sys.exit(1)
+        print("SUCCESS: Compressed requests get the same reply.")
+
+        # 4. Prompts encoded while they are sent (chunked bodies) round-trip, with and without gzip
+        print("Testing Streamed Prompts...")
+        streamed_inputs = encode_run_inputs(records, stream_prompts=True)
+        for compress in (False, True):
+            backend = HTTPBackend(server.url, api_key="", compress=compress, compress_min_bytes=0)
+            text = reply(backend, build_prompt(task_a, "TOON", streamed_inputs))
+            backend.close()
+            if text != expected:
+                print(f"FAILURE Streamed Prompts (compress={compress}): reply differs from the string prompt's")
+                sys.exit(1)
+        print("SUCCESS: Streamed prompts get the same reply as string prompts.")
+
+    # 5. The stub backend owns its server and stops it on close
+    print("Testing Stub Backend Shutdown...")
+    backend = create_backend("stub")
+    text = reply(backend, prompt)
+    backend.close()
+    if text != expected or backend.server._thread.is_alive():
+        print("FAILURE Stub Backend Shutdown: server still running after close()")
+        sys.exit(1)
+    try:
+        socket.create_connection((backend.pool.host, backend.pool.port), timeout=1).close()
+        print("FAILURE Stub Backend Shutdown: server still accepts connections after close()")
+        sys.exit(1)
+    except OSError:
+        pass
+    print("SUCCESS: close() stopped the stub server.")
+
+if __name__ == "__main__":
+    main()
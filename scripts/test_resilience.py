@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+import sys
+import os
+import time
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.prompts import task_a, base
+from src.runner.executor import ModelExecutor, BackendError
+from src.runner.backends import create_backend
+from src.runner.orchestrator import encode_run_inputs, build_prompt
+from src.runner.resilience import ResilientExecutor, RetryPolicy, DeadlineExceeded
+from src.aggregation.metrics import COST_PER_1M_INPUT_TOKENS, COST_PER_1M_OUTPUT_TOKENS, compute_metrics
+
+# Seed of the simulated backend whose first call on PROMPT takes ~181 ms to its
+# first token and whose second (the hedge) takes ~12 ms
+HEDGE_SEED = 43
+# Seed whose first call on PROMPT succeeds and whose second fails (HTTP 503) at error_rate 0.5
+FAILED_HEDGE_SEED = 2
+
+def fixed_prompt() -> str:
+    # Generated timestamps are relative to now: pin them so the prompt, and
+    # with it the simulated backend's seeded latencies, is reproducible
+    records = DatasetGenerator(seed=42, count=5).generate()
+    for i, record in enumerate(records):
+        record["timestamp"] = f"2026-01-01T00:00:{i:02d}+00:00"
+    return build_prompt(task_a, "JSON", encode_run_inputs(records))
+
+PROMPT = fixed_prompt()
+
+def resilient(backend_options, **options):
+    backend = create_backend("simulated", backend_options)
+    return ResilientExecutor(ModelExecutor(backend=backend), **options)
+
+def call(executor):
+    return executor.execute("mock-model", base.SYSTEM_PROMPT, PROMPT)
+
+def call_error(executor):
+    try:
+        call(executor)
+    except BackendError as e:
+        return e
+    print("FAILURE: call succeeded, expected an error")
+    sys.exit(1)
+
+def main():
+    # 1. Transient errors are retried until an attempt succeeds
+    print("Testing Retries...")
+    executor = resilient({"seed": 1, "error_rate": 0.5}, policy=RetryPolicy(max_attempts=10, base_delay_ms=1))
+    records = [call(executor)["resilience"] for _ in range(20)]
+    retried = [r for r in records if r["retries"]]
+    consistent = all(r["attempts"] == r["retries"] + 1 == len(r["errors"]) + 1 for r in records)
+    if not retried or not consistent:
+        print(f"FAILURE Retries: {len(retried)}/20 calls retried, attempt counts consistent={consistent}")
+        sys.exit(1)
+    print(f"SUCCESS: {len(retried)}/20 calls recovered after retries.")
+
+    # 2. A call that keeps failing stops after max_attempts with the record attached
+    print("Testing Retry Exhaustion...")
+    error = call_error(resilient({"error_rate": 1.0}, policy=RetryPolicy(max_attempts=3, base_delay_ms=1)))
+    if error.status != 503 or error.resilience["attempts"] != 3 or error.resilience["retries"] != 2:
+        print(f"FAILURE Retry Exhaustion: status {error.status}, record {getattr(error, 'resilience', None)}")
+        sys.exit(1)
+    print("SUCCESS: Failing calls stop after max_attempts.")
+
+    # 3. Backoff never undercuts the server's Retry-After
+    print("Testing Retry-After...")
+    executor = resilient({"rate_limit_rate": 1.0, "retry_after_s": 0.1}, policy=RetryPolicy(max_attempts=3, base_delay_ms=0))
+    start = time.perf_counter()
+    error = call_error(executor)
+    elapsed = time.perf_counter() - start
+    if error.status != 429 or error.resilience["backoff_ms"] < 200 or elapsed < 0.2:
+        print(f"FAILURE Retry-After: backoff {error.resilience['backoff_ms']} ms, {elapsed:.3f}s elapsed")
+        sys.exit(1)
+    print("SUCCESS: Retries waited for Retry-After.")
+
+    # 4. A slow primary is raced by a hedge request, which wins; the loser is billed
+    print("Testing Hedging...")
+    executor = resilient(
+        {"seed": HEDGE_SEED, "ttft_ms": 100, "latency_distribution": "uniform", "latency_jitter_ms": 95},
+        hedge=True, hedge_delay_ms=30
+    )
+    result = call(executor)
+    record = result["resilience"]
+    if not (record["hedged"] and record["hedge_won"] and record["attempts"] == 2) or result["timing"]["latency_ms"] > 150:
+        print(f"FAILURE Hedging: {record}, latency {result['timing']['latency_ms']} ms")
+        sys.exit(1)
+    metric = compute_metrics(task_name=task_a.TASK_NAME, format_name="JSON", raw_log=result,
+                             parsed_output=None, correctness_result={})
+    expected_cost = (record["wasted_input_tokens"] * COST_PER_1M_INPUT_TOKENS
+                     + record["wasted_output_tokens"] * COST_PER_1M_OUTPUT_TOKENS) / 1_000_000
+    if not record["wasted_input_tokens"] or abs(metric["wasted_cost"] - round(expected_cost, 8)) > 1e-12:
+        print(f"FAILURE Hedge Waste: {record}, wasted cost {metric['wasted_cost']} != {expected_cost}")
+        sys.exit(1)
+    print(f"SUCCESS: The hedge won in {result['timing']['latency_ms']} ms; the abandoned request was billed.")
+
+    # 5. A hedge request that failed before answering is not billed as wasted
+    print("Testing Waste Of A Failed Hedge...")
+    executor = resilient({"seed": FAILED_HEDGE_SEED, "error_rate": 0.5, "ttft_ms": 80}, hedge=True, hedge_delay_ms=20)
+    record = call(executor)["resilience"]
+    if not record["hedged"] or record["hedge_won"] or record["wasted_tokens"]:
+        print(f"FAILURE Failed Hedge Waste: {record}")
+        sys.exit(1)
+    print("SUCCESS: The failed hedge cost nothing.")
+
+    # 6. The deadline bounds the call
+    print("Testing Deadline...")
+    executor = resilient({"ttft_ms": 300}, deadline_ms=50)
+    start = time.perf_counter()
+    error = call_error(executor)
+    elapsed = time.perf_counter() - start
+    if not isinstance(error, DeadlineExceeded) or elapsed > 0.25:
+        print(f"FAILURE Deadline: {type(error).__name__} after {elapsed:.3f}s")
+        sys.exit(1)
+    print(f"SUCCESS: The call raised DeadlineExceeded after {elapsed * 1000:.0f} ms.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.runner.logger import RunLogger
+from src.runner.async_logger import AsyncRunLogger, _STOP
+from src.runner.archive import pack_run, loose_log_paths
+from src.aggregation.aggregate import iter_run_logs, aggregate_run
+from src.aggregation.incremental import IncrementalAggregator
+from src.runner.workqueue import submit_run, QueueWorker, export_results, connect
+
+def execution_result(i: int):
+    return {"raw_output": f"{{\"ids\": [{i}]}}", "usage": {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15}}
+
+def logged_ids(run_dir: str):
+    return [raw_log["entry_id"] for _, raw_log in iter_run_logs(run_dir)]
+
+def test_async_writer(base_dir: str):
+    # 1. A flush that fails once must not kill the writer thread or lose entries
+    print("Testing Async Writer Flush Failure...")
+    logger = RunLogger("run_flush", base_dir)
+    flush = logger.flush
+    failures = []
+    def failing_flush():
+        if not failures:
+            failures.append(1)
+            raise OSError("simulated fsync failure")
+        flush()
+    logger.flush = failing_flush
+    writer = AsyncRunLogger(logger, batch_size=1)
+    for i in range(10):
+        writer.log_task_execution("Task A - Filtering", "JSON", "mock-model", execution_result(i))
+    writer.flush()
+    alive = writer._thread.is_alive()
+    writer.close()
+    count = len(logged_ids(logger.run_dir))
+    if not alive or count != 10:
+        print(f"FAILURE Async Writer: writer alive={alive}, {count}/10 entries on disk")
+        sys.exit(1)
+    print("SUCCESS: Writer survived a failed flush and wrote every entry.")
+
+    # 2. Entries still queued when the writer has stopped are written on close()
+    print("Testing Async Writer Close After Writer Exit...")
+    logger = RunLogger("run_dead_writer", base_dir)
+    writer = AsyncRunLogger(logger)
+    writer._queue.put(_STOP)
+    for i in range(20):
+        writer.log_task_execution("Task A - Filtering", "JSON", "mock-model", execution_result(i))
+    writer.close()
+    count = len(logged_ids(logger.run_dir))
+    if count != 20:
+        print(f"FAILURE Async Writer Close: {count}/20 entries on disk")
+        sys.exit(1)
+    print("SUCCESS: close() drained entries the writer thread never took.")
+
+def test_pack(base_dir: str):
+    # 3. Loose logs kept next to a pack are not counted twice, by any reader
+    print("Testing Pack With Loose Logs Kept...")
+    logger = RunLogger("run_pack", base_dir)
+    logger.write_dataset(DatasetGenerator(seed=42, count=20).generate())
+    for i in range(5):
+        logger.log_task_execution("Task A - Filtering", "JSON", "mock-model", execution_result(i))
+    logger.close()
+    incremental = IncrementalAggregator(logger.run_dir, os.path.join(base_dir, "results_pack"))
+    incremental.update()
+
+    index = pack_run(logger.run_dir, keep_loose=True)
+    counts = [index["records"], len(aggregate_run(logger.run_dir)), pack_run(logger.run_dir, keep_loose=True)["records"]]
+    if counts != [5, 5, 5]:
+        print(f"FAILURE Pack: records packed / aggregated / re-packed = {counts}, expected 5 each")
+        sys.exit(1)
+
+    # 4. The incremental aggregator follows the run into its pack
+    pack_run(logger.run_dir)
+    if loose_log_paths(logger.run_dir):
+        print("FAILURE Pack: loose logs left after packing")
+        sys.exit(1)
+    total = incremental.update()["total"]
+    grouped = sum(acc.count for acc in incremental.groups.values())
+    if total != 5 or grouped != 5:
+        print(f"FAILURE Incremental After Pack: {total} entries, {grouped} in groups, expected 5")
+        sys.exit(1)
+    print("SUCCESS: Packed runs aggregate once per call, fully and incrementally.")
+
+def test_workqueue_reexport(base_dir: str):
+    # 5. Results exported again after a crash before they were marked exported count once
+    print("Testing Work Queue Re-Export After Crash...")
+    db_path = os.path.join(base_dir, "queue.sqlite")
+    run_id = submit_run(db_path, dataset_size=5, base_dir=base_dir)
+    QueueWorker(db_path).run()
+    first = export_results(db_path).get(run_id, 0)
+    conn = connect(db_path)
+    conn.execute("UPDATE results SET exported = 0")
+    conn.close()
+    second = export_results(db_path).get(run_id, 0)
+
+    run_dir = os.path.join(base_dir, run_id)
+    ids = logged_ids(run_dir)
+    counts = [first, second, len(ids), len(set(ids)), len(aggregate_run(run_dir))]
+    if first == 0 or counts != [first] * 5:
+        print(f"FAILURE Work Queue Re-Export: exported / re-exported / read / distinct / aggregated = {counts}")
+        sys.exit(1)
+    print("SUCCESS: Re-exported results are read and aggregated once per call.")
+
+def test_workqueue_lease(base_dir: str):
+    # 6. A worker whose lease expired while another re-ran its job cannot commit it
+    print("Testing Work Queue Expired Lease...")
+    db_path = os.path.join(base_dir, "lease.sqlite")
+    run_id = submit_run(db_path, dataset_size=5, base_dir=base_dir, shared_storage=True)
+    conn = connect(db_path)
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+    if journal_mode.lower() != "delete":
+        print(f"FAILURE Work Queue Shared Storage: journal_mode={journal_mode}, expected delete")
+        sys.exit(1)
+
+    worker_a = QueueWorker(db_path, worker_id="worker-a", lease_s=0.05)
+    worker_b = QueueWorker(db_path, worker_id="worker-b")
+    job = worker_a.claim()
+    time.sleep(0.1)
+    worker_b.run_one()
+    committed = worker_a.commit(job, worker_a.execute(job))
+    worker_b.run()
+    export_results(db_path)
+
+    job_ids = [raw_log.get("job_id") for _, raw_log in iter_run_logs(os.path.join(base_dir, run_id))]
+    workers = [raw_log.get("worker_id") for _, raw_log in iter_run_logs(os.path.join(base_dir, run_id))
+               if raw_log.get("job_id") == job["job_id"]]
+    if committed or workers != ["worker-b"] or len(job_ids) != len(set(job_ids)):
+        print(f"FAILURE Work Queue Lease: stale commit accepted={committed}, job {job['job_id']} logged by {workers}")
+        sys.exit(1)
+    print("SUCCESS: Only the worker holding the lease committed the re-run job.")
+
+def main():
+    base_dir = tempfile.mkdtemp(prefix="test_run_logs_")
+    try:
+        test_async_writer(base_dir)
+        test_pack(base_dir)
+        test_workqueue_reexport(base_dir)
+        test_workqueue_lease(base_dir)
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
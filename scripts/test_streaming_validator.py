@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import sys
+import os
+import random
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.prompts import base, task_a, task_b, task_c
+from src.runner.orchestrator import FORMATS, encode_run_inputs, build_prompt
+from src.runner.simulated import SimulatedBackend
+from src.evaluation.correctness import GroundTruth
+from src.evaluation.streaming import StreamingValidator
+from src.aggregation.aggregate import evaluate_output, find_checker
+
+SEEDS = range(10)
+
+def cut(text: str, rng: random.Random):
+    """Splits text into chunks of 1 to 40 characters, wherever they fall."""
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 40)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+def validate(task, fmt: str, text: str, truth: GroundTruth, rng: random.Random) -> StreamingValidator:
+    validator = StreamingValidator(task.TASK_NAME, fmt, truth)
+    for chunk in cut(text, rng):
+        if not validator.feed(chunk):
+            return validator
+    validator.finish()
+    return validator
+
+def is_correct(task, fmt: str, text: str, truth: GroundTruth) -> bool:
+    raw_log = {"task_name": task.TASK_NAME, "format": fmt, "raw_output": text}
+    return evaluate_output(raw_log, find_checker(task.TASK_NAME), truth)[1]["is_correct"]
+
+def main():
+    records = DatasetGenerator(seed=7, count=40).generate()
+    # Generated timestamps are relative to now: pin them so the simulated replies are reproducible
+    for i, record in enumerate(records):
+        record["timestamp"] = f"2026-01-01T00:00:{i:02d}+00:00"
+    truth = GroundTruth(records)
+    inputs = encode_run_inputs(records)
+    rng = random.Random(0)
+
+    cases = [
+        ("correct", {}),
+        ("dropped rows", {"drop_rate": 0.3}),
+        ("hallucinated rows", {"hallucination_rate": 0.3}),
+        ("drifted rows", {"drift_rate": 0.3}),
+        ("broken formats", {"format_break_rate": 1.0})
+    ]
+    for label, options in cases:
+        print(f"Testing Streaming Validator On {label.title()}...")
+        checked = aborted = 0
+        for task in (task_a, task_b, task_c):
+            for fmt in FORMATS:
+                prompt = build_prompt(task, fmt, inputs)
+                for seed in SEEDS:
+                    text = SimulatedBackend(seed=seed, **options).complete("mock-model", base.SYSTEM_PROMPT, prompt)
+                    correct = is_correct(task, fmt, text, truth)
+                    validator = validate(task, fmt, text, truth, rng)
+                    checked += 1
+                    aborted += validator.aborted
+
+                    # Never abort a reply the final check accepts
+                    if validator.aborted and correct:
+                        print(f"FAILURE {task.TASK_NAME} {fmt} seed {seed}: aborted a correct reply "
+                              f"({validator.abort_reason})")
+                        sys.exit(1)
+                    if label == "correct" and not correct:
+                        print(f"FAILURE {task.TASK_NAME} {fmt} seed {seed}: simulated reply is not correct")
+                        sys.exit(1)
+                    # Hallucinated and drifted rows are visible as they stream: a wrong reply must be aborted
+                    if label in ("hallucinated rows", "drifted rows") and not correct and not validator.aborted:
+                        print(f"FAILURE {task.TASK_NAME} {fmt} seed {seed}: wrong reply with {label} was not aborted")
+                        sys.exit(1)
+        print(f"SUCCESS: {aborted}/{checked} replies aborted, none that the final check accepts.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import sys
+import os
+import copy
+import types
+
+# Ensure src is in python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dataset.generator import DatasetGenerator
+from src.prompts import base
+from src.prompts.registry import TASKS
+from src.prompts.templates import format_prompt
+from src.tasks.dsl import TaskSpec, Filter, GroupAggregate, Aggregate
+from src.runner.orchestrator import FORMATS, encode_run_inputs, build_prompt
+from src.runner.simulated import SimulatedBackend
+from src.evaluation.correctness import GroundTruth, check_task_spec
+from src.evaluation.parsing import output_schema
+from src.aggregation.aggregate import evaluate_output, find_checker
+
+def spec_only_task():
+    """A task module declared only by its SPEC: no checker or schema of its own."""
+    task = types.ModuleType("task_d")
+    task.TASK_NAME = "Task D - Failures By Service"
+    task.SPEC = TaskSpec(task.TASK_NAME, [
+        Filter({"status": "failed"}),
+        GroupAggregate("service", [
+            Aggregate("failed_count", "count"),
+            Aggregate("max_latency_ms", "max", "metadata.latency_ms")
+        ])
+    ])
+    task.TASK_DESCRIPTION = task.SPEC.describe()
+    task.expected_output_schema = task.SPEC.output_schema()
+    task.get_prompt = lambda format, data: format_prompt(task_module=task, format_name=format, data=data)
+    return task
+
+def expect(label: str, result, is_correct: bool):
+    if result["is_correct"] != is_correct:
+        print(f"FAILURE {label}: is_correct={result['is_correct']}, errors {result['errors'][:3]}")
+        sys.exit(1)
+
+def main():
+    records = DatasetGenerator(seed=42, count=200).generate()
+    truth = GroundTruth(records)
+    task = spec_only_task()
+    expected = truth.expected_output(task.SPEC)
+
+    # 1. check_task_spec accepts the spec's rows in any order and rejects wrong ones
+    print("Testing check_task_spec...")
+    expect("Exact Rows", check_task_spec(list(reversed(expected)), truth, task.SPEC), True)
+
+    drifted = copy.deepcopy(expected)
+    drifted[0]["failed_count"] += 1
+    expect("Drifted Count", check_task_spec(drifted, truth, task.SPEC), False)
+    expect("Dropped Row", check_task_spec(expected[1:], truth, task.SPEC), False)
+
+    hallucinated = expected + [dict(expected[0], service="made-up-service")]
+    expect("Hallucinated Row", check_task_spec(hallucinated, truth, task.SPEC), False)
+    expect("Duplicated Row", check_task_spec(expected + expected[:1], truth, task.SPEC), False)
+    print(f"SUCCESS: check_task_spec verified {len(expected)} expected rows.")
+
+    # 2. Registering the module once is enough for the runner, the simulated
+    #    backend, the parser and the checker to handle the task
+    print("Testing A Registered Spec-Only Task...")
+    TASKS.append(task)
+    try:
+        if output_schema(task.TASK_NAME) != task.expected_output_schema:
+            print("FAILURE Registry: output schema not found for the registered task")
+            sys.exit(1)
+        if truth.expected_rows(task.TASK_NAME) != len(expected):
+            print(f"FAILURE Registry: expected_rows {truth.expected_rows(task.TASK_NAME)} != {len(expected)}")
+            sys.exit(1)
+        checker = find_checker(task.TASK_NAME)
+        inputs = encode_run_inputs(records)
+        for fmt in FORMATS:
+            text = SimulatedBackend().complete("mock-model", base.SYSTEM_PROMPT, build_prompt(task, fmt, inputs))
+            raw_log = {"task_name": task.TASK_NAME, "format": fmt, "raw_output": text}
+            expect(f"Simulated {fmt} Reply", evaluate_output(raw_log, checker, truth)[1], True)
+
+            broken = SimulatedBackend(drift_rate=1.0).complete("mock-model", base.SYSTEM_PROMPT,
+                                                               build_prompt(task, fmt, inputs))
+            raw_log = {"task_name": task.TASK_NAME, "format": fmt, "raw_output": broken}
+            expect(f"Drifted {fmt} Reply", evaluate_output(raw_log, checker, truth)[1], False)
+    finally:
+        TASKS.remove(task)
+    print("SUCCESS: The spec-only task was answered, parsed and checked in both formats.")
+
+if __name__ == "__main__":
+    main()
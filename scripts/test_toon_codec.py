@@ -7,7 +7,11 @@ import json
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from src.dataset.generator import DatasetGenerator
-from src.encoding.toon_codec import encode_to_toon, decode_from_toon, validate_round_trip
+from src.encoding.toon_codec import (
+    FIELDS, encode_to_toon, encode_table, decode_from_toon, validate_round_trip, split_row, parse_line_custom
+)
+from src.evaluation.correctness import GroundTruth, TASK_C_KEYS, TASK_A_FILTER, expected_task_a_ids, expected_task_c_row
+from src.prompts import task_b, task_c
 
 def main():
     print("Generating test records...")
@@ -63,5 +67,65 @@ def main():
         print(f"FAILURE Edge Case: {e}")
         sys.exit(1)
 
+    # 5. Generic tables: Task B / Task C outputs with their declared schemas
+    print("Testing Generic Tables (Task B/C schemas)...")
+    truth = GroundTruth(original_records)
+    task_b_rows = sorted(truth.task_b_map.values(), key=lambda r: r["type"])
+    task_b_columns = ["type", "total_count", "failed_count", "average_severity"]
+    task_c_rows = [expected_task_c_row(r) for r in original_records]
+    for rows, columns, schema in (
+        (task_b_rows, task_b_columns, task_b.expected_output_schema),
+        (task_c_rows, TASK_C_KEYS, task_c.expected_output_schema)
+    ):
+        encoded = encode_table("results", columns, rows)
+        for types in (schema, None):
+            # Declared types, then inferred ones
+            decoded = decode_from_toon(encoded, types)
+            if decoded != rows:
+                print(f"FAILURE Generic Table ({'declared' if types else 'inferred'} types): {decoded[:1]} != {rows[:1]}")
+                sys.exit(1)
+    print("SUCCESS: Task B/C tables decoded with declared and inferred types.")
+
+    # An answer may name its table "events" with its own columns; only the dataset schema is fixed
+    encoded = encode_table("events", task_b_columns, task_b_rows)
+    if decode_from_toon(encoded, task_b.expected_output_schema) != task_b_rows:
+        print("FAILURE Generic Table: an `events` answer with Task B columns was not decoded")
+        sys.exit(1)
+    try:
+        decode_from_toon(encoded, schema=FIELDS)
+        print("FAILURE Dataset Schema: Task B columns accepted as the event schema")
+        sys.exit(1)
+    except ValueError:
+        pass
+    print("SUCCESS: The event schema is enforced for the dataset only.")
+
+    # 6. Tokenizer: the split_row fast path must agree with parse_line_custom
+    print("Testing Row Tokenizer...")
+    lines = encode_to_toon(original_records).split('\n')[2:] + [
+        'a,"b,""c""",[x,y],', '[a,[b,c]],d', '"[a,b]",c', 'a],b,[c', '"unterminated,x', '', ','
+    ]
+    for line in lines:
+        if split_row(line) != parse_line_custom(line):
+            print(f"FAILURE Tokenizer: {line!r}: {split_row(line)} != {parse_line_custom(line)}")
+            sys.exit(1)
+    print("SUCCESS: Row tokenizer matches the reference parser.")
+
+    # 7. Projection and predicate pushdown
+    print("Testing Projection/Predicates...")
+    encoded = encode_to_toon(original_records)
+    task_a_rows = decode_from_toon(encoded, where=TASK_A_FILTER)
+    if {r["id"] for r in task_a_rows} != expected_task_a_ids(original_records):
+        print("FAILURE Predicates: Task A filter selected the wrong rows")
+        sys.exit(1)
+    projected = decode_from_toon(encoded, columns=["id", "metadata.region"], where={"env": "prod"})
+    expected = [
+        {"id": r["id"], "metadata": {"region": r["metadata"]["region"]}}
+        for r in original_records if r["env"] == "prod"
+    ]
+    if projected != expected:
+        print(f"FAILURE Projection: {projected[:1]} != {expected[:1]}")
+        sys.exit(1)
+    print("SUCCESS: Projected and filtered decodes match the full decode.")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,233 @@
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from src.aggregation.stats import RunningStats, QuantileSketch, percentile
+
+# Metric fields a GroupAccumulator reads; slim_metric keeps only these
+ACCUMULATED_FIELDS = [
+    "task", "format",
+    "input_tokens", "output_tokens", "total_tokens",
+    "estimated_cost", "input_cost", "output_cost",
+    "is_correct", "ttft_ms", "latency_ms", "output_tokens_per_sec",
+    "aborted_early", "tokens_saved",
+    "retries", "hedged", "wasted_tokens", "wasted_cost", "backend_error",
+    "failure_category"
+]
+
+# Running sums behind the summary means and totals
+SUM_FIELDS = [
+    "input_tokens", "output_tokens", "total_tokens",
+    "estimated_cost", "input_cost", "output_cost",
+    "tokens_saved", "retries", "wasted_tokens", "wasted_cost"
+]
+
+# Flags counted per group
+COUNT_FIELDS = ["is_correct", "aborted_early", "hedged", "backend_error"]
+
+# Per-call values kept to compute exact percentiles / means of present values
+VALUE_FIELDS = ["ttft_ms", "latency_ms", "output_tokens_per_sec"]
+
+# Streamed mean / variance (present values only)
+MOMENT_FIELDS = ["input_tokens", "output_tokens", "total_tokens", "estimated_cost", "latency_ms", "output_tokens_per_sec"]
+
+# Quantile sketches: percentiles in bounded memory when values are not kept
+SKETCH_FIELDS = ["output_tokens", "total_tokens", "ttft_ms", "latency_ms"]
+
+STREAMED_FIELDS = list(dict.fromkeys(MOMENT_FIELDS + SKETCH_FIELDS))
+
+# Calls buffered before moments and sketches are updated in one NumPy batch
+PENDING_LIMIT = 4096
+
+
+def slim_metric(metric: Dict[str, Any]) -> Dict[str, Any]:
+    """The subset of a metric entry that GroupAccumulator uses."""
+    return {k: metric.get(k) for k in ACCUMULATED_FIELDS}
+
+
+class GroupAccumulator:
+    """
+    Running aggregates for one (task, format) group: sums, flag counts,
+    latency values, failure-category counts, streamed moments (mean and
+    variance) and quantile sketches.
+
+    add() and remove() are inverses, so a changed log can be swapped out
+    without rebuilding the group, and merge() combines groups accumulated
+    on different shards or runs. to_dict()/from_dict() round-trip through
+    JSON for persisted aggregation state.
+
+    By default the per-call values are not kept: memory stays bounded
+    however many calls are added, remove() is O(1) per field, and
+    percentiles come from the sketches (within their relative accuracy).
+    keep_values=True also keeps the values, for exact percentiles.
+    Moments and sketches are updated in NumPy batches of up to
+    PENDING_LIMIT calls, flushed whenever they are read.
+    """
+    def __init__(self, keep_values: bool = False):
+        self.count = 0
+        self.keep_values = keep_values
+        self.sums = {f: 0 for f in SUM_FIELDS}
+        self.counts = {f: 0 for f in COUNT_FIELDS}
+        self.values: Dict[str, List[float]] = {f: [] for f in VALUE_FIELDS}
+        self.failures: Dict[str, int] = defaultdict(int)
+        self._moments = {f: RunningStats() for f in MOMENT_FIELDS}
+        self._sketches = {f: QuantileSketch() for f in SKETCH_FIELDS}
+        self._pending: Dict[str, List[float]] = {f: [] for f in STREAMED_FIELDS}
+        self._pending_count = 0
+
+    def _flush(self):
+        """Applies buffered values to the moments and sketches."""
+        if not self._pending_count:
+            return
+        for f, values in self._pending.items():
+            if f in self._moments:
+                self._moments[f].add_many(values)
+            if f in self._sketches:
+                self._sketches[f].add_many(values)
+            values.clear()
+        self._pending_count = 0
+
+    @property
+    def moments(self) -> Dict[str, RunningStats]:
+        self._flush()
+        return self._moments
+
+    @property
+    def sketches(self) -> Dict[str, QuantileSketch]:
+        self._flush()
+        return self._sketches
+
+    def add(self, metric: Dict[str, Any]):
+        self.count += 1
+        for f in SUM_FIELDS:
+            self.sums[f] += metric.get(f) or 0
+        for f in COUNT_FIELDS:
+            if metric.get(f):
+                self.counts[f] += 1
+        if self.keep_values:
+            for f in VALUE_FIELDS:
+                if metric.get(f) is not None:
+                    self.values[f].append(metric[f])
+        for f, pending in self._pending.items():
+            value = metric.get(f)
+            if value is not None:
+                pending.append(value)
+        self._pending_count += 1
+        if self._pending_count >= PENDING_LIMIT:
+            self._flush()
+        self.failures[metric.get("failure_category", "unknown")] += 1
+
+    def remove(self, metric: Dict[str, Any]):
+        self.count -= 1
+        for f in SUM_FIELDS:
+            self.sums[f] -= metric.get(f) or 0
+        for f in COUNT_FIELDS:
+            if metric.get(f):
+                self.counts[f] -= 1
+        if self.keep_values:
+            for f in VALUE_FIELDS:
+                if metric.get(f) is not None:
+                    self.values[f].remove(metric[f])
+        for f in MOMENT_FIELDS:
+            if metric.get(f) is not None:
+                self.moments[f].remove(metric[f])
+        for f in SKETCH_FIELDS:
+            if metric.get(f) is not None:
+                self.sketches[f].remove(metric[f])
+        category = metric.get("failure_category", "unknown")
+        self.failures[category] -= 1
+        if not self.failures[category]:
+            del self.failures[category]
+
+    def merge(self, other: "GroupAccumulator") -> "GroupAccumulator":
+        """Adds another group's aggregates (values are kept only if both kept them)."""
+        self.count += other.count
+        for f in SUM_FIELDS:
+            self.sums[f] += other.sums[f]
+        for f in COUNT_FIELDS:
+            self.counts[f] += other.counts[f]
+        self.keep_values = self.keep_values and other.keep_values
+        for f in VALUE_FIELDS:
+            self.values[f] = self.values[f] + other.values[f] if self.keep_values else []
+        for f in MOMENT_FIELDS:
+            self.moments[f].merge(other.moments[f])
+        for f in SKETCH_FIELDS:
+            self.sketches[f].merge(other.sketches[f])
+        for category, n in other.failures.items():
+            self.failures[category] += n
+        return self
+
+    def mean(self, field: str) -> float:
+        return self.sums[field] / self.count if self.count else 0.0
+
+    def rate(self, field: str) -> float:
+        return self.counts[field] / self.count if self.count else 0.0
+
+    def percentile(self, field: str, pct: float) -> Optional[float]:
+        """Exact percentile of the kept values, else the sketch's estimate (None if no values)."""
+        if self.keep_values and field in VALUE_FIELDS:
+            return percentile(self.values[field], pct)
+        return self.sketches[field].percentile(pct)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "keep_values": self.keep_values,
+            "sums": self.sums,
+            "counts": self.counts,
+            "values": self.values,
+            "failures": dict(self.failures),
+            "moments": {f: s.to_dict() for f, s in self.moments.items()},
+            "sketches": {f: s.to_dict() for f, s in self.sketches.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GroupAccumulator":
+        acc = cls(keep_values=data["keep_values"])
+        acc.count = data["count"]
+        acc.sums.update(data["sums"])
+        acc.counts.update(data["counts"])
+        acc.values.update(data["values"])
+        acc.failures.update(data["failures"])
+        acc._moments = {f: RunningStats.from_dict(s) for f, s in data["moments"].items()}
+        acc._sketches = {f: QuantileSketch.from_dict(s) for f, s in data["sketches"].items()}
+        return acc
+
+
+def accumulate(
+    metrics: Iterable[Dict[str, Any]],
+    groups: Optional[Dict[Tuple[str, str], GroupAccumulator]] = None,
+    keep_values: bool = False
+) -> Dict[Tuple[str, str], GroupAccumulator]:
+    """
+    Adds metric entries to per-(task, format) accumulators (new ones if
+    `groups` is None) in one pass. `metrics` may be any iterable, e.g. a
+    generator over a large run.
+    """
+    groups = groups if groups is not None else {}
+    for m in metrics:
+        key = (m["task"], m["format"])
+        if key not in groups:
+            groups[key] = GroupAccumulator(keep_values=keep_values)
+        groups[key].add(m)
+    return groups
+
+
+def merge_groups(
+    *shards: Dict[Tuple[str, str], GroupAccumulator]
+) -> Dict[Tuple[str, str], GroupAccumulator]:
+    """Per-(task, format) accumulators of several shards or runs combined (the shards are not modified)."""
+    merged: Dict[Tuple[str, str], GroupAccumulator] = {}
+    for groups in shards:
+        for key, acc in groups.items():
+            if key not in merged:
+                merged[key] = GroupAccumulator(keep_values=acc.keep_values)
+            merged[key].merge(acc)
+    return merged
+
+
+def groups_to_dict(groups: Dict[Tuple[str, str], GroupAccumulator]) -> List[Dict[str, Any]]:
+    return [{"task": task, "format": fmt, **acc.to_dict()} for (task, fmt), acc in groups.items()]
+
+
+def groups_from_dict(data: List[Dict[str, Any]]) -> Dict[Tuple[str, str], GroupAccumulator]:
+    return {(d["task"], d["format"]): GroupAccumulator.from_dict(d) for d in data}
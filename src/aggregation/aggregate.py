@@ -1,128 +1,368 @@
 import os
 import json
 import glob
-from typing import List, Dict, Optional
+import functools
+import multiprocessing
+from typing import Any, List, Dict, Optional, Iterator, Tuple, Union
 
 from src.dataset.generator import DatasetGenerator
-from src.evaluation.parsing import parse_output, EvaluationError
-from src.evaluation.correctness import check_task_a, check_task_b, check_task_c
+from src.prompts import task_a, task_b, task_c
+from src.prompts.registry import find_task
+from src.evaluation.parsing import parse_output, output_schema, EvaluationError
+from src.evaluation.correctness import GroundTruth, check_task_a, check_task_b, check_task_c, check_task_spec
 from src.evaluation.failures import classify_failure
+from src.evaluation.memo import EvaluationMemo
+from src.evaluation.truth_cache import cached_ground_truth
 from src.aggregation.metrics import compute_metrics
+from src.runner.segments import SEGMENTS_DIR, list_segments, read_segment
+from src.runner.async_logger import SPILL_PREFIX
+from src.runner.logger import DATASET_FILENAME
+from src.runner.archive import pack_path, iter_pack_records
 
-# Map task names (from prompts) to correctness functions
+# Hand-written correctness functions; other registered tasks are checked from their SPEC
 TASK_CHECKS = {
-    "Task A - Filtering": check_task_a,
-    "Task B - Aggregation": check_task_b,
-    "Task C - Transformation": check_task_c
+    task_a.TASK_NAME: check_task_a,
+    task_b.TASK_NAME: check_task_b,
+    task_c.TASK_NAME: check_task_c
 }
 
 def load_run_log(filepath: str) -> Dict:
     with open(filepath, "r") as f:
         return json.load(f)
 
-def aggregate_run(run_dir: str, dataset_records: Optional[List[Dict]] = None) -> List[Dict]:
+def load_run_dataset(run_dir: str) -> Optional[List[Dict]]:
+    """Loads the input records stored with a run, if the run recorded them."""
+    path = os.path.join(run_dir, DATASET_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def load_run_ground_truth(run_dir: str) -> Optional[GroundTruth]:
     """
-    Aggregates results for a specific run directory.
-    
-    Args:
-        run_dir: Path to the run directory (e.g. runs/run_xyz)
-        dataset_records: The list of dict records used as input. 
-                         If None, generates the default 200-record dataset.
-    
-    Returns:
-        List of metric dictionaries.
+    The GroundTruth of the dataset stored with a run, if the run recorded
+    one: loaded from the cache next to it (see truth_cache), or built and
+    cached on first use.
     """
-    
-    # 1. Ensure Dataset
-    if dataset_records is None:
-        # Default fallback
-        print("Warning: No dataset provided to aggregator. Generating default (Seed 42, Count 200).")
-        gen = DatasetGenerator(seed=42, count=200)
-        dataset_records = gen.generate()
-        
-    results = []
-    
-    # 2. Iterate Logs (JSON and TOON folders)
+    path = os.path.join(run_dir, DATASET_FILENAME)
+    if not os.path.exists(path):
+        return None
+    return cached_ground_truth(path)
+
+def iter_run_logs(run_dir: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Yields (source, raw_log) for every execution logged in a run directory.
+
+    A packed run's archive (runs/<run_id>/logs.pack, see src/runner/archive.py) is streamed first,
+    then segments (runs/<run_id>/segments/*.jsonl) are read sequentially, then entries spilled by the
+    async writer, then any per-file logs (runs/<run_id>/<FORMAT>/*.json). Every source is de-duplicated
+    by entry_id, so exported copies, loose logs kept next to a pack and entries appended twice (e.g. a
+    work-queue export repeated after a crash) are counted once.
+    """
+    seen_ids = set()
+
+    def first_sighting(raw_log: Dict) -> bool:
+        entry_id = raw_log.get("entry_id")
+        if not entry_id:
+            return True
+        if entry_id in seen_ids:
+            return False
+        seen_ids.add(entry_id)
+        return True
+
+    packed = pack_path(run_dir)
+    if os.path.exists(packed):
+        for record_no, raw_log in iter_pack_records(packed):
+            if first_sighting(raw_log):
+                yield f"{packed}#{record_no}", raw_log
+
+    segment_paths = list_segments(os.path.join(run_dir, SEGMENTS_DIR))
+    segment_paths += sorted(glob.glob(os.path.join(run_dir, f"{SPILL_PREFIX}*.jsonl")))
+
+    for segment_path in segment_paths:
+        for offset, raw_log in read_segment(segment_path):
+            if first_sighting(raw_log):
+                yield f"{segment_path}@{offset}", raw_log
+
     # Pattern: runs/<run_id>/{JSON,TOON}/*.json
     # We use glob to specific path
     path_pattern = os.path.join(run_dir, "*", "*.json")
-    files = glob.glob(path_pattern)
-    
-    for filepath in files:
+    for filepath in sorted(glob.glob(path_pattern)):
         if not os.path.isfile(filepath):
             continue
-            
+
         try:
             raw_log = load_run_log(filepath)
         except Exception as e:
             print(f"Skipping corrupt log {filepath}: {e}")
             continue
-            
-        task_name = raw_log.get("task_name")
-        fmt = raw_log.get("format")
-        raw_output = raw_log.get("raw_output", "")
-        
-        # Determine strictness checker
-        checker_func = TASK_CHECKS.get(task_name)
-        if not checker_func:
-            # Maybe mismatch in naming? simple heuristic check?
-            # Let's match by substring if exact fail
-            found = False
-            for k, v in TASK_CHECKS.items():
-                if k in task_name:
-                    checker_func = v
-                    found = True
-                    break
-            if not found:
-                print(f"Warning: No checker found for task '{task_name}' in {filepath}")
-                continue
-
-        # 3. Parse & Evaluate
-        parsed_data = None
-        correctness_res = {
-            "is_correct": False,
-            "errors": [], 
-            "details": {}
-        }
+
+        if first_sighting(raw_log):
+            yield filepath, raw_log
+
+def evaluate_output(raw_log: Dict, checker_func, dataset_records: Union[List[Dict], GroundTruth]) -> Tuple[Any, Dict]:
+    """
+    Parses a logged output and checks it against the dataset.
+    Pass a GroundTruth when evaluating many logs of one dataset.
+    Returns (parsed_data, correctness_result).
+    """
+    fmt = raw_log.get("format")
+    raw_output = raw_log.get("raw_output", "")
+    
+    parsed_data = None
+    correctness_res = {
+        "is_correct": False,
+        "errors": [], 
+        "details": {}
+    }
+    
+    if raw_log.get("error"):
+        # The call failed after retries; there is no output to evaluate
+        correctness_res["errors"] = [f"backend_error: {raw_log['error'].get('message')}"]
+        return parsed_data, correctness_res
+
+    early_abort = raw_log.get("early_abort") or {}
+    if early_abort.get("aborted_early"):
+        # Output was truncated on purpose; the streaming validator's reason is the verdict
+        correctness_res["errors"] = [f"aborted_early: {early_abort.get('abort_reason')}"]
+        return parsed_data, correctness_res
+    
+    try:
+        parsed_data = parse_output(fmt, raw_output, output_schema(raw_log.get("task_name")))
+        # Evaluate correctness
+        correctness_res = checker_func(parsed_data, dataset_records)
         
-        try:
-            parsed_data = parse_output(fmt, raw_output)
-            # Evaluate correctness
-            correctness_res = checker_func(parsed_data, dataset_records)
-            
-        except EvaluationError as e:
-            # Handle Parse/Schema errors
-            fail_type = classify_failure(e)
-            correctness_res["is_correct"] = False
-            correctness_res["errors"] = [f"{fail_type}: {str(e)}"]
-            
-        except Exception as e:
-            # unexpected
-            fail_type = classify_failure(e)
-            correctness_res["is_correct"] = False
-            correctness_res["errors"] = [f"System Error: {str(e)}"]
-
-        # 4. Compute Metrics
-        metric_entry = compute_metrics(
-            task_name=task_name,
-            format_name=fmt,
-            raw_log=raw_log,
-            parsed_output=parsed_data,
-            correctness_result=correctness_res
-        )
+    except EvaluationError as e:
+        # Handle Parse/Schema errors
+        fail_type = classify_failure(e)
+        correctness_res["is_correct"] = False
+        correctness_res["errors"] = [f"{fail_type}: {str(e)}"]
         
-        # Add classification label for easier pivoting later
-        final_errors = metric_entry.get("error_messages", [])
-        if metric_entry["is_correct"]:
-            metric_entry["failure_category"] = "success"
-        elif any("ParseError" in e for e in final_errors) or any("parse_error" in e for e in final_errors):
-             metric_entry["failure_category"] = "parse_error"
-        elif any("SchemaViolation" in e for e in final_errors) or any("schema_violation" in e for e in final_errors):
-             metric_entry["failure_category"] = "schema_violation"
-        # We also reused failures.classify_failure logic on result dict?
+    except Exception as e:
+        # unexpected
+        fail_type = classify_failure(e)
+        correctness_res["is_correct"] = False
+        correctness_res["errors"] = [f"System Error: {str(e)}"]
+    
+    return parsed_data, correctness_res
+
+def find_checker(task_name: Optional[str]):
+    """The correctness checker for a logged task name (exact, then substring match)."""
+    task = find_task(task_name)
+    if task is None:
+        return None
+    checker_func = TASK_CHECKS.get(task.TASK_NAME)
+    if checker_func:
+        return checker_func
+    # Tasks defined only by a spec use the generic checker
+    return functools.partial(check_task_spec, spec=task.SPEC)
+
+def failure_category(correctness_res: Dict) -> str:
+    """Classification label for a correctness result, for easier pivoting later."""
+    final_errors = correctness_res.get("errors", [])
+    if correctness_res.get("is_correct", False):
+        return "success"
+    elif any("ParseError" in e for e in final_errors) or any("parse_error" in e for e in final_errors):
+        return "parse_error"
+    elif any("SchemaViolation" in e for e in final_errors) or any("schema_violation" in e for e in final_errors):
+        return "schema_violation"
+    # We also reused failures.classify_failure logic on result dict?
+    return classify_failure(correctness_res) # Logic reuse
+
+def evaluate_verdict(raw_log: Dict, ground_truth: GroundTruth) -> Dict:
+    """
+    The expensive part of evaluating a log: parse and check its output.
+    Returns {"correctness", "failure_category"} (the unit EvaluationMemo caches).
+    """
+    checker_func = find_checker(raw_log.get("task_name"))
+    _, correctness_res = evaluate_output(raw_log, checker_func, ground_truth)
+    return {"correctness": correctness_res, "failure_category": failure_category(correctness_res)}
+
+def build_metric(raw_log: Dict, verdict: Dict) -> Dict:
+    """Metric entry for a log from its verdict."""
+    # parsed_output is not used by compute_metrics, so cached verdicts do not keep it
+    metric_entry = compute_metrics(
+        task_name=raw_log.get("task_name"),
+        format_name=raw_log.get("format"),
+        raw_log=raw_log,
+        parsed_output=None,
+        correctness_result=verdict["correctness"]
+    )
+    metric_entry["failure_category"] = verdict["failure_category"]
+    return metric_entry
+
+def evaluate_log(source: str, raw_log: Dict, ground_truth: GroundTruth) -> Optional[Dict]:
+    """
+    Parses, checks and scores one logged execution.
+    Returns its metric entry, or None if the task has no checker.
+    """
+    # Determine strictness checker
+    if not find_checker(raw_log.get("task_name")):
+        print(f"Warning: No checker found for task '{raw_log.get('task_name')}' in {source}")
+        return None
+    return build_metric(raw_log, evaluate_verdict(raw_log, ground_truth))
+
+# Ground truth of the run being aggregated, set in the parent before the
+# worker pool forks so workers inherit it instead of unpickling it per task
+_WORKER_GROUND_TRUTH: Optional[GroundTruth] = None
+
+def _init_worker(ground_truth: Optional[GroundTruth]):
+    # With fork the global is already inherited (ground_truth is None);
+    # spawn-only platforms receive one copy per worker here
+    global _WORKER_GROUND_TRUTH
+    if ground_truth is not None:
+        _WORKER_GROUND_TRUTH = ground_truth
+
+def _evaluate_batch(batch: List[Dict]) -> List[Dict]:
+    return [evaluate_verdict(raw_log, _WORKER_GROUND_TRUTH) for raw_log in batch]
+
+def _iter_batches(items: Iterator, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _evaluate_window(
+    window: List[Tuple[str, Dict]],
+    ground_truth: GroundTruth,
+    memo: Optional[EvaluationMemo],
+    pool,
+    batch_size: int
+) -> List[Optional[Dict]]:
+    """
+    Evaluates a window of logs: memo hits are answered directly, identical
+    outputs within the window are evaluated once, the rest are evaluated
+    (on `pool` if given) and stored in the memo.
+    """
+    verdicts: List[Optional[Dict]] = [None] * len(window)
+    pending: Dict[Any, List[int]] = {}
+    for i, (source, raw_log) in enumerate(window):
+        if not find_checker(raw_log.get("task_name")):
+            print(f"Warning: No checker found for task '{raw_log.get('task_name')}' in {source}")
+            continue
+        key = EvaluationMemo.key_for_log(raw_log, ground_truth.digest) if memo is not None else None
+        if key is None:
+            pending[("log", i)] = [i]
+        elif key in pending:
+            # Same output as a log already queued in this window
+            memo.record_hit()
+            pending[key].append(i)
         else:
-             metric_entry["failure_category"] = classify_failure(correctness_res) # Logic reuse
-             
-        results.append(metric_entry)
-        
+            cached = memo.get(key)
+            if cached is not None:
+                verdicts[i] = cached
+            else:
+                pending[key] = [i]
+
+    todo = [window[positions[0]][1] for positions in pending.values()]
+    if pool is not None:
+        results = (v for batch in pool.imap(_evaluate_batch, _iter_batches(todo, batch_size)) for v in batch)
+    else:
+        results = (evaluate_verdict(raw_log, ground_truth) for raw_log in todo)
+
+    for (key, positions), verdict in zip(pending.items(), results):
+        if not isinstance(key, tuple):
+            memo.put(key, verdict)
+        for i in positions:
+            verdicts[i] = verdict
+
+    return [
+        build_metric(raw_log, verdict) if verdict is not None else None
+        for (_, raw_log), verdict in zip(window, verdicts)
+    ]
+
+def evaluate_logs(
+    logs: Iterator[Tuple[str, Dict]],
+    ground_truth: GroundTruth,
+    workers: int = 1,
+    batch_size: int = 64,
+    memo: Optional[EvaluationMemo] = None
+) -> Iterator[Optional[Dict]]:
+    """
+    evaluate_log over (source, raw_log) pairs, in order. Yields None for
+    logs without a checker.
+
+    With workers > 1, logs are checked on a process pool in batches;
+    results come back in submission order, so the output matches
+    workers=1. With a memo, outputs already evaluated against this dataset
+    are not checked again.
+    """
+    if workers <= 1 and memo is None:
+        yield from (evaluate_log(source, raw_log, ground_truth) for source, raw_log in logs)
+        return
+
+    window_size = batch_size * max(workers, 1) * 4
+    if workers <= 1:
+        for window in _iter_batches(logs, window_size):
+            yield from _evaluate_window(window, ground_truth, memo, None, batch_size)
+        return
+
+    global _WORKER_GROUND_TRUTH
+    use_fork = "fork" in multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if use_fork else None)
+    _WORKER_GROUND_TRUTH = ground_truth
+    try:
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(None if use_fork else ground_truth,)) as pool:
+            for window in _iter_batches(logs, window_size):
+                yield from _evaluate_window(window, ground_truth, memo, pool, batch_size)
+    finally:
+        _WORKER_GROUND_TRUTH = None
+
+def aggregate_run(
+    run_dir: str,
+    dataset_records: Optional[List[Dict]] = None,
+    workers: int = 1,
+    batch_size: int = 64,
+    memo: Optional[EvaluationMemo] = None
+) -> List[Dict]:
+    """
+    Aggregates results for a specific run directory.
+    
+    Args:
+        run_dir: Path to the run directory (e.g. runs/run_xyz)
+        dataset_records: The list of dict records used as input. 
+                         If None, uses the dataset stored in the run directory
+                         (and its cached ground truth), else generates the
+                         default 200-record dataset.
+        workers: Processes evaluating logs. Above 1, logs are parsed and
+                 checked on a process pool that inherits the ground truth
+                 (fork); results keep the same order as a serial run.
+        batch_size: Logs sent to a worker at a time when workers > 1.
+        memo: Verdict cache shared across calls (optionally persisted, see
+              EvaluationMemo). A fresh in-memory memo is used if None, so
+              repeated outputs within the run are checked once.
+    
+    Returns:
+        List of metric dictionaries.
+    """
+    
+    # 1. Ensure Dataset
+    # Expected results, id maps and flattened rows, computed once for all logs
+    # (or loaded from the run's ground-truth cache)
+    ground_truth = None
+    if dataset_records is None:
+        ground_truth = load_run_ground_truth(run_dir)
+    if ground_truth is None:
+        if dataset_records is None:
+            # Default fallback
+            print("Warning: No dataset provided to aggregator. Generating default (Seed 42, Count 200).")
+            gen = DatasetGenerator(seed=42, count=200)
+            dataset_records = gen.generate()
+        ground_truth = GroundTruth(dataset_records)
+    
+    # 2. Iterate Logs (segments, then per-file JSON and TOON folders)
+    # 3. Parse, evaluate and score each log
+    memo = memo if memo is not None else EvaluationMemo()
+    start_stats = dict(memo.stats)
+    entries = evaluate_logs(iter_run_logs(run_dir), ground_truth, workers, batch_size, memo=memo)
+    results = [entry for entry in entries if entry is not None]
+
+    hits = memo.stats["hits"] - start_stats["hits"]
+    lookups = hits + memo.stats["misses"] - start_stats["misses"]
+    if lookups:
+        print(f"Evaluation memo: {hits}/{lookups} outputs reused ({hits / lookups:.1%} hit rate)")
     return results
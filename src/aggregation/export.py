@@ -1,125 +1,170 @@
 import csv
 import os
-from collections import defaultdict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-def write_summary(metrics: List[Dict[str, Any]], output_dir: str):
-    """
-    Writes summary statistics per (task, format) to CSV.
-    """
-    # 1. Group Data
-    grouped = defaultdict(list)
-    for m in metrics:
-        key = (m["task"], m["format"])
-        grouped[key].append(m)
-        
-    # 2. Compute Aggregates
-    rows = []
-    headers = [
-        "task", "format", 
-        "mean_input_tokens", "mean_output_tokens", "mean_total_tokens",
-        "mean_estimated_cost", "correctness_rate", "error_rate"
-    ]
+from src.aggregation.accumulators import GroupAccumulator, accumulate
+from src.aggregation.stats import wilson_interval
+
+LATENCY_PERCENTILES = [50, 95, 99]
+
+def _round_or_none(value: Optional[float], digits: int) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+SUMMARY_HEADERS = [
+    "task", "format", 
+    "mean_input_tokens", "mean_output_tokens", "mean_total_tokens",
+    "mean_estimated_cost", "mean_input_cost", "mean_output_cost", "correctness_rate", "error_rate"
+]
+for _name in ["ttft_ms", "latency_ms"]:
+    SUMMARY_HEADERS += [f"p{p}_{_name}" for p in LATENCY_PERCENTILES]
+SUMMARY_HEADERS += ["mean_output_tokens_per_sec", "abort_rate", "total_tokens_saved"]
+SUMMARY_HEADERS += ["mean_retries", "hedge_rate", "total_wasted_tokens", "total_wasted_cost", "backend_error_rate"]
+SUMMARY_HEADERS += ["std_total_tokens", "std_estimated_cost", "correctness_ci_low", "correctness_ci_high"]
+
+def summary_row(task: str, fmt: str, acc: GroupAccumulator) -> Dict[str, Any]:
+    """One summary.csv row from a (task, format) accumulator."""
+    correctness = acc.rate("is_correct")
     
-    for (task, fmt), items in grouped.items():
-        count = len(items)
-        if count == 0:
-            continue
-            
-        avg_in = sum(i["input_tokens"] for i in items) / count
-        avg_out = sum(i["output_tokens"] for i in items) / count
-        avg_total = sum(i["total_tokens"] for i in items) / count
-        avg_cost = sum(i["estimated_cost"] for i in items) / count
-        
-        correct_count = sum(1 for i in items if i["is_correct"])
-        correctness = correct_count / count
-        
-        rows.append({
-            "task": task,
-            "format": fmt,
-            "mean_input_tokens": round(avg_in, 2),
-            "mean_output_tokens": round(avg_out, 2),
-            "mean_total_tokens": round(avg_total, 2),
-            "mean_estimated_cost": round(avg_cost, 6),
-            "correctness_rate": round(correctness, 4),
-            "error_rate": round(1.0 - correctness, 4)
-        })
+    # Streaming metrics: latency distribution (only calls that recorded timing) and early aborts
+    streaming_cols = {}
+    for name in ["ttft_ms", "latency_ms"]:
+        for p in LATENCY_PERCENTILES:
+            streaming_cols[f"p{p}_{name}"] = _round_or_none(acc.percentile(name, p), 3)
+    if acc.keep_values:
+        tps = acc.values["output_tokens_per_sec"]
+        mean_tps = sum(tps) / len(tps) if tps else None
+    else:
+        tps_stats = acc.moments["output_tokens_per_sec"]
+        mean_tps = tps_stats.mean if tps_stats.count else None
+    streaming_cols["mean_output_tokens_per_sec"] = _round_or_none(mean_tps, 2)
+    streaming_cols["abort_rate"] = round(acc.rate("aborted_early"), 4)
+    streaming_cols["total_tokens_saved"] = acc.sums["tokens_saved"]
+
+    # Resilience: what retries and hedging cost for the latency they buy
+    resilience_cols = {
+        "mean_retries": round(acc.mean("retries"), 4),
+        "hedge_rate": round(acc.rate("hedged"), 4),
+        "total_wasted_tokens": acc.sums["wasted_tokens"],
+        "total_wasted_cost": round(acc.sums["wasted_cost"], 6),
+        "backend_error_rate": round(acc.rate("backend_error"), 4)
+    }
+
+    # Spread and error bars (Wilson interval of the correctness rate)
+    ci_low, ci_high = wilson_interval(acc.counts["is_correct"], acc.count)
+    spread_cols = {
+        "std_total_tokens": round(acc.moments["total_tokens"].std, 2),
+        "std_estimated_cost": round(acc.moments["estimated_cost"].std, 6),
+        "correctness_ci_low": round(ci_low, 4),
+        "correctness_ci_high": round(ci_high, 4)
+    }
+
+    return {
+        "task": task,
+        "format": fmt,
+        "mean_input_tokens": round(acc.mean("input_tokens"), 2),
+        "mean_output_tokens": round(acc.mean("output_tokens"), 2),
+        "mean_total_tokens": round(acc.mean("total_tokens"), 2),
+        "mean_estimated_cost": round(acc.mean("estimated_cost"), 6),
+        "mean_input_cost": round(acc.mean("input_cost"), 6),
+        "mean_output_cost": round(acc.mean("output_cost"), 6),
+        "correctness_rate": round(correctness, 4),
+        "error_rate": round(1.0 - correctness, 4),
+        **streaming_cols,
+        **resilience_cols,
+        **spread_cols
+    }
+
+def write_summary_groups(groups: Dict[Tuple[str, str], GroupAccumulator], output_dir: str):
+    """Writes summary.csv from per-(task, format) accumulators."""
+    rows = [summary_row(task, fmt, acc) for (task, fmt), acc in groups.items() if acc.count > 0]
         
     # Sort for deterministic output: Task then Format
     rows.sort(key=lambda x: (x["task"], x["format"]))
 
-    # 3. Write CSV
     filepath = os.path.join(output_dir, "summary.csv")
     with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_HEADERS)
         writer.writeheader()
         writer.writerows(rows)
     print(f"Wrote summary to {filepath}")
 
-
-def write_per_task_metrics(metrics: List[Dict[str, Any]], output_dir: str):
+def write_summary(metrics: List[Dict[str, Any]], output_dir: str):
     """
-    Writes raw metrics for every run execution to CSV.
+    Writes summary statistics per (task, format) to CSV.
     """
-    headers = [
-        "run_id", "task", "format",
-        "input_tokens", "output_tokens", "total_tokens",
-        "estimated_cost", "is_correct", "error_types"
-    ]
+    write_summary_groups(accumulate(metrics), output_dir)
+
+
+PER_TASK_HEADERS = [
+    "run_id", "task", "format",
+    "input_tokens", "output_tokens", "total_tokens",
+    "input_cost", "output_cost", "estimated_cost", "n_samples",
+    "ttft_ms", "latency_ms", "output_tokens_per_sec",
+    "aborted_early", "tokens_saved", "attempts", "retries", "hedged", "wasted_tokens",
+    "is_correct", "error_types"
+]
+
+def per_task_row(m: Dict[str, Any]) -> Dict[str, Any]:
+    """One per_task_metrics.csv row for a metric entry."""
+    # Flatten error types slightly for CSV readability
+    errs = m.get("error_messages", [])
+    # Truncate or join
+    err_str = "; ".join(str(e) for e in errs[:5]).replace("\n", " ") 
     
-    rows = []
-    for m in metrics:
-        # Flatten error types slightly for CSV readability
-        errs = m.get("error_messages", [])
-        # Truncate or join
-        err_str = "; ".join(str(e) for e in errs[:5]).replace("\n", " ") 
-        
-        rows.append({
-            "run_id": m.get("run_id"),
-            "task": m.get("task"),
-            "format": m.get("format"),
-            "input_tokens": m.get("input_tokens"),
-            "output_tokens": m.get("output_tokens"),
-            "total_tokens": m.get("total_tokens"),
-            "estimated_cost": m.get("estimated_cost"),
-            "is_correct": m.get("is_correct"),
-            "error_types": err_str
-        })
-        
+    return {
+        "run_id": m.get("run_id"),
+        "task": m.get("task"),
+        "format": m.get("format"),
+        "input_tokens": m.get("input_tokens"),
+        "output_tokens": m.get("output_tokens"),
+        "total_tokens": m.get("total_tokens"),
+        "input_cost": m.get("input_cost"),
+        "output_cost": m.get("output_cost"),
+        "estimated_cost": m.get("estimated_cost"),
+        "n_samples": m.get("n_samples"),
+        "ttft_ms": m.get("ttft_ms"),
+        "latency_ms": m.get("latency_ms"),
+        "output_tokens_per_sec": m.get("output_tokens_per_sec"),
+        "aborted_early": m.get("aborted_early"),
+        "tokens_saved": m.get("tokens_saved"),
+        "attempts": m.get("attempts"),
+        "retries": m.get("retries"),
+        "hedged": m.get("hedged"),
+        "wasted_tokens": m.get("wasted_tokens"),
+        "is_correct": m.get("is_correct"),
+        "error_types": err_str
+    }
+
+def write_per_task_rows(rows: List[Dict[str, Any]], output_dir: str):
+    """Writes already-built per_task_metrics.csv rows."""
     # Sort for deterministic output
-    rows.sort(key=lambda x: (x.get("run_id", ""), x.get("task", ""), x.get("format", "")))
+    rows = sorted(rows, key=lambda x: (x.get("run_id", ""), x.get("task", ""), x.get("format", "")))
 
     filepath = os.path.join(output_dir, "per_task_metrics.csv")
     with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
+        writer = csv.DictWriter(f, fieldnames=PER_TASK_HEADERS)
         writer.writeheader()
         writer.writerows(rows)
     print(f"Wrote per-task metrics to {filepath}")
 
-
-def write_failure_breakdown(metrics: List[Dict[str, Any]], output_dir: str):
+def write_per_task_metrics(metrics: List[Dict[str, Any]], output_dir: str):
     """
-    Writes counts of failure types per (task, format).
+    Writes raw metrics for every run execution to CSV.
     """
-    # Group by (task, format, failure_type) -> count
-    counts = defaultdict(int)
-    
-    for m in metrics:
-        key = (
-            m["task"],
-            m["format"],
-            m.get("failure_category", "unknown")
-        )
-        counts[key] += 1
-        
+    write_per_task_rows([per_task_row(m) for m in metrics], output_dir)
+
+
+def write_failure_breakdown_groups(groups: Dict[Tuple[str, str], GroupAccumulator], output_dir: str):
+    """Writes failure_breakdown.csv from per-(task, format) accumulators."""
     rows = []
-    for (task, fmt, fail_type), count in counts.items():
-        rows.append({
-            "task": task,
-            "format": fmt,
-            "failure_type": fail_type,
-            "count": count
-        })
+    for (task, fmt), acc in groups.items():
+        for fail_type, count in acc.failures.items():
+            rows.append({
+                "task": task,
+                "format": fmt,
+                "failure_type": fail_type,
+                "count": count
+            })
         
     rows.sort(key=lambda x: (x["task"], x["format"], x["failure_type"]))
     
@@ -131,9 +176,16 @@ def write_failure_breakdown(metrics: List[Dict[str, Any]], output_dir: str):
         writer.writerows(rows)
     print(f"Wrote failure breakdown to {filepath}")
 
+def write_failure_breakdown(metrics: List[Dict[str, Any]], output_dir: str):
+    """
+    Writes counts of failure types per (task, format).
+    """
+    write_failure_breakdown_groups(accumulate(metrics), output_dir)
+
 
 def export_all(metrics: List[Dict[str, Any]], output_dir: str):
     os.makedirs(output_dir, exist_ok=True)
-    write_summary(metrics, output_dir)
+    groups = accumulate(metrics)
+    write_summary_groups(groups, output_dir)
     write_per_task_metrics(metrics, output_dir)
-    write_failure_breakdown(metrics, output_dir)
+    write_failure_breakdown_groups(groups, output_dir)
@@ -0,0 +1,269 @@
+import os
+import json
+import glob
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.dataset.generator import DatasetGenerator
+from src.evaluation.correctness import GroundTruth
+from src.evaluation.memo import EvaluationMemo
+from src.aggregation.aggregate import load_run_ground_truth, load_run_log, evaluate_logs
+from src.aggregation.accumulators import GroupAccumulator, accumulate, slim_metric, groups_to_dict, groups_from_dict
+from src.aggregation.export import write_summary_groups, write_per_task_rows, write_failure_breakdown_groups, per_task_row
+from src.runner.segments import SEGMENTS_DIR, list_segments, read_segment_delta
+from src.runner.async_logger import SPILL_PREFIX
+from src.runner.archive import pack_path, read_pack_index, iter_pack_records
+
+STATE_FILENAME = "aggregation_state.json"
+STATE_VERSION = 3
+
+
+class IncrementalAggregator:
+    """
+    Keeps results/ up to date for a run that is still being written.
+
+    The state file (results/aggregation_state.json by default) records what
+    has been evaluated: the byte offset reached in each segment / spill
+    file, the mtime and size of each per-file log, and per-(task, format)
+    accumulators. refresh() evaluates only what was appended or changed
+    since, then rewrites the CSVs from the accumulators.
+
+    A per-file log whose mtime or size changed is re-evaluated and its old
+    contribution removed. Logs are counted once per entry_id across all
+    sources. When a tracked file disappears (e.g. the run was packed, see
+    src/runner/archive.py) the state is rebuilt from what is on disk. State
+    built for another run or dataset is discarded.
+    """
+    def __init__(
+        self,
+        run_dir: str,
+        output_dir: str,
+        state_path: Optional[str] = None,
+        dataset_records: Optional[List[Dict]] = None,
+        workers: int = 1,
+        memo: Optional[EvaluationMemo] = None
+    ):
+        self.run_dir = run_dir
+        self.output_dir = output_dir
+        self.state_path = state_path or os.path.join(output_dir, STATE_FILENAME)
+        self.workers = workers
+        self.memo = memo if memo is not None else EvaluationMemo()
+        self._dataset_records = dataset_records
+        self._ground_truth: Optional[GroundTruth] = None
+        self._reset()
+
+    def _reset(self):
+        self.offsets: Dict[str, int] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.entry_ids: Dict[str, str] = {}
+        # source -> {"sort_key", "row" (per_task_metrics.csv), "metric" (slim)}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.groups: Dict[Tuple[str, str], GroupAccumulator] = {}
+
+    @property
+    def ground_truth(self) -> GroundTruth:
+        if self._ground_truth is None:
+            if self._dataset_records is not None:
+                self._ground_truth = GroundTruth(self._dataset_records)
+            else:
+                self._ground_truth = load_run_ground_truth(self.run_dir)
+            if self._ground_truth is None:
+                print("Warning: No dataset provided to aggregator. Generating default (Seed 42, Count 200).")
+                self._ground_truth = GroundTruth(DatasetGenerator(seed=42, count=200).generate())
+        return self._ground_truth
+
+    def load_state(self) -> bool:
+        """Loads saved state if it belongs to this run and dataset. Returns whether it did."""
+        if not os.path.exists(self.state_path):
+            return False
+        with open(self.state_path, "r") as f:
+            state = json.load(f)
+        if (state.get("version") != STATE_VERSION
+                or state.get("run_dir") != os.path.abspath(self.run_dir)
+                or state.get("dataset_digest") != self.ground_truth.digest):
+            print(f"Ignoring aggregation state in {self.state_path}: built for another run or dataset")
+            return False
+
+        self.offsets = state["offsets"]
+        self.files = state["files"]
+        self.entry_ids = state["entry_ids"]
+        self.entries = state["entries"]
+        self.groups = groups_from_dict(state["groups"])
+        return True
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        state = {
+            "version": STATE_VERSION,
+            "run_dir": os.path.abspath(self.run_dir),
+            "dataset_digest": self.ground_truth.digest,
+            "updated_at": time.time(),
+            "offsets": self.offsets,
+            "files": self.files,
+            "entry_ids": self.entry_ids,
+            "entries": self.entries,
+            "groups": groups_to_dict(self.groups)
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _claim(self, raw_log: Dict, source: str) -> bool:
+        """
+        Records `source` as the owner of the log's entry_id. False if another
+        source already owns it (an exported copy or a duplicate append).
+        """
+        entry_id = raw_log.get("entry_id")
+        if not entry_id:
+            return True
+        owner = self.entry_ids.get(entry_id)
+        if owner is not None and owner != source:
+            return False
+        self.entry_ids[entry_id] = source
+        return True
+
+    def _tracked_files_missing(self) -> bool:
+        return any(not os.path.exists(path) for path in list(self.offsets) + list(self.files))
+
+    def _scan(self) -> List[Tuple[str, Dict, Tuple]]:
+        """
+        Collects logs that are new or changed since the last refresh, as
+        (source, raw_log, sort_key), in the order aggregate_run reads them.
+        """
+        delta = []
+
+        # A packed run's archive: resume from the number of records already read
+        packed = pack_path(self.run_dir)
+        if os.path.exists(packed):
+            index = read_pack_index(packed)
+            start = self.offsets.get(packed, 0)
+            if index["records"] > start:
+                for record_no, raw_log in iter_pack_records(packed, start, index):
+                    source = f"{packed}#{record_no}"
+                    if self._claim(raw_log, source):
+                        delta.append((source, raw_log, (-1, packed, record_no)))
+                self.offsets[packed] = index["records"]
+
+        # Segments, then async-writer spills: append-only, resume from the saved offset
+        jsonl_paths = list_segments(os.path.join(self.run_dir, SEGMENTS_DIR))
+        jsonl_paths += sorted(glob.glob(os.path.join(self.run_dir, f"{SPILL_PREFIX}*.jsonl")))
+        for path in jsonl_paths:
+            start = self.offsets.get(path, 0)
+            if os.path.getsize(path) <= start:
+                continue
+            records, self.offsets[path] = read_segment_delta(path, start)
+            for offset, raw_log in records:
+                source = f"{path}@{offset}"
+                if self._claim(raw_log, source):
+                    delta.append((source, raw_log, (0, path, offset)))
+
+        # Per-file logs: re-evaluate when mtime or size changed
+        for filepath in sorted(glob.glob(os.path.join(self.run_dir, "*", "*.json"))):
+            if not os.path.isfile(filepath):
+                continue
+            stat = os.stat(filepath)
+            signature = {"mtime": stat.st_mtime, "size": stat.st_size}
+            if self.files.get(filepath) == signature:
+                continue
+            self.files[filepath] = signature
+
+            try:
+                raw_log = load_run_log(filepath)
+            except Exception as e:
+                print(f"Skipping corrupt log {filepath}: {e}")
+                continue
+
+            if self._claim(raw_log, filepath):
+                delta.append((filepath, raw_log, (1, filepath, 0)))
+
+        return delta
+
+    def refresh(self) -> Dict[str, int]:
+        """Evaluates new/changed logs and updates the accumulators. Returns counts."""
+        reset = self._tracked_files_missing()
+        if reset:
+            print(f"Logs of {self.run_dir} were removed or packed; re-aggregating from scratch")
+            self._reset()
+        delta = self._scan()
+        replaced = 0
+        for source, _, _ in delta:
+            old = self.entries.pop(source, None)
+            if old is not None:
+                self.groups[(old["metric"]["task"], old["metric"]["format"])].remove(old["metric"])
+                replaced += 1
+
+        logs = ((source, raw_log) for source, raw_log, _ in delta)
+        metrics = evaluate_logs(logs, self.ground_truth, workers=self.workers, memo=self.memo)
+        evaluated = 0
+        for (source, _, sort_key), metric in zip(delta, metrics):
+            if metric is None:
+                continue
+            accumulate([metric], self.groups)
+            self.entries[source] = {
+                "sort_key": list(sort_key),
+                "row": per_task_row(metric),
+                "metric": slim_metric(metric)
+            }
+            evaluated += 1
+
+        return {"evaluated": evaluated, "replaced": replaced, "total": len(self.entries), "reset": int(reset)}
+
+    def export(self):
+        """Rewrites summary.csv, per_task_metrics.csv and failure_breakdown.csv."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        ordered = sorted(self.entries.values(), key=lambda e: e["sort_key"])
+        write_summary_groups(self.groups, self.output_dir)
+        write_per_task_rows([e["row"] for e in ordered], self.output_dir)
+        write_failure_breakdown_groups(self.groups, self.output_dir)
+
+    def update(self) -> Dict[str, int]:
+        """refresh() + export() + save_state(); the CSVs are only rewritten when something changed."""
+        counts = self.refresh()
+        if counts["evaluated"] or counts["reset"] or not os.path.exists(os.path.join(self.output_dir, "summary.csv")):
+            self.export()
+        self.save_state()
+        return counts
+
+
+def watch(aggregator: IncrementalAggregator, interval_s: float = 60.0, max_updates: Optional[int] = None):
+    """Polls the run directory and updates results every `interval_s` seconds until interrupted."""
+    updates = 0
+    while True:
+        counts = aggregator.update()
+        updates += 1
+        print(f"[{time.strftime('%H:%M:%S')}] evaluated {counts['evaluated']} new/changed logs "
+              f"({counts['total']} total)")
+        if max_updates is not None and updates >= max_updates:
+            return
+        time.sleep(interval_s)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incrementally aggregate a run into results CSVs")
+    parser.add_argument("run_dir", type=str, help="Run directory (runs/<run_id>)")
+    parser.add_argument("--output", type=str, default="results", help="Results directory")
+    parser.add_argument("--state", type=str, default=None, help=f"State file (default: <output>/{STATE_FILENAME})")
+    parser.add_argument("--workers", type=int, default=1, help="Processes evaluating logs")
+    parser.add_argument("--memo", type=str, default=None, help="JSONL file persisting evaluation verdicts")
+    parser.add_argument("--full", action="store_true", help="Ignore saved state and re-evaluate everything")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the run directory")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between polls with --watch")
+    args = parser.parse_args()
+
+    aggregator = IncrementalAggregator(args.run_dir, args.output, state_path=args.state, workers=args.workers,
+                                       memo=EvaluationMemo(args.memo))
+    if not args.full:
+        aggregator.load_state()
+
+    if args.watch:
+        try:
+            watch(aggregator, args.interval)
+        except KeyboardInterrupt:
+            pass
+    else:
+        counts = aggregator.update()
+        print(f"Evaluated {counts['evaluated']} new/changed logs ({counts['total']} total)")
+    aggregator.memo.close()
@@ -23,9 +23,27 @@ def compute_metrics(
     total_tokens = usage.get("total_tokens", 0)
     
     # Cost calculation ($)
-    input_cost = (input_tokens / 1_000_000) * COST_PER_1M_INPUT_TOKENS
+    # Samples from one multi-completion request split its input cost;
+    # output is billed per sample
+    billed_input_tokens = usage.get("billed_input_tokens", input_tokens)
+    input_cost = (billed_input_tokens / 1_000_000) * COST_PER_1M_INPUT_TOKENS
     output_cost = (output_tokens / 1_000_000) * COST_PER_1M_OUTPUT_TOKENS
     estimated_cost = input_cost + output_cost
+
+    # Latency (absent in logs written before streaming execution)
+    timing = raw_log.get("timing", {}) or {}
+    early_abort = raw_log.get("early_abort", {}) or {}
+
+    # Retries / hedging: tokens billed for abandoned hedge requests
+    # (logs without the input/output split priced all of them as input)
+    resilience = raw_log.get("resilience", {}) or {}
+    wasted_tokens = resilience.get("wasted_tokens", 0)
+    wasted_input_tokens = resilience.get("wasted_input_tokens", wasted_tokens)
+    wasted_output_tokens = resilience.get("wasted_output_tokens", 0)
+    wasted_cost = (
+        (wasted_input_tokens / 1_000_000) * COST_PER_1M_INPUT_TOKENS
+        + (wasted_output_tokens / 1_000_000) * COST_PER_1M_OUTPUT_TOKENS
+    )
     
     # 2. Correctness Metrics
     is_correct = correctness_result.get("is_correct", False)
@@ -34,6 +52,7 @@ def compute_metrics(
     # 3. Result Construction
     return {
         "run_id": raw_log.get("run_id"),
+        "entry_id": raw_log.get("entry_id"),
         "task": task_name,
         "format": format_name,
         "model": raw_log.get("model"),
@@ -43,7 +62,28 @@ def compute_metrics(
         "input_tokens": input_tokens,
         "output_tokens": output_tokens,
         "total_tokens": total_tokens,
+        "billed_input_tokens": billed_input_tokens,
+        "input_cost": round(input_cost, 8),
+        "output_cost": round(output_cost, 8),
         "estimated_cost": round(estimated_cost, 8),
+        "n_samples": (raw_log.get("sampling") or {}).get("n_samples", 1),
+
+        # Latency
+        "ttft_ms": timing.get("ttft_ms"),
+        "latency_ms": timing.get("latency_ms"),
+        "output_tokens_per_sec": timing.get("output_tokens_per_sec"),
+
+        # Streaming validation
+        "aborted_early": bool(early_abort.get("aborted_early", False)),
+        "tokens_saved": early_abort.get("tokens_saved", 0),
+
+        # Resilience
+        "attempts": resilience.get("attempts", 1),
+        "retries": resilience.get("retries", 0),
+        "hedged": bool(resilience.get("hedged", False)),
+        "wasted_tokens": wasted_tokens,
+        "wasted_cost": round(wasted_cost, 8),
+        "backend_error": bool(raw_log.get("error")),
         
         # Correctness
         "is_correct": is_correct,
@@ -0,0 +1,219 @@
+import os
+import csv
+import glob
+import json
+import hashlib
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.aggregation.aggregate import aggregate_run
+from src.aggregation.accumulators import GroupAccumulator, accumulate, merge_groups, groups_to_dict, groups_from_dict
+from src.aggregation.export import SUMMARY_HEADERS, summary_row
+from src.evaluation.memo import EvaluationMemo, EVALUATION_VERSION
+from src.runner.logger import DATASET_FILENAME, load_run_manifest
+from src.runner.segments import SEGMENTS_DIR
+from src.runner.async_logger import SPILL_PREFIX
+from src.runner.archive import pack_path
+
+# Per-run aggregates, stored in the run directory
+RUN_CACHE_FILENAME = "aggregate_cache.json"
+RUN_CACHE_VERSION = 1
+
+RUN_KEY_HEADERS = ["run_id", "model", "dataset_size"]
+COMBINED_KEY_HEADERS = ["model", "dataset_size", "runs"]
+
+
+def discover_runs(
+    runs_root: str = "runs",
+    models: Optional[List[str]] = None,
+    sizes: Optional[List[int]] = None,
+    statuses: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Runs under `runs_root` described by their manifest.json, optionally
+    filtered by model, dataset size and status. Directories without a
+    manifest are not runs and are skipped. Sorted by creation time.
+    """
+    runs = []
+    for run_dir in sorted(glob.glob(os.path.join(runs_root, "*"))):
+        manifest = load_run_manifest(run_dir) if os.path.isdir(run_dir) else None
+        if manifest is None:
+            continue
+        run = {
+            "run_id": manifest.get("run_id") or os.path.basename(run_dir),
+            "run_dir": run_dir,
+            "model": manifest.get("model"),
+            "dataset_size": manifest.get("dataset_size"),
+            "status": manifest.get("status"),
+            "created_at": manifest.get("created_at") or ""
+        }
+        if models is not None and run["model"] not in models:
+            continue
+        if sizes is not None and run["dataset_size"] not in sizes:
+            continue
+        if statuses is not None and run["status"] not in statuses:
+            continue
+        runs.append(run)
+    runs.sort(key=lambda r: (r["created_at"], r["run_id"]))
+    return runs
+
+
+def run_signature(run_dir: str) -> str:
+    """
+    Digest of everything a run's aggregates depend on: path, size and
+    mtime of its logs (pack, segments, spills, per-file logs) and dataset, plus
+    the evaluator version. Changes whenever the run needs re-aggregating.
+    """
+    paths = [pack_path(run_dir)]
+    paths += glob.glob(os.path.join(run_dir, SEGMENTS_DIR, "*"))
+    paths += glob.glob(os.path.join(run_dir, f"{SPILL_PREFIX}*.jsonl"))
+    paths += glob.glob(os.path.join(run_dir, "*", "*.json"))
+    paths.append(os.path.join(run_dir, DATASET_FILENAME))
+
+    h = hashlib.sha256(f"{RUN_CACHE_VERSION}:{EVALUATION_VERSION}".encode("utf-8"))
+    for path in sorted(p for p in paths if os.path.isfile(p)):
+        stat = os.stat(path)
+        h.update(f"\0{os.path.relpath(path, run_dir)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def aggregate_one(run: Dict[str, Any], memo: Optional[EvaluationMemo] = None, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Per-(task, format) accumulators of one run (bounded-memory ones, see
+    GroupAccumulator). Read from the run's cache when its
+    signature still matches, else aggregated and cached.
+    Returns {**run, "signature", "calls", "groups", "cached"}.
+    """
+    cache_path = os.path.join(run["run_dir"], RUN_CACHE_FILENAME)
+    signature = run_signature(run["run_dir"])
+    if not refresh and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+            if cache.get("signature") == signature:
+                return {**run, **cache, "groups": groups_from_dict(cache["groups"]), "cached": True}
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring unreadable aggregate cache {cache_path}: {e}")
+
+    metrics = aggregate_run(run["run_dir"], memo=memo)
+    groups = accumulate(metrics)
+    cache = {"signature": signature, "calls": len(metrics), "groups": groups_to_dict(groups)}
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+    return {**run, **cache, "groups": groups, "cached": False}
+
+
+def _aggregate_in_worker(args: Tuple[Dict[str, Any], bool]) -> Dict[str, Any]:
+    run, refresh = args
+    result = aggregate_one(run, refresh=refresh)
+    # Serialized back to the parent in the cache's JSON form
+    return {**result, "groups": groups_to_dict(result["groups"])}
+
+
+def aggregate_runs(
+    runs: List[Dict[str, Any]],
+    workers: int = 1,
+    memo: Optional[EvaluationMemo] = None,
+    refresh: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    aggregate_one over many runs, in order. With workers > 1 the runs are
+    aggregated on a process pool, one run per task; each worker then uses
+    its own in-memory verdict memo (`memo` is only used serially).
+    """
+    if workers <= 1:
+        memo = memo if memo is not None else EvaluationMemo()
+        return [aggregate_one(run, memo=memo, refresh=refresh) for run in runs]
+
+    use_fork = "fork" in multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if use_fork else None)
+    with ctx.Pool(workers) as pool:
+        results = pool.map(_aggregate_in_worker, [(run, refresh) for run in runs], chunksize=1)
+    for result in results:
+        result["groups"] = groups_from_dict(result["groups"])
+    return results
+
+
+def combine(results: List[Dict[str, Any]]) -> Dict[Tuple[Any, Any], Dict[str, Any]]:
+    """
+    Merges the runs' accumulators per (model, dataset size):
+    {(model, size): {"runs": [run ids], "groups": {(task, format): GroupAccumulator}}}.
+    """
+    combined: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    for result in results:
+        key = (result["model"], result["dataset_size"])
+        entry = combined.setdefault(key, {"runs": [], "shards": []})
+        entry["runs"].append(result["run_id"])
+        entry["shards"].append(result["groups"])
+    return {
+        key: {"runs": entry["runs"], "groups": merge_groups(*entry["shards"])}
+        for key, entry in combined.items()
+    }
+
+
+def _summary_rows(keys: Dict[str, Any], groups: Dict[Tuple[str, str], GroupAccumulator]) -> List[Dict[str, Any]]:
+    return [{**keys, **summary_row(task, fmt, acc)} for (task, fmt), acc in sorted(groups.items()) if acc.count > 0]
+
+
+def _write_csv(path: str, headers: List[str], rows: List[Dict[str, Any]]):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Wrote {len(rows)} rows to {path}")
+
+
+def export_combined(results: List[Dict[str, Any]], output_dir: str):
+    """
+    Writes runs_summary.csv (one summary row per run, task and format),
+    combined_summary.csv (runs merged per model and dataset size) and
+    combined_failure_breakdown.csv. Percentiles are sketch estimates.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    run_rows = []
+    for result in results:
+        keys = {"run_id": result["run_id"], "model": result["model"], "dataset_size": result["dataset_size"]}
+        run_rows += _summary_rows(keys, result["groups"])
+    _write_csv(os.path.join(output_dir, "runs_summary.csv"), RUN_KEY_HEADERS + SUMMARY_HEADERS, run_rows)
+
+    combined_rows, failure_rows = [], []
+    order = lambda item: (str(item[0][0]), item[0][1] or 0)
+    for (model, size), entry in sorted(combine(results).items(), key=order):
+        keys = {"model": model, "dataset_size": size, "runs": len(entry["runs"])}
+        combined_rows += _summary_rows(keys, entry["groups"])
+        for (task, fmt), acc in sorted(entry["groups"].items()):
+            for failure_type, count in sorted(acc.failures.items()):
+                failure_rows.append({
+                    "model": model, "dataset_size": size, "task": task, "format": fmt,
+                    "failure_type": failure_type, "count": count
+                })
+    _write_csv(os.path.join(output_dir, "combined_summary.csv"), COMBINED_KEY_HEADERS + SUMMARY_HEADERS, combined_rows)
+    _write_csv(
+        os.path.join(output_dir, "combined_failure_breakdown.csv"),
+        ["model", "dataset_size", "task", "format", "failure_type", "count"],
+        failure_rows
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aggregate many run directories and export combined summaries")
+    parser.add_argument("--runs", type=str, default="runs", help="Directory holding the run directories")
+    parser.add_argument("--output", type=str, default=os.path.join("results", "multirun"), help="Output directory")
+    parser.add_argument("--workers", type=int, default=1, help="Runs aggregated in parallel")
+    parser.add_argument("--model", action="append", dest="models", help="Only runs of this model (repeatable)")
+    parser.add_argument("--size", action="append", dest="sizes", type=int, help="Only runs of this dataset size (repeatable)")
+    parser.add_argument("--status", action="append", dest="statuses", help="Only runs with this manifest status (repeatable)")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached per-run aggregates")
+    args = parser.parse_args()
+
+    runs = discover_runs(args.runs, models=args.models, sizes=args.sizes, statuses=args.statuses)
+    print(f"Found {len(runs)} runs in {args.runs}")
+    results = aggregate_runs(runs, workers=args.workers, refresh=args.refresh)
+    reused = sum(1 for r in results if r["cached"])
+    print(f"Reused cached aggregates for {reused}/{len(results)} runs")
+    export_combined(results, args.output)
@@ -0,0 +1,305 @@
+import math
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Resampled values drawn per NumPy batch in bootstrap_mean_diff_ci (bounds its memory)
+BOOTSTRAP_BATCH_ELEMENTS = 1 << 22
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Linear-interpolated percentile (same convention as numpy's default).
+    Returns None for an empty list.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lo = int(rank)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+def z_score(confidence: float) -> float:
+    """Two-sided normal quantile, e.g. 1.96 for 0.95."""
+    return NormalDist().inv_cdf(0.5 + confidence / 2.0)
+
+
+class RunningStats:
+    """
+    Count, mean and variance of a stream in one pass (Welford), in O(1)
+    memory. add() and remove() are inverses (up to rounding), and merge()
+    combines the stats of two shards as if their values had been added to
+    one (Chan et al.).
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def add_many(self, values: Iterable[float]):
+        """Adds a batch of values (moments computed with NumPy, then merged)."""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(np.square(values - batch.mean).sum())
+        self.merge(batch)
+
+    def remove(self, x: float):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.count * self.mean - x) / (self.count - 1)
+        self.m2 = max(self.m2 - (x - self.mean) * (x - mean), 0.0)
+        self.mean = mean
+        self.count -= 1
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        if other.count:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+            self.mean += delta * other.count / count
+            self.count = count
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 below two values)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def stderr(self) -> float:
+        return self.std / math.sqrt(self.count) if self.count else 0.0
+
+    def interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """Normal-approximation confidence interval of the mean."""
+        half = z_score(confidence) * self.stderr
+        return self.mean - half, self.mean + half
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningStats":
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = data["count"], data["mean"], data["m2"]
+        return stats
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy `alpha`: values are
+    counted in logarithmic buckets (x in (gamma^(k-1), gamma^k], gamma =
+    (1 + alpha) / (1 - alpha)), so any quantile is returned within alpha of
+    its true value. Memory grows with the log of the value range, not with
+    the number of values. Merging adds bucket counts; remove() decrements.
+    """
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self.gamma = (1.0 + alpha) / (1.0 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zeros = 0
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+
+    def _bucket(self, x: float) -> Tuple[Optional[Dict[int, int]], int]:
+        if x == 0:
+            return None, 0
+        bins = self.positive if x > 0 else self.negative
+        return bins, math.ceil(math.log(abs(x)) / self._log_gamma)
+
+    def add(self, x: float, n: int = 1):
+        bins, key = self._bucket(x)
+        if bins is None:
+            self.zeros += n
+        else:
+            bins[key] = bins.get(key, 0) + n
+        self.count += n
+
+    def add_many(self, values: Iterable[float]):
+        """Adds many values at once (bucketed with NumPy)."""
+        values = np.asarray(values, dtype=np.float64)
+        self.zeros += int(np.count_nonzero(values == 0))
+        self.count += len(values)
+        for bins, side in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            keys, counts = np.unique(np.ceil(np.log(side) / self._log_gamma).astype(np.int64), return_counts=True)
+            for key, n in zip(keys.tolist(), counts.tolist()):
+                bins[key] = bins.get(key, 0) + n
+
+    def remove(self, x: float):
+        bins, key = self._bucket(x)
+        if bins is None:
+            self.zeros -= 1
+        else:
+            bins[key] -= 1
+            if not bins[key]:
+                del bins[key]
+        self.count -= 1
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.gamma != self.gamma:
+            raise ValueError(f"Cannot merge sketches with alpha {self.alpha} and {other.alpha}")
+        self.count += other.count
+        self.zeros += other.zeros
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, n in other_bins.items():
+                bins[key] = bins.get(key, 0) + n
+        return self
+
+    def _value(self, key: int) -> float:
+        # Midpoint (in relative terms) of the bucket
+        return 2.0 * self.gamma ** key / (self.gamma + 1.0)
+
+    def _value_at(self, rank: int) -> float:
+        """Estimate of the rank-th smallest value (0-based)."""
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Value at quantile q (0..1), or None if empty. Interpolated between
+        the neighbouring ranks like percentile(), so small samples agree.
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        lo = int(rank)
+        value = self._value_at(lo)
+        if rank > lo:
+            value += (self._value_at(lo + 1) - value) * (rank - lo)
+        return value
+
+    def percentile(self, pct: float) -> Optional[float]:
+        return self.quantile(pct / 100.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # JSON object keys are strings
+        return {
+            "alpha": self.alpha,
+            "count": self.count,
+            "zeros": self.zeros,
+            "positive": {str(k): n for k, n in self.positive.items()},
+            "negative": {str(k): n for k, n in self.negative.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["alpha"])
+        sketch.count, sketch.zeros = data["count"], data["zeros"]
+        sketch.positive = {int(k): n for k, n in data["positive"].items()}
+        sketch.negative = {int(k): n for k, n in data["negative"].items()}
+        return sketch
+
+
+def wilson_interval(successes: int, n: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Wilson score interval of a success rate. Unlike the normal
+    approximation it stays inside [0, 1] and is usable at rates of 0 or 1
+    and small n. (0, 1) when n is 0.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    z = z_score(confidence)
+    p = successes / n
+    denominator = 1.0 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    low = 0.0 if successes <= 0 else max(0.0, center - half)
+    high = 1.0 if successes >= n else min(1.0, center + half)
+    return low, high
+
+
+def newcombe_interval(
+    successes_a: int, n_a: int,
+    successes_b: int, n_b: int,
+    confidence: float = 0.95
+) -> Tuple[float, float, float]:
+    """
+    rate(a) - rate(b) with Newcombe's hybrid score interval, built from
+    the two Wilson intervals, so it stays informative at rates of 0 or 1.
+    Returns (difference, low, high).
+    """
+    p_a = successes_a / n_a if n_a else 0.0
+    p_b = successes_b / n_b if n_b else 0.0
+    low_a, high_a = wilson_interval(successes_a, n_a, confidence)
+    low_b, high_b = wilson_interval(successes_b, n_b, confidence)
+    diff = p_a - p_b
+    return (
+        diff,
+        diff - math.sqrt((p_a - low_a) ** 2 + (high_b - p_b) ** 2),
+        diff + math.sqrt((high_a - p_a) ** 2 + (p_b - low_b) ** 2)
+    )
+
+
+def mean_diff_interval(a: RunningStats, b: RunningStats, confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    mean(a) - mean(b) with a normal (Welch) interval, from streamed stats
+    alone. Returns (difference, low, high).
+    """
+    diff = a.mean - b.mean
+    half = z_score(confidence) * math.sqrt(a.stderr ** 2 + b.stderr ** 2)
+    return diff, diff - half, diff + half
+
+
+def bootstrap_mean_diff_ci(
+    a: Iterable[float],
+    b: Iterable[float],
+    n_resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0
+) -> Optional[Tuple[float, float, float]]:
+    """
+    mean(a) - mean(b) with a percentile bootstrap interval: both samples
+    are resampled with replacement `n_resamples` times, in NumPy batches of
+    about BOOTSTRAP_BATCH_ELEMENTS draws. Seeded, so reports are
+    reproducible. Returns (difference, low, high), or None if a sample is
+    empty. Cost is O(n_resamples * (len(a) + len(b))).
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if not len(a) or not len(b):
+        return None
+
+    rng = np.random.default_rng(seed)
+
+    def resampled_means(values: np.ndarray) -> np.ndarray:
+        n = len(values)
+        batch = max(1, BOOTSTRAP_BATCH_ELEMENTS // n)
+        means = []
+        for start in range(0, n_resamples, batch):
+            rows = min(batch, n_resamples - start)
+            means.append(values[rng.integers(0, n, size=(rows, n))].mean(axis=1))
+        return np.concatenate(means)
+
+    diffs = resampled_means(a) - resampled_means(b)
+    tail = (1.0 - confidence) / 2.0
+    low, high = np.quantile(diffs, [tail, 1.0 - tail])
+    return float(a.mean() - b.mean()), float(low), float(high)
@@ -0,0 +1,361 @@
+import os
+import json
+import sqlite3
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.aggregation.accumulators import accumulate
+from src.aggregation.export import SUMMARY_HEADERS, summary_row, export_all
+from src.aggregation.stats import wilson_interval
+from src.aggregation.aggregate import aggregate_run
+from src.evaluation.memo import EvaluationMemo
+from src.runner.logger import load_run_manifest
+
+DEFAULT_WAREHOUSE_PATH = os.path.join("results", "warehouse.sqlite")
+
+# Per-call metric fields stored in `calls` (see compute_metrics); flags are stored as 0/1
+CALL_FIELDS = [
+    "entry_id", "task", "format", "model", "timestamp",
+    "input_tokens", "output_tokens", "total_tokens", "billed_input_tokens",
+    "input_cost", "output_cost", "estimated_cost", "n_samples",
+    "ttft_ms", "latency_ms", "output_tokens_per_sec",
+    "aborted_early", "tokens_saved",
+    "attempts", "retries", "hedged", "wasted_tokens", "wasted_cost", "backend_error",
+    "is_correct", "error_count", "failure_category"
+]
+FLAG_FIELDS = ["aborted_early", "hedged", "backend_error", "is_correct"]
+
+# Error messages kept per call (per_task_metrics.csv shows the first 5)
+STORED_ERRORS = 5
+
+# Summary columns stored in `metrics` besides the group key
+METRIC_COLUMNS = [h for h in SUMMARY_HEADERS if h not in ("task", "format")]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    model TEXT,
+    dataset_size INTEGER,
+    created_at TEXT,
+    ingested_at TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    manifest TEXT
+);
+CREATE TABLE IF NOT EXISTS calls (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    call_index INTEGER NOT NULL,
+    {", ".join(CALL_FIELDS)},
+    error_messages TEXT,
+    PRIMARY KEY (run_id, call_index)
+);
+CREATE INDEX IF NOT EXISTS calls_group ON calls (run_id, task, format, model);
+CREATE INDEX IF NOT EXISTS calls_task ON calls (task, format, model);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    task TEXT NOT NULL,
+    format TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    {", ".join(METRIC_COLUMNS)},
+    PRIMARY KEY (run_id, task, format, model)
+);
+CREATE INDEX IF NOT EXISTS metrics_task ON metrics (task, format, model);
+CREATE TABLE IF NOT EXISTS failures (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    task TEXT NOT NULL,
+    format TEXT NOT NULL,
+    model TEXT NOT NULL,
+    failure_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (run_id, task, format, model, failure_type)
+);
+CREATE INDEX IF NOT EXISTS failures_task ON failures (task, format, model);
+"""
+
+
+def connect(db_path: str = DEFAULT_WAREHOUSE_PATH) -> sqlite3.Connection:
+    """
+    Opens the results warehouse (creating the schema if needed).
+
+    Same setup as the work queue: WAL mode, so reports can query while a run
+    is being ingested, and explicit BEGIN IMMEDIATE transactions for writes.
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _call_row(run_id: str, index: int, m: Dict[str, Any]) -> Tuple:
+    values = [int(bool(m.get(f))) if f in FLAG_FIELDS else m.get(f) for f in CALL_FIELDS]
+    errors = [str(e) for e in (m.get("error_messages") or [])[:STORED_ERRORS]]
+    return (run_id, index, *values, json.dumps(errors))
+
+
+def _group_rows(run_id: str, metrics: List[Dict[str, Any]]) -> Tuple[List[Tuple], List[Tuple]]:
+    """`metrics` and `failures` rows of a run: one summary per (task, format, model)."""
+    by_model: Dict[str, List[Dict[str, Any]]] = {}
+    for m in metrics:
+        by_model.setdefault(m.get("model") or "", []).append(m)
+
+    metric_rows, failure_rows = [], []
+    for model, model_metrics in by_model.items():
+        for (task, fmt), acc in accumulate(model_metrics).items():
+            summary = summary_row(task, fmt, acc)
+            metric_rows.append((run_id, task, fmt, model, acc.count, *[summary[c] for c in METRIC_COLUMNS]))
+            for failure_type, count in acc.failures.items():
+                failure_rows.append((run_id, task, fmt, model, failure_type, count))
+    return metric_rows, failure_rows
+
+
+def ingest_run(
+    conn: sqlite3.Connection,
+    run_id: str,
+    metrics: List[Dict[str, Any]],
+    manifest: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Stores a run's metric entries (aggregate_run output, in its order) with
+    their per-group summaries and failure counts. Idempotent: the run's
+    previous rows are replaced in the same transaction, so re-ingesting a
+    re-aggregated run never duplicates calls. Returns the number of calls.
+    """
+    manifest = manifest or {}
+    models = {m.get("model") for m in metrics}
+    model = manifest.get("model") or (models.pop() if len(models) == 1 else None)
+    metric_rows, failure_rows = _group_rows(run_id, metrics)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table in ("calls", "metrics", "failures"):
+            conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO runs (run_id, model, dataset_size, created_at, ingested_at, calls, manifest) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, model, manifest.get("dataset_size"), manifest.get("created_at"),
+             datetime.datetime.now(datetime.timezone.utc).isoformat(), len(metrics),
+             json.dumps(manifest) if manifest else None)
+        )
+        conn.executemany(
+            f"INSERT INTO calls VALUES ({', '.join('?' * (len(CALL_FIELDS) + 3))})",
+            (_call_row(run_id, i, m) for i, m in enumerate(metrics))
+        )
+        conn.executemany(
+            f"INSERT INTO metrics VALUES ({', '.join('?' * (len(METRIC_COLUMNS) + 5))})", metric_rows
+        )
+        conn.executemany("INSERT INTO failures VALUES (?, ?, ?, ?, ?, ?)", failure_rows)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return len(metrics)
+
+
+def ingest_run_dir(
+    conn: sqlite3.Connection,
+    run_dir: str,
+    workers: int = 1,
+    memo: Optional[EvaluationMemo] = None
+) -> int:
+    """Aggregates a run directory and ingests the result (the run id is the directory name)."""
+    run_id = os.path.basename(os.path.normpath(run_dir))
+    metrics = aggregate_run(run_dir, workers=workers, memo=memo)
+    return ingest_run(conn, run_id, metrics, load_run_manifest(run_dir))
+
+
+def _where(run_ids: Optional[List[str]] = None, table: str = "", **filters: Optional[str]) -> Tuple[str, List[Any]]:
+    """WHERE clause over run ids and equality filters (None = any), on columns of `table` if given."""
+    prefix = f"{table}." if table else ""
+    clauses, params = [], []
+    if run_ids is not None:
+        clauses.append(f"{prefix}run_id IN ({', '.join('?' * len(run_ids))})")
+        params += run_ids
+    for column, value in filters.items():
+        if value is not None:
+            clauses.append(f"{prefix}{column} = ?")
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def load_metrics(conn: sqlite3.Connection, run_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Metric entries as aggregate_run returned them (stored error messages only), in ingestion order."""
+    where, params = _where(run_ids)
+    metrics = []
+    for row in conn.execute(f"SELECT * FROM calls{where} ORDER BY run_id, call_index", params):
+        m = dict(row)
+        for f in FLAG_FIELDS:
+            m[f] = bool(m[f])
+        m["error_messages"] = json.loads(m["error_messages"] or "[]")
+        del m["call_index"]
+        metrics.append(m)
+    return metrics
+
+
+def export_views(conn: sqlite3.Connection, output_dir: str, run_ids: Optional[List[str]] = None):
+    """
+    Writes summary.csv, per_task_metrics.csv and failure_breakdown.csv for
+    the given runs (all by default) from the stored calls. For one run these
+    are the files export_all writes from its aggregate_run output.
+    """
+    export_all(load_metrics(conn, run_ids), output_dir)
+
+
+def list_runs(conn: sqlite3.Connection, model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Ingested runs, oldest first (by creation, then ingestion time)."""
+    where, params = _where(model=model)
+    rows = conn.execute(
+        f"SELECT run_id, model, dataset_size, created_at, ingested_at, calls FROM runs{where} "
+        "ORDER BY COALESCE(created_at, ingested_at), run_id", params
+    )
+    return [dict(r) for r in rows]
+
+
+def summary_rows(
+    conn: sqlite3.Connection,
+    run_ids: Optional[List[str]] = None,
+    model: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Per-(task, format) means pooled over every stored call of the selected
+    runs, with summary.csv's column names and rounding (the subset
+    summarize reads, including the correctness rate's Wilson interval).
+    """
+    where, params = _where(run_ids, model=model)
+    rows = conn.execute(
+        "SELECT task, format, COUNT(*) AS calls, "
+        "ROUND(AVG(input_tokens), 2) AS mean_input_tokens, ROUND(AVG(output_tokens), 2) AS mean_output_tokens, "
+        "ROUND(AVG(total_tokens), 2) AS mean_total_tokens, ROUND(AVG(estimated_cost), 6) AS mean_estimated_cost, "
+        "ROUND(AVG(input_cost), 6) AS mean_input_cost, ROUND(AVG(output_cost), 6) AS mean_output_cost, "
+        "ROUND(AVG(is_correct), 4) AS correctness_rate, ROUND(1.0 - AVG(is_correct), 4) AS error_rate, "
+        "SUM(is_correct) AS correct "
+        f"FROM calls{where} GROUP BY task, format ORDER BY task, format", params
+    )
+    summaries = []
+    for row in rows:
+        summary = dict(row)
+        ci_low, ci_high = wilson_interval(summary.pop("correct"), summary["calls"])
+        summary["correctness_ci_low"], summary["correctness_ci_high"] = round(ci_low, 4), round(ci_high, 4)
+        summaries.append(summary)
+    return summaries
+
+
+def failure_rows(
+    conn: sqlite3.Connection,
+    run_ids: Optional[List[str]] = None,
+    model: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """failure_breakdown.csv rows summed over the selected runs."""
+    where, params = _where(run_ids, model=model)
+    rows = conn.execute(
+        f"SELECT task, format, failure_type, SUM(count) AS count FROM failures{where} "
+        "GROUP BY task, format, failure_type ORDER BY task, format, failure_type", params
+    )
+    return [dict(r) for r in rows]
+
+
+def _metric_column(metric: str) -> str:
+    # Column names cannot be bound as parameters
+    if metric not in METRIC_COLUMNS:
+        raise ValueError(f"Unknown metric '{metric}'. Expected one of {METRIC_COLUMNS}")
+    return metric
+
+
+def trend(
+    conn: sqlite3.Connection,
+    task: str,
+    format_name: str,
+    metric: str = "correctness_rate",
+    model: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """One summary metric of a (task, format) across runs, oldest run first."""
+    column = _metric_column(metric)
+    where, params = _where(table="m", task=task, format=format_name, model=model)
+    rows = conn.execute(
+        f"SELECT m.run_id, m.model, r.created_at, m.calls, m.{column} AS value "
+        f"FROM metrics m JOIN runs r USING (run_id){where} "
+        "ORDER BY COALESCE(r.created_at, r.ingested_at), m.run_id", params
+    )
+    return [dict(r) for r in rows]
+
+
+def compare_runs(
+    conn: sqlite3.Connection,
+    base_run: str,
+    other_run: str,
+    metrics: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Per-(task, format, model) summary metrics of two runs side by side with
+    other - base deltas, for the groups both runs have.
+    """
+    columns = [_metric_column(m) for m in (metrics or ["mean_total_tokens", "mean_estimated_cost", "correctness_rate"])]
+    rows = conn.execute(
+        "SELECT b.task, b.format, b.model, "
+        + ", ".join(f"b.{c} AS base_{c}, o.{c} AS other_{c}" for c in columns)
+        + " FROM metrics b JOIN metrics o ON o.task = b.task AND o.format = b.format AND o.model = b.model"
+        " WHERE b.run_id = ? AND o.run_id = ? ORDER BY b.task, b.format, b.model",
+        (base_run, other_run)
+    )
+    comparison = []
+    for row in rows:
+        entry = {"task": row["task"], "format": row["format"], "model": row["model"]}
+        for c in columns:
+            base, other = row[f"base_{c}"], row[f"other_{c}"]
+            entry[c] = {
+                "base": base,
+                "other": other,
+                "delta": other - base if base is not None and other is not None else None
+            }
+        comparison.append(entry)
+    return comparison
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SQLite warehouse of aggregated results across runs")
+    parser.add_argument("--db", type=str, default=DEFAULT_WAREHOUSE_PATH, help="Warehouse database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="Aggregate run directories and store their results")
+    ingest_parser.add_argument("run_dirs", nargs="+")
+    ingest_parser.add_argument("--workers", type=int, default=1, help="Processes evaluating logs")
+
+    commands.add_parser("runs", help="List ingested runs")
+
+    trend_parser = commands.add_parser("trend", help="A summary metric of one task/format across runs")
+    trend_parser.add_argument("--task", type=str, required=True)
+    trend_parser.add_argument("--format", type=str, required=True)
+    trend_parser.add_argument("--metric", type=str, default="correctness_rate", choices=METRIC_COLUMNS)
+    trend_parser.add_argument("--model", type=str, default=None)
+
+    compare_parser = commands.add_parser("compare", help="Summary metrics of two runs side by side")
+    compare_parser.add_argument("base_run")
+    compare_parser.add_argument("other_run")
+    compare_parser.add_argument("--metric", action="append", choices=METRIC_COLUMNS)
+
+    export_parser = commands.add_parser("export", help="Write the CSV views for some or all runs")
+    export_parser.add_argument("--output", type=str, default="results")
+    export_parser.add_argument("--run", action="append", dest="run_ids", help="Run to include (repeatable)")
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+
+    if args.command == "ingest":
+        memo = EvaluationMemo()
+        for run_dir in args.run_dirs:
+            print(f"Ingested {ingest_run_dir(conn, run_dir, workers=args.workers, memo=memo)} calls from {run_dir}")
+    elif args.command == "runs":
+        print(json.dumps(list_runs(conn), indent=2))
+    elif args.command == "trend":
+        print(json.dumps(trend(conn, args.task, args.format, args.metric, args.model), indent=2))
+    elif args.command == "compare":
+        print(json.dumps(compare_runs(conn, args.base_run, args.other_run, args.metric), indent=2))
+    elif args.command == "export":
+        export_views(conn, args.output, args.run_ids)
+    conn.close()
@@ -1,7 +1,11 @@
 import csv
 import os
 from collections import defaultdict
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.aggregation import warehouse
+from src.aggregation.export import per_task_row
+from src.aggregation.stats import bootstrap_mean_diff_ci
 
 def load_results(results_dir: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
     """
@@ -21,10 +25,52 @@ def load_results(results_dir: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
     
     return summary, per_task, failures
 
-def compare_formats(summary_rows: List[Dict]) -> Dict[str, Dict]:
+def load_results_db(db_path: str, run_ids: Optional[List[str]] = None, model: Optional[str] = None) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Same as load_results, queried from the results warehouse instead of the
+    CSVs: summaries and failure counts pooled over the selected runs (all
+    ingested runs by default), optionally for one model.
+    """
+    conn = warehouse.connect(db_path)
+    try:
+        summary = warehouse.summary_rows(conn, run_ids, model)
+        per_task = [per_task_row(m) for m in warehouse.load_metrics(conn, run_ids)
+                    if model is None or m["model"] == model]
+        failures = warehouse.failure_rows(conn, run_ids, model)
+    finally:
+        conn.close()
+    return summary, per_task, failures
+
+def _as_flag(value: Any) -> bool:
+    # Booleans come back from per_task_metrics.csv as "True" / "False"
+    return value is True or value in ("True", "true", "1", 1)
+
+def call_samples(per_task_rows: List[Dict]) -> Dict[Tuple[str, str], Dict[str, List[float]]]:
+    """Per-call total tokens, cost and correctness (0/1) by (task, FORMAT), from per-task rows."""
+    samples = defaultdict(lambda: {"total_tokens": [], "estimated_cost": [], "is_correct": []})
+    for row in per_task_rows:
+        group = samples[(row["task"], row["format"].upper())]
+        for field in ("total_tokens", "estimated_cost"):
+            if row.get(field) not in (None, ""):
+                group[field].append(float(row[field]))
+        group["is_correct"].append(1.0 if _as_flag(row.get("is_correct")) else 0.0)
+    return dict(samples)
+
+def compare_formats(
+    summary_rows: List[Dict],
+    per_task_rows: Optional[List[Dict]] = None,
+    confidence: float = 0.95,
+    n_resamples: int = 2000,
+    seed: int = 0
+) -> Dict[str, Dict]:
     """
     Groups summary rows by task vs format and computes diffs.
     Assumes standard format keys 'JSON' and 'TOON' (case insensitive match).
+
+    Summary rows with correctness_ci_low/high carry a Wilson interval per
+    format ("correctness_ci"). Given the per-call rows as well, each task
+    also gets seeded bootstrap intervals for its deltas under "ci":
+    {"confidence", "token_savings": (low, high), ...}.
     """
     grouped = defaultdict(dict)
     
@@ -40,8 +86,12 @@ def compare_formats(summary_rows: List[Dict]) -> Dict[str, Dict]:
             "correctness_rate": float(row["correctness_rate"]),
             "error_rate": float(row["error_rate"])
         }
+        if row.get("correctness_ci_low") not in (None, ""):
+            data["correctness_ci"] = (float(row["correctness_ci_low"]), float(row["correctness_ci_high"]))
         grouped[task][fmt] = data
 
+    samples = call_samples(per_task_rows) if per_task_rows is not None else None
+
     # 2. Compute Deltas
     comparisons = {}
     for task, formats in grouped.items():
@@ -67,6 +117,19 @@ def compare_formats(summary_rows: List[Dict]) -> Dict[str, Dict]:
                 "correctness_delta": correctness_delta
             }
         }
+
+        if samples is not None and (task, "JSON") in samples and (task, "TOON") in samples:
+            json_calls, toon_calls = samples[(task, "JSON")], samples[(task, "TOON")]
+            intervals = {
+                "token_savings": (json_calls["total_tokens"], toon_calls["total_tokens"]),
+                "cost_savings": (json_calls["estimated_cost"], toon_calls["estimated_cost"]),
+                "correctness_delta": (toon_calls["is_correct"], json_calls["is_correct"])
+            }
+            ci = {"confidence": confidence}
+            for name, (a, b) in intervals.items():
+                result = bootstrap_mean_diff_ci(a, b, n_resamples=n_resamples, confidence=confidence, seed=seed)
+                ci[name] = result[1:] if result is not None else None
+            comparisons[task]["ci"] = ci
         
     return comparisons
 
@@ -90,6 +153,7 @@ def summarize_failures(failure_rows: List[Dict]) -> Dict[str, Dict[str, Dict[str
 def human_readable_summary(comparison_dict: Dict[str, Dict]) -> List[str]:
     """
     Generates non-judgmental, factual summary strings.
+    Deltas with bootstrap intervals (see compare_formats) get them appended.
     """
     summaries = []
     
@@ -97,21 +161,31 @@ def human_readable_summary(comparison_dict: Dict[str, Dict]) -> List[str]:
     for task in sorted(comparison_dict.keys()):
         data = comparison_dict[task]
         d = data["delta"]
+        ci = data.get("ci") or {}
+
+        def interval(name: str, fmt: str, negate: bool = False) -> str:
+            # `negate` when the text states the delta's magnitude the other way round
+            if not ci.get(name):
+                return ""
+            low, high = ci[name]
+            if negate:
+                low, high = -high, -low
+            return f" ({ci['confidence']:.0%} CI: {format(low, fmt)} to {format(high, fmt)})"
         
         # Token usage
         if d["token_savings"] > 0:
-            summaries.append(f"{task}: TOON used {d['token_savings']:.2f} fewer tokens than JSON")
+            summaries.append(f"{task}: TOON used {d['token_savings']:.2f} fewer tokens than JSON" + interval("token_savings", ".2f"))
         elif d["token_savings"] < 0:
-            summaries.append(f"{task}: TOON used {-d['token_savings']:.2f} more tokens than JSON")
+            summaries.append(f"{task}: TOON used {-d['token_savings']:.2f} more tokens than JSON" + interval("token_savings", ".2f", negate=True))
         else:
             summaries.append(f"{task}: Token usage identical")
             
         # Correctness
         # Use epsilon for float comparison to avoid noise
         if d["correctness_delta"] > 0.001:
-            summaries.append(f"{task}: TOON had higher correctness (+{d['correctness_delta']:.2%})")
+            summaries.append(f"{task}: TOON had higher correctness (+{d['correctness_delta']:.2%})" + interval("correctness_delta", "+.2%"))
         elif d["correctness_delta"] < -0.001:
-            summaries.append(f"{task}: JSON had higher correctness (+{-d['correctness_delta']:.2%})")
+            summaries.append(f"{task}: JSON had higher correctness (+{-d['correctness_delta']:.2%})" + interval("correctness_delta", "+.2%", negate=True))
         else:
             summaries.append(f"{task}: Correctness identical across formats")
             
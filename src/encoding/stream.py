@@ -0,0 +1,39 @@
+import json
+from typing import Dict, Any, Iterable, Iterator, List
+
+from src.encoding.toon_codec import iter_encode_to_toon
+
+# Pieces are re-grouped into chunks of about this many characters before
+# they are written to a socket or hashed
+DEFAULT_CHUNK_CHARS = 64 * 1024
+
+_JSON_ENCODER = json.JSONEncoder(indent=2)
+
+
+def iter_encode_json(records: List[Dict[str, Any]]) -> Iterator[str]:
+    """Streaming form of json.dumps(records, indent=2); yields identical text."""
+    return _JSON_ENCODER.iterencode(records)
+
+
+def iter_encode(format_name: str, records: List[Dict[str, Any]]) -> Iterator[str]:
+    """Yields the dataset encoded in `format_name` (JSON or TOON) piece by piece."""
+    if format_name.upper() == "TOON":
+        return iter_encode_to_toon(records)
+    if format_name.upper() == "JSON":
+        return iter_encode_json(records)
+    raise ValueError(f"Unknown format '{format_name}'")
+
+
+def rechunk(pieces: Iterable[str], chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[str]:
+    """Joins many small pieces into chunks of at least `chunk_chars` (except the last)."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_chars:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
@@ -1,5 +1,7 @@
 import re
 import math
+import operator
+from typing import Iterator
 
 # Fixed schema order as per spec
 FIELDS = [
@@ -37,38 +39,6 @@ def encode_val(val) -> str:
     
     return s_val
 
-def decode_val(raw: str, field_name: str):
-    """Decodes a TOON format string back to native type."""
-    val = raw.strip()
-    
-    # Handle Quoted Strings
-    if val.startswith('"') and val.endswith('"'):
-        # Strip quotes and unescape double quotes
-        val = val[1:-1].replace('""', '"')
-        
-        # If it was a string field, we are done (it remains a string)
-        # But wait, could it be a quoted array? Spec says "Arrays as [a,b,c]", implies unquoted brackets.
-        # But if for some reason an array text was quoted, we'd handle it here.
-        # However, for schema strictness:
-    
-    # Handle Arrays
-    if field_name == "metadata.tags":
-        if val.startswith('[') and val.endswith(']'):
-            content = val[1:-1]
-            if not content:
-                return []
-            # Simple split since tags are simple identifiers per spec
-            return content.split(',')
-        return [] # Fallback
-        
-    # Handle Types
-    if field_name in ["severity", "metadata.retry_count"]:
-        return int(val)
-    if field_name == "metadata.latency_ms":
-        return float(val)
-        
-    return val
-
 def parse_line_custom(line: str) -> list[str]:
     """
     Parses a single TOON data row.
@@ -118,74 +88,359 @@ def parse_line_custom(line: str) -> list[str]:
     return tokens
 
 
-def encode_to_toon(records: list[dict]) -> str:
-    """Encodes a list of record dicts to a TOON string."""
-    lines = []
-    
+def iter_encode_table(name: str, columns: list[str], rows) -> Iterator[str]:
+    """
+    Streaming form of encode_table: yields the header, the schema and then
+    one row at a time, so the full text is never held in memory.
+    `rows` may be any sized iterable (len() is needed for the header).
+    """
     # 1. Collection Header
-    lines.append(f"events[{len(records)}]:")
+    yield f"{name}[{len(rows)}]:"
     
     # 2. Schema Declaration
-    lines.append("{" + ",".join(FIELDS) + "}")
+    yield "\n{" + ",".join(columns) + "}"
     
     # 3. Data Rows
-    for r in records:
+    for r in rows:
         row = []
-        for f in FIELDS:
+        for f in columns:
             if "." in f:
                 parent, child = f.split(".")
                 val = r.get(parent, {}).get(child)
             else:
                 val = r.get(f)
             row.append(encode_val(val))
-        lines.append(",".join(row))
-        
-    return "\n".join(lines)
+        yield "\n" + ",".join(row)
+
+
+def encode_table(name: str, columns: list[str], rows: list[dict]) -> str:
+    """
+    Encodes any list of row dicts as a TOON block: `name[N]:`, `{columns}`, rows.
+    Dotted columns (parent.child) read from nested dicts.
+    """
+    return "".join(iter_encode_table(name, columns, rows))
+
 
+def encode_to_toon(records: list[dict]) -> str:
+    """Encodes a list of record dicts to a TOON string."""
+    return encode_table("events", FIELDS, records)
 
-def decode_from_toon(text: str) -> list[dict]:
-    """Decodes a TOON string back to a list of record dicts."""
+
+def iter_encode_to_toon(records: list[dict]) -> Iterator[str]:
+    """Streaming form of encode_to_toon."""
+    return iter_encode_table("events", FIELDS, records)
+
+
+# Column types for the event schema; other columns are declared by the
+# caller or inferred per value
+EVENT_TYPES = {
+    "severity": "integer",
+    "metadata.retry_count": "integer",
+    "metadata.latency_ms": "number",
+    "metadata.tags": "array"
+}
+
+HEADER_RE = re.compile(r"(\w+)\[(\d+)\]:")
+_INTEGER_RE = re.compile(r"-?\d+$")
+_NUMBER_RE = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+
+
+def _unquote(val: str) -> str:
+    if val.startswith('"') and val.endswith('"'):
+        return val[1:-1].replace('""', '"')
+    return val
+
+
+def _to_string(raw: str):
+    return _unquote(raw.strip())
+
+
+def _to_integer(raw: str):
+    return int(_unquote(raw.strip()))
+
+
+def _to_number(raw: str):
+    return float(_unquote(raw.strip()))
+
+
+def _to_array(raw: str):
+    val = _unquote(raw.strip())
+    if val.startswith('[') and val.endswith(']'):
+        content = val[1:-1]
+        # Simple split since array items are simple identifiers per spec
+        return content.split(',') if content else []
+    return [] # Fallback
+
+
+def _infer(raw: str):
+    """Value of an undeclared column: quoted -> str, [..] -> list, numeric -> int/float, else str."""
+    val = raw.strip()
+    if val.startswith('"') and val.endswith('"'):
+        return val[1:-1].replace('""', '"')
+    if val.startswith('[') and val.endswith(']'):
+        return _to_array(val)
+    if _INTEGER_RE.match(val):
+        return int(val)
+    if _NUMBER_RE.match(val):
+        return float(val)
+    return val
+
+
+# JSON-schema type name -> cell converter (None: infer from the value)
+CONVERTERS = {
+    "string": _to_string,
+    "integer": _to_integer,
+    "number": _to_number,
+    "array": _to_array,
+    None: _infer
+}
+
+
+def column_types(schema=None) -> dict:
+    """
+    Column -> type name from a task's `expected_output_schema` (an array
+    schema with items.properties), a plain {column: type} mapping, or None.
+    Anything else (e.g. Task A's "same as input" note) declares nothing.
+    """
+    if not isinstance(schema, dict):
+        return {}
+    properties = schema.get("items", {}).get("properties") if "items" in schema else None
+    if properties is not None:
+        return {col: spec.get("type") for col, spec in properties.items()}
+    return {col: (t.get("type") if isinstance(t, dict) else t) for col, t in schema.items()}
+
+
+def _split_unquoted(text: str, depth: int) -> tuple[list[str], int]:
+    """
+    Splits text that lies outside quotes on commas at bracket depth 0,
+    starting at `depth`. Returns the pieces and the depth at the end.
+    """
+    if '[' not in text and ']' not in text:
+        return (text.split(',') if depth == 0 else [text]), depth
+    pieces = []
+    for part in text.split(','):
+        if pieces and depth != 0:
+            # The comma before this part is inside brackets
+            pieces[-1] += ',' + part
+        else:
+            pieces.append(part)
+        depth += part.count('[') - part.count(']')
+    return pieces, depth
+
+
+def split_row(line: str, max_tokens: int = None) -> list[str]:
+    """
+    Splits a data row into raw cell tokens, exactly like parse_line_custom,
+    but with str.split over the text between quotes instead of a
+    per-character loop.
+
+    With `max_tokens`, splitting may stop once that many tokens are
+    complete: the first `max_tokens` are exact, anything after is not.
+    """
+    if '"' not in line:
+        if max_tokens is not None and '[' not in line and ']' not in line:
+            return line.split(',', max_tokens)
+        return _split_unquoted(line, 0)[0]
+
+    tokens = []
+    current = ""
+    depth = 0
+    # Odd segments are inside quotes (an escaped "" toggles out and back in)
+    for i, segment in enumerate(line.split('"')):
+        if i:
+            current += '"'
+        if i % 2:
+            current += segment
+            continue
+        pieces, depth = _split_unquoted(segment, depth)
+        current += pieces[0]
+        for piece in pieces[1:]:
+            tokens.append(current)
+            current = piece
+        if max_tokens is not None and len(tokens) >= max_tokens:
+            return tokens
+    tokens.append(current)
+    return tokens
+
+
+# Comparison operators for `where` predicates
+PREDICATE_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, options: value in options
+}
+
+
+def normalize_where(where) -> list[tuple]:
+    """`where` as (column, op, value) triples; a {column: value} dict means equality."""
+    if not where:
+        return []
+    if isinstance(where, dict):
+        return [(col, "==", value) for col, value in where.items()]
+    return [tuple(p) for p in where]
+
+
+class RowDecoder:
+    """
+    Decodes data rows of one TOON table. Built once per schema line: each
+    column's converter and destination (dotted columns fill a nested dict)
+    are resolved up front, so the per-row loop is one tokenize plus one
+    converter call per cell.
+
+    Types come from `types` (see column_types), then EVENT_TYPES, and are
+    otherwise inferred per value. Nested objects follow the flat columns in
+    the decoded dict, as in the event records.
+
+    `select` projects the decoded dict onto some columns: rows are then only
+    tokenized up to the last column needed, and only selected cells are
+    converted (the column count is checked as "at least"). `where` filters
+    rows (see decode_from_toon): only the predicate cells are converted
+    before a row is rejected, and decode() returns None for it.
+    """
+    def __init__(self, columns: list[str], types: dict = None, select: list[str] = None, where=None):
+        self.columns = columns
+        declared = {**EVENT_TYPES, **(types or {})}
+        index = {col: i for i, col in enumerate(columns)}
+        selected = columns if select is None else list(select)
+        predicates = normalize_where(where)
+
+        unknown = [col for col in selected + [p[0] for p in predicates] if col not in index]
+        if unknown:
+            raise ValueError(f"Unknown column(s) {unknown}. Schema: {columns}")
+
+        def converter(col):
+            type_name = declared.get(col)
+            return CONVERTERS[type_name if type_name in CONVERTERS else None]
+
+        self._plan = []
+        self._parents = []
+        for col in selected:
+            if "." in col:
+                parent, child = col.split(".", 1)
+                if parent not in self._parents:
+                    self._parents.append(parent)
+            else:
+                parent, child = None, col
+            self._plan.append((index[col], converter(col), parent, child))
+
+        self._predicates = []
+        for col, op, value in predicates:
+            if op not in PREDICATE_OPS:
+                raise ValueError(f"Unknown predicate operator '{op}' for column '{col}'")
+            self._predicates.append((index[col], converter(col), PREDICATE_OPS[op], value))
+
+        needed = [i for i, _, _, _ in self._plan] + [i for i, _, _, _ in self._predicates]
+        # Tokens to split: all of them (exact count check) unless projecting
+        self._limit = None if select is None else max(needed, default=-1) + 1
+
+    def decode(self, line: str):
+        limit = self._limit
+        if limit is None:
+            tokens = split_row(line)
+            if len(tokens) != len(self.columns):
+                raise ValueError(f"Column count mismatch. Expected {len(self.columns)}, got {len(tokens)}. Line: {line}")
+        else:
+            tokens = split_row(line, limit)
+            if len(tokens) < limit:
+                raise ValueError(f"Column count mismatch. Expected at least {limit}, got {len(tokens)}. Line: {line}")
+
+        for i, convert, compare, value in self._predicates:
+            if not compare(convert(tokens[i]), value):
+                return None
+
+        rec = {}
+        if not self._parents:
+            for i, convert, _, key in self._plan:
+                rec[key] = convert(tokens[i])
+            return rec
+
+        nested = {parent: {} for parent in self._parents}
+        for i, convert, parent, key in self._plan:
+            if parent is None:
+                rec[key] = convert(tokens[i])
+            else:
+                nested[parent][key] = convert(tokens[i])
+        rec.update(nested)
+        return rec
+
+
+def parse_header(line: str) -> tuple[str, int]:
+    """Parses a `name[N]:` collection header. Returns (name, declared count)."""
+    header_match = HEADER_RE.match(line)
+    if not header_match:
+        raise ValueError(f"Invalid collection header: {line}")
+    return header_match.group(1), int(header_match.group(2))
+
+
+def parse_collection_header(line: str) -> int:
+    """Parses a `name[N]:` collection header. Returns the declared count."""
+    return parse_header(line)[1]
+
+
+def parse_schema_line(line: str, expected: list[str] = None) -> list[str]:
+    """Parses the `{col,col,...}` schema declaration; checks it against `expected` if given."""
+    if not (line.startswith('{') and line.endswith('}')):
+        raise ValueError("Invalid schema declaration")
+    schema_cols = line[1:-1].split(',')
+    
+    if expected is not None and schema_cols != expected:
+        # For this strict benchmark, we fail on schema mismatch
+        raise ValueError(f"Schema mismatch.\nExpected: {expected}\nGot: {schema_cols}")
+    return schema_cols
+
+
+def schema_decoder(
+    schema_line: str, types: dict = None, select: list[str] = None, where=None, schema: list[str] = None
+) -> RowDecoder:
+    """RowDecoder for a table's schema line, which must equal `schema` if given."""
+    return RowDecoder(parse_schema_line(schema_line, schema), types, select, where)
+
+
+_EVENT_DECODER = RowDecoder(FIELDS)
+
+
+def decode_row(line: str) -> dict:
+    """Decodes a single TOON data row of the event schema into a record dict."""
+    return _EVENT_DECODER.decode(line)
+
+
+def decode_from_toon(text: str, types=None, columns: list[str] = None, where=None, schema: list[str] = None) -> list[dict]:
+    """
+    Decodes a TOON table back to a list of row dicts. The collection name,
+    count and columns come from the header; `types` (a task's
+    expected_output_schema or {column: type}) declares column types.
+
+    `columns` keeps only those columns (schema names, e.g. "metadata.region")
+    and `where` keeps only rows matching every predicate, given as
+    (column, op, value) triples with op in PREDICATE_OPS or as a
+    {column: value} dict of equalities. Values compare against the decoded
+    cell, e.g. [("status", "==", "failed"), ("severity", ">=", 3)]. Both are
+    applied while decoding, so skipped cells and rows are never converted.
+
+    `schema` is the exact column list the table must declare (FIELDS when
+    decoding the benchmark's event dataset); any other schema line raises.
+    Model answers are decoded without one, whatever their collection name.
+    """
     lines = [l.strip() for l in text.split('\n') if l.strip()]
     if not lines:
         return []
         
     # 1. Parse Header
-    header_match = re.match(r"events\[(\d+)\]:", lines[0])
-    if not header_match:
-        raise ValueError(f"Invalid collection header: {lines[0]}")
-    expected_count = int(header_match.group(1))
+    _, expected_count = parse_header(lines[0])
     
     # 2. Parse Schema
-    schema_line = lines[1]
-    if not (schema_line.startswith('{') and schema_line.endswith('}')):
-        raise ValueError("Invalid schema declaration")
-    schema_cols = schema_line[1:-1].split(',')
-    
-    if schema_cols != FIELDS:
-        # For this strict benchmark, we fail on schema mismatch
-        raise ValueError(f"Schema mismatch.\nExpected: {FIELDS}\nGot: {schema_cols}")
+    if len(lines) < 2:
+        raise ValueError("Missing schema declaration")
+    decoder = schema_decoder(lines[1], column_types(types), columns, where, schema)
 
     # 3. Parse Rows
-    records = []
-    for line in lines[2:]:
-        tokens = parse_line_custom(line)
-        if len(tokens) != len(FIELDS):
-            raise ValueError(f"Column count mismatch. Expected {len(FIELDS)}, got {len(tokens)}. Line: {line}")
-            
-        rec = {}
-        meta = {}
-        
-        for i, field in enumerate(FIELDS):
-            val = decode_val(tokens[i], field)
-            
-            if "." in field:
-                _, child = field.split(".")
-                meta[child] = val
-            else:
-                rec[field] = val
-                
-        rec["metadata"] = meta
-        records.append(rec)
+    records = [decoder.decode(line) for line in lines[2:]]
+    if where:
+        records = [r for r in records if r is not None]
         
     if len(records) != expected_count:
         # This is a soft warning or hard error? Spec doesn't say. 
@@ -202,7 +457,7 @@ def validate_round_trip(records: list[dict]) -> bool:
     Raises AssertionError on failure.
     """
     encoded = encode_to_toon(records)
-    decoded = decode_from_toon(encoded)
+    decoded = decode_from_toon(encoded, schema=FIELDS)
     
     if len(records) != len(decoded):
         raise AssertionError(f"Count mismatch: Original {len(records)} != Decoded {len(decoded)}")
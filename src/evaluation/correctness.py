@@ -1,4 +1,11 @@
-from typing import Any, Dict, List, Union
+import json
+import hashlib
+from typing import Any, Dict, List, Optional, Union
+
+from src.prompts import task_a, task_b, task_c
+from src.prompts.registry import find_task_spec
+from src.tasks.dsl import TaskSpec
+from src.tasks.engine import ColumnarDataset, execute
 
 def is_subset(record: Dict, criterion: Dict) -> bool:
     """Helper to check if record matches criteria."""
@@ -43,17 +50,209 @@ def deep_compare(expected: Any, actual: Any, path: str = "") -> List[str]:
             
     return errors
 
-def check_task_a(output: List[Dict], input_data: List[Dict]) -> Dict:
+def row_digest(row: Dict) -> bytes:
     """
-    Task A: Filtering.
-    Criteria: status=failed, severity>=3, env=prod
+    Canonical digest of a row: JSON with sorted keys and compact separators
+    (floats serialize as their shortest round-trip repr), hashed with BLAKE2b.
+    Rows with equal digests are equal under deep_compare; rows that differ
+    only within its float tolerance get different digests and take the slow path.
     """
+    canonical = json.dumps(row, sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+# Task A's criteria as decode_from_toon `where` predicates
+TASK_A_FILTER = task_a.SPEC.filters[0].predicates
+
+def expected_task_a_ids(input_data: List[Dict]) -> set:
+    """Ids of the records Task A should return."""
     expected_ids = set()
     for r in input_data:
         if (r.get("status") == "failed" and 
             r.get("severity") >= 3 and 
             r.get("env") == "prod"):
             expected_ids.add(r.get("id"))
+    return expected_ids
+
+def expected_task_b_map(input_data: List[Dict]) -> Dict[str, Dict]:
+    """Expected Task B aggregate row per 'type'."""
+    stats = {}
+    for r in input_data:
+        t = r.get("type")
+        if t not in stats:
+            stats[t] = {"total": 0, "failed": 0, "severity_sum": 0}
+        
+        stats[t]["total"] += 1
+        if r.get("status") == "failed":
+            stats[t]["failed"] += 1
+        stats[t]["severity_sum"] += r.get("severity", 0)
+        
+    expected_rows = []
+    for t, data in stats.items():
+        avg = data["severity_sum"] / data["total"] if data["total"] > 0 else 0
+        expected_rows.append({
+            "type": t,
+            "total_count": data["total"],
+            "failed_count": data["failed"],
+            "average_severity": avg
+        })
+        
+    # Key logic is by "type"
+    return {r["type"]: r for r in expected_rows}
+
+TASK_C_KEYS = task_c.SPEC.output_columns()
+
+# Task C keys that are read from the record's metadata
+TASK_C_NESTED = {name for name, source in task_c.SPEC.shape.sources if name != source}
+
+def expected_task_c_row(record: Dict) -> Dict:
+    """The flattened Task C row for one input record."""
+    metadata = record.get("metadata") or {}
+    return {
+        key: metadata.get(key) if key in TASK_C_NESTED else record.get(key)
+        for key in TASK_C_KEYS
+    }
+
+class GroundTruth:
+    """
+    Everything the checkers need to know about one dataset, computed once:
+    the id -> record map, Task A's expected ids, Task B's per-type stats and
+    Task C's flattened rows (by id).
+
+    Build one per dataset and pass it to check_task_* instead of the record
+    list, so checking many outputs costs one dictionary lookup per row
+    (one digest and set lookup for Task A rows that copy their input).
+
+    Expected outputs come from the task specs, run by the vectorized engine
+    over a columnar copy of the records (see expected_output).
+    """
+    def __init__(self, records: List[Dict], artifacts: Optional[Dict[str, Any]] = None):
+        self.records = records
+        self._digest: Optional[str] = None
+        self._row_digests: Optional[set] = None
+        self._expected: Dict[str, List[Dict]] = {}
+        self.columnar = ColumnarDataset.from_records(records, columns=[])
+        self.input_count = len(records)
+        self.input_map = {r["id"]: r for r in records}
+        if artifacts is not None:
+            # Derived parts saved by artifacts() (see truth_cache): nothing to recompute
+            self._digest = artifacts["digest"]
+            self._row_digests = set(artifacts["row_digests"])
+            self.task_a_ids = set(artifacts["task_a_ids"])
+            self.task_b_map = {r["type"]: r for r in artifacts["task_b_rows"]}
+        else:
+            self.task_a_ids = {r["id"] for r in self.expected_output(task_a.SPEC)}
+            self.task_b_map = {r["type"]: r for r in self.expected_output(task_b.SPEC)}
+        self._task_c_rows: Optional[Dict[str, Dict]] = None
+
+    @property
+    def task_c_rows(self) -> Dict[str, Dict]:
+        """Task C's flattened row per id (built on first use: one dict per record)."""
+        if self._task_c_rows is None:
+            self._task_c_rows = {r["id"]: r for r in self.expected_output(task_c.SPEC)}
+        return self._task_c_rows
+
+    def expected_output(self, spec: TaskSpec) -> List[Dict]:
+        """Expected rows of a task on this dataset (computed once per spec name)."""
+        if spec.name not in self._expected:
+            self._expected[spec.name] = execute(spec, self.columnar)
+        return self._expected[spec.name]
+
+    def artifacts(self) -> Dict[str, Any]:
+        """
+        The costly derived parts as plain data (dataset digest, row digests,
+        Task A ids, Task B rows), for GroundTruth(records, artifacts).
+        """
+        return {
+            "digest": self.digest,
+            "row_digests": self.row_digests,
+            "task_a_ids": sorted(self.task_a_ids),
+            "task_b_rows": list(self.task_b_map.values())
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The columnar copy is rebuilt from the records on demand
+        state = dict(self.__dict__)
+        state.pop("columnar", None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self.columnar = ColumnarDataset.from_records(self.records, columns=[])
+
+    @property
+    def digest(self) -> str:
+        """Content hash of the dataset (sha256 of its canonical JSON)."""
+        if self._digest is None:
+            canonical = json.dumps(self.records, sort_keys=True, separators=(",", ":"))
+            self._digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return self._digest
+
+    @property
+    def row_digests(self) -> set:
+        """row_digest of every input record (built on first use: only Task A needs it)."""
+        if self._row_digests is None:
+            self._row_digests = {row_digest(r) for r in self.records}
+        return self._row_digests
+
+    def expected_rows(self, task_name: str) -> int:
+        if "Task A" in task_name:
+            return len(self.task_a_ids)
+        if "Task B" in task_name:
+            return len(self.task_b_map)
+        spec = find_task_spec(task_name)
+        if spec is not None:
+            return len(self.expected_output(spec))
+        return self.input_count
+
+def as_ground_truth(input_data: Union[List[Dict], GroundTruth]) -> GroundTruth:
+    """Accepts either a GroundTruth or the raw record list (built on the fly)."""
+    if isinstance(input_data, GroundTruth):
+        return input_data
+    return GroundTruth(input_data)
+
+def check_task_a_row(i: int, r: Dict, input_map: Dict[str, Dict], row_digests: Optional[set] = None) -> List[str]:
+    """
+    Checks a single Task A output row against the original input record.
+    Set-level checks (missing / extra ids) are left to the caller.
+
+    With `row_digests` (GroundTruth.row_digests), a row that is an exact copy
+    of an input record is accepted by a digest lookup; deep_compare only
+    runs on rows that differ, to describe the mismatch.
+    """
+    if row_digests is not None and row_digest(r) in row_digests:
+        # Identical to an input record; ids are unique, so it is this id's record
+        return []
+
+    rid = r.get("id")
+    if not rid:
+        return [f"Row {i} missing 'id'"]
+        
+    # Check integrity vs original input (Hallucination check)
+    # Stronger check: output record should be IDENTICAL to input record with that ID.
+    original = input_map.get(rid)
+    if not original:
+        return [f"Row {i} (id={rid}) not found in input (Hallucination)"]
+        
+    # Let's perform a deep comparison for the fields that exist in output vs original
+    # Task A format usually implies full record return.
+    return deep_compare(original, r, f"Row {i}")
+
+def check_task_a(
+    output: List[Dict],
+    input_data: Union[List[Dict], GroundTruth],
+    max_errors: Optional[int] = None
+) -> Dict:
+    """
+    Task A: Filtering.
+    Criteria: status=failed, severity>=3, env=prod
+
+    Once `max_errors` row errors are collected, later rows only get the
+    digest check (the result is already incorrect; detail is skipped).
+    """
+    truth = as_ground_truth(input_data)
+    expected_ids = truth.task_a_ids
+    input_map = truth.input_map
+    row_digests = truth.row_digests
             
     # Check 1: Verify all output records match criteria AND are in expected set
     output_ids = set()
@@ -61,30 +260,11 @@ def check_task_a(output: List[Dict], input_data: List[Dict]) -> Dict:
     
     for i, r in enumerate(output):
         rid = r.get("id")
-        if not rid:
-            errors.append(f"Row {i} missing 'id'")
-            continue
-            
-        output_ids.add(rid)
-        
-        # Check integrity vs original input (Hallucination check)
-        # We need to find the full original record to be sure, or just rely on ID?
-        # Let's verify fields roughly or just trust ID if present? 
-        # Stronger check: output record should be IDENTICAL to input record with that ID.
-        original = next((x for x in input_data if x["id"] == rid), None)
-        if not original:
-            errors.append(f"Row {i} (id={rid}) not found in input (Hallucination)")
+        if rid:
+            output_ids.add(rid)
+        if max_errors is not None and len(errors) >= max_errors:
             continue
-            
-        # Check criteria explicitly on OUTPUT to fail 'logic' errors even if copied correctly?
-        # Actually simplest is: Output Set == Expected Set.
-        # But we also want to catch if they modified the record content.
-        
-        # Let's perform a deep comparison for the fields that exist in output vs original
-        # Task A format usually implies full record return.
-        diff_errs = deep_compare(original, r, f"Row {i}")
-        if diff_errs:
-            errors.extend(diff_errs)
+        errors.extend(check_task_a_row(i, r, input_map, row_digests))
             
     # Check 2: Set equality
     missing_ids = expected_ids - output_ids
@@ -101,67 +281,63 @@ def check_task_a(output: List[Dict], input_data: List[Dict]) -> Dict:
         "details": {"expected_count": len(expected_ids), "output_count": len(output)}
     }
 
-def check_task_b(output: List[Dict], input_data: List[Dict]) -> Dict:
+def check_task_b_row(i: int, r: Dict, expected_map: Dict[str, Dict], seen_types: set) -> List[str]:
+    """
+    Checks a single Task B output row. Records its type in `seen_types`.
+    """
+    t = r.get("type")
+    if not t:
+        return [f"Row {i} missing 'type'"]
+
+    errors = []
+    if t in seen_types:
+        errors.append(f"Duplicate type '{t}' in output")
+    seen_types.add(t)
+    
+    if t not in expected_map:
+        errors.append(f"Hallucinated type '{t}' in output")
+        return errors
+        
+    exp = expected_map[t]
+    
+    if r.get("total_count") != exp["total_count"]:
+        errors.append(f"Type '{t}': total_count mismatch. Exp {exp['total_count']}, Got {r.get('total_count')}")
+    if r.get("failed_count") != exp["failed_count"]:
+        errors.append(f"Type '{t}': failed_count mismatch. Exp {exp['failed_count']}, Got {r.get('failed_count')}")
+    
+    # Float comparison for avg severity
+    got_sev = r.get("average_severity")
+    if isinstance(got_sev, (int, float)):
+         if abs(got_sev - exp["average_severity"]) > 1e-4:
+             errors.append(f"Type '{t}': average_severity mismatch. Exp {exp['average_severity']:.4f}, Got {got_sev}")
+    else:
+        errors.append(f"Type '{t}': average_severity invalid type. Got {type(got_sev)}")
+
+    return errors
+
+def check_task_b(
+    output: List[Dict],
+    input_data: Union[List[Dict], GroundTruth],
+    max_errors: Optional[int] = None
+) -> Dict:
     """
     Task B: Aggregation.
     Per 'type': total count, failed count, average severity.
     """
-    # 1. Compute Expected
-    stats = {}
-    for r in input_data:
-        t = r.get("type")
-        if t not in stats:
-            stats[t] = {"total": 0, "failed": 0, "severity_sum": 0}
-        
-        stats[t]["total"] += 1
-        if r.get("status") == "failed":
-            stats[t]["failed"] += 1
-        stats[t]["severity_sum"] += r.get("severity", 0)
-        
-    expected_rows = []
-    for t, data in stats.items():
-        avg = data["severity_sum"] / data["total"] if data["total"] > 0 else 0
-        expected_rows.append({
-            "type": t,
-            "total_count": data["total"],
-            "failed_count": data["failed"],
-            "average_severity": avg
-        })
-        
-    # Sort for easier comparison? Key logic is by "type"
-    expected_map = {r["type"]: r for r in expected_rows}
+    # 1. Expected (precomputed per dataset)
+    expected_map = as_ground_truth(input_data).task_b_map
     
     # 2. Verify Output
     errors = []
     seen_types = set()
     
     for i, r in enumerate(output):
-        t = r.get("type")
-        if not t:
-            errors.append(f"Row {i} missing 'type'")
+        if max_errors is not None and len(errors) >= max_errors:
+            # Still record the types seen, for the missing-types check
+            if r.get("type"):
+                seen_types.add(r.get("type"))
             continue
-        if t in seen_types:
-            errors.append(f"Duplicate type '{t}' in output")
-        seen_types.add(t)
-        
-        if t not in expected_map:
-            errors.append(f"Hallucinated type '{t}' in output")
-            continue
-            
-        exp = expected_map[t]
-        
-        if r.get("total_count") != exp["total_count"]:
-            errors.append(f"Type '{t}': total_count mismatch. Exp {exp['total_count']}, Got {r.get('total_count')}")
-        if r.get("failed_count") != exp["failed_count"]:
-            errors.append(f"Type '{t}': failed_count mismatch. Exp {exp['failed_count']}, Got {r.get('failed_count')}")
-        
-        # Float comparison for avg severity
-        got_sev = r.get("average_severity")
-        if isinstance(got_sev, (int, float)):
-             if abs(got_sev - exp["average_severity"]) > 1e-4:
-                 errors.append(f"Type '{t}': average_severity mismatch. Exp {exp['average_severity']:.4f}, Got {got_sev}")
-        else:
-            errors.append(f"Type '{t}': average_severity invalid type. Got {type(got_sev)}")
+        errors.extend(check_task_b_row(i, r, expected_map, seen_types))
 
     # Check for missing types
     missing_types = set(expected_map.keys()) - seen_types
@@ -174,53 +350,133 @@ def check_task_b(output: List[Dict], input_data: List[Dict]) -> Dict:
         "details": {"expected_groups": len(expected_map), "output_groups": len(output)}
     }
 
-def check_task_c(output: List[Dict], input_data: List[Dict]) -> Dict:
+def check_task_c_row(i: int, r: Dict, expected_rows: Dict[str, Dict]) -> List[str]:
+    """
+    Checks a single Task C output row against the flattened row expected
+    for its id (GroundTruth.task_c_rows).
+    """
+    rid = r.get("id")
+    if not rid:
+        return [f"Row {i} missing 'id'"]
+        
+    if rid not in expected_rows:
+        return [f"Row {i} (id={rid}) not found in input (Hallucination)"]
+        
+    expected = expected_rows[rid]
+    if r == expected:
+        # Fast path: same keys and values (the per-key loop below compares with != too)
+        return []
+    errors = []
+    
+    # Verify fields and values
+    for key in TASK_C_KEYS:
+        if key not in r:
+            errors.append(f"Row {i} (id={rid}) missing key '{key}'")
+            continue
+            
+        expected_val = expected[key]
+        if r[key] != expected_val:
+            errors.append(f"Row {i} (id={rid}) value mismatch for '{key}'. Exp '{expected_val}', Got '{r[key]}'")
+
+    return errors
+
+def check_task_c(
+    output: List[Dict],
+    input_data: Union[List[Dict], GroundTruth],
+    max_errors: int = 50
+) -> Dict:
     """
     Task C: Transformation.
     Flatten to specific fields.
+    Row checks stop once `max_errors` errors are collected.
     """
-    REQUIRED_KEYS = ["id", "timestamp", "service", "env", "type", "status", "severity", "region", "latency_ms"]
-    
+    truth = as_ground_truth(input_data)
     errors = []
     
     # Needs 1:1 mapping
-    if len(output) != len(input_data):
-        errors.append(f"Count mismatch. Input {len(input_data)}, Output {len(output)}")
-        
-    # Build map for fast lookup
-    input_map = {r["id"]: r for r in input_data}
+    if len(output) != truth.input_count:
+        errors.append(f"Count mismatch. Input {truth.input_count}, Output {len(output)}")
     
     for i, r in enumerate(output):
-        rid = r.get("id")
-        if not rid:
-            errors.append(f"Row {i} missing 'id'")
+        if len(errors) >= max_errors:
+            break
+        errors.extend(check_task_c_row(i, r, truth.task_c_rows))
+                
+    return {
+        "is_correct": len(errors) == 0,
+        "errors": errors[:max_errors], # Cap errors to avoid huge logs
+        "details": {"input_count": truth.input_count, "output_count": len(output)}
+    }
+
+# Marks a column absent from an output row
+_MISSING = object()
+
+def spec_cell(row: Dict, column: str) -> Any:
+    """A row's value for an output column; dotted columns read nested dicts."""
+    if "." in column:
+        parent, child = column.split(".", 1)
+        return (row.get(parent) or {}).get(child, _MISSING)
+    return row.get(column, _MISSING)
+
+def check_task_spec(
+    output: List[Dict],
+    input_data: Union[List[Dict], GroundTruth],
+    spec: TaskSpec,
+    max_errors: int = 50
+) -> Dict:
+    """
+    Checks any declaratively defined task against the rows its spec
+    produces: rows are matched on spec.key (order does not matter), every
+    output column must be present and equal, "number" columns within
+    spec.tolerance. Tasks with a spec need no checker of their own.
+    """
+    truth = as_ground_truth(input_data)
+    key = spec.key
+    expected = {spec_cell(r, key): r for r in truth.expected_output(spec)}
+    types = spec.output_types()
+    allowed = {column.split(".", 1)[0] for column in types}
+
+    errors = []
+    seen = set()
+    for i, r in enumerate(output):
+        if len(errors) >= max_errors:
+            break
+        if not isinstance(r, dict):
+            errors.append(f"Row {i} is not an object")
             continue
-            
-        if rid not in input_map:
-            errors.append(f"Row {i} (id={rid}) not found in input (Hallucination)")
+
+        value = spec_cell(r, key)
+        if value is _MISSING:
+            errors.append(f"Row {i} missing key '{key}'")
             continue
-            
-        original = input_map[rid]
-        
-        # Verify fields and values
-        for key in REQUIRED_KEYS:
-            if key not in r:
-                errors.append(f"Row {i} (id={rid}) missing key '{key}'")
-                continue
-                
-            # Derived value lookup
-            if key == "region":
-                expected_val = original["metadata"].get("region")
-            elif key == "latency_ms":
-                expected_val = original["metadata"].get("latency_ms")
-            else:
-                expected_val = original.get(key)
-                
-            if r[key] != expected_val:
-                errors.append(f"Row {i} (id={rid}) value mismatch for '{key}'. Exp '{expected_val}', Got '{r[key]}'")
-                
+        if value in seen:
+            errors.append(f"Row {i} ({key}={value}) duplicated in output")
+            continue
+        seen.add(value)
+        if value not in expected:
+            errors.append(f"Row {i} ({key}={value}) not found in expected output (Hallucination)")
+            continue
+
+        exp = expected[value]
+        for column, type_name in types.items():
+            got = spec_cell(r, column)
+            want = spec_cell(exp, column)
+            if got is _MISSING:
+                errors.append(f"Row {i} ({key}={value}) missing key '{column}'")
+            elif type_name == "number" and isinstance(got, (int, float)) and not isinstance(got, bool):
+                if abs(got - want) > spec.tolerance:
+                    errors.append(f"Row {i} ({key}={value}) value mismatch for '{column}'. Exp '{want}', Got '{got}'")
+            elif got != want or type(got) != type(want):
+                errors.append(f"Row {i} ({key}={value}) value mismatch for '{column}'. Exp '{want}', Got '{got}'")
+        for extra in r.keys() - allowed:
+            errors.append(f"Row {i} ({key}={value}) extra key '{extra}' in output")
+
+    missing = [k for k in expected if k not in seen]
+    if missing and len(errors) < max_errors:
+        errors.append(f"Missing {len(missing)} expected rows. First few {key}s: {missing[:5]}")
+
     return {
         "is_correct": len(errors) == 0,
-        "errors": errors[:50], # Cap errors to avoid huge logs
-        "details": {"input_count": len(input_data), "output_count": len(output)}
+        "errors": errors[:max_errors],
+        "details": {"expected_rows": len(expected), "output_rows": len(output)}
     }
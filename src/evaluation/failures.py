@@ -11,6 +11,7 @@ def classify_failure(result_or_exception: Union[Dict, Exception]) -> str:
     - incorrect_result
     - hallucination (special subset of incorrect result)
     - nondeterministic_output (handled at aggregation level, typically)
+    - backend_error (the model call itself failed after retries)
     """
     
     # 1. Handle Exceptions (Parsing phase)
@@ -32,6 +33,9 @@ def classify_failure(result_or_exception: Union[Dict, Exception]) -> str:
         errors = result_or_exception.get("errors", [])
         error_text = " ".join(str(e) for e in errors).lower()
         
+        if error_text.startswith("backend_error"):
+            return "backend_error"
+
         # Heuristics based on error messages generated in correctness.py
         
         # Schema issues caught during correctness (e.g. missing keys inside valid list dicts)
@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+# Bump whenever parsing, checking or failure classification changes, so
+# verdicts cached by an older evaluator are not reused
+EVALUATION_VERSION = "2"
+
+
+class EvaluationMemo:
+    """
+    Cache of evaluation verdicts keyed by what determines them: task,
+    format, raw output, dataset digest and EVALUATION_VERSION.
+
+    A verdict is {"correctness": <check_task_* result>, "failure_category": str}.
+    Identical outputs (mock replies, deterministic models repeating
+    themselves across iterations) are then parsed and checked once.
+
+    In memory by default; with `path`, verdicts are loaded from and appended
+    to a JSONL file, so later aggregations of the same outputs reuse them.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self.stats = {"hits": 0, "misses": 0, "loaded": 0}
+
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path: str):
+        with open(path, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # Partial trailing write: ignore it
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("version") == EVALUATION_VERSION:
+                    self._entries[record["key"]] = record["verdict"]
+        self.stats["loaded"] = len(self._entries)
+
+    @staticmethod
+    def key(task_name: str, format_name: str, raw_output: str, dataset_digest: str) -> str:
+        h = hashlib.sha256()
+        for part in (EVALUATION_VERSION, task_name or "", format_name or "", dataset_digest):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        h.update((raw_output or "").encode("utf-8"))
+        return h.hexdigest()
+
+    @staticmethod
+    def key_for_log(raw_log: Dict[str, Any], dataset_digest: str) -> Optional[str]:
+        """
+        Memo key for a logged execution, or None if its verdict does not
+        depend on the output alone (failed calls, early aborts).
+        """
+        if raw_log.get("error") or (raw_log.get("early_abort") or {}).get("aborted_early"):
+            return None
+        return EvaluationMemo.key(
+            raw_log.get("task_name"), raw_log.get("format"), raw_log.get("raw_output", ""), dataset_digest
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            verdict = self._entries.get(key)
+            self.stats["hits" if verdict is not None else "misses"] += 1
+            return verdict
+
+    def record_hit(self):
+        """Counts a lookup answered without evaluating (e.g. a duplicate already being evaluated)."""
+        with self._lock:
+            self.stats["hits"] += 1
+
+    def put(self, key: str, verdict: Dict[str, Any]):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = verdict
+            if self.path:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    self._file = open(self.path, "a")
+                self._file.write(json.dumps({"version": EVALUATION_VERSION, "key": key, "verdict": verdict}) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else None
+
+    def summary(self) -> Dict[str, Any]:
+        rate = self.hit_rate
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round(rate, 4) if rate is not None else None
+        }
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
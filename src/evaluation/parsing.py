@@ -1,5 +1,5 @@
 import json
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional
 import sys
 import os
 
@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 from src.encoding.toon_codec import decode_from_toon
+from src.prompts.registry import find_task
 
 class EvaluationError(Exception):
     """Base class for evaluation errors."""
@@ -20,13 +21,19 @@ class SchemaViolation(EvaluationError):
     """Raised when the parsed output does not match the expected structural schema."""
     pass
 
-def parse_output(format_name: str, raw_text: str) -> Any:
+def output_schema(task_name: Optional[str]) -> Any:
+    """The expected_output_schema for a logged task name (exact, then substring match)."""
+    task = find_task(task_name)
+    return task.expected_output_schema if task is not None else None
+
+def parse_output(format_name: str, raw_text: str, types: Any = None) -> Any:
     """
     Parses raw text output based on the specified format.
     
     Args:
         format_name: "JSON" or "TOON" (case insensitive)
         raw_text: The raw output string from the model.
+        types: The task's expected_output_schema; declares TOON column types.
         
     Returns:
         The parsed Python object (usually a list of dicts).
@@ -67,7 +74,7 @@ def parse_output(format_name: str, raw_text: str) -> Any:
                     raise ParseError(f"JSON decode failed: {str(e)}")
         elif fmt == "TOON":
             try:
-                data = decode_from_toon(cleaned_text)
+                data = decode_from_toon(cleaned_text, types=types)
             except Exception as e:
                 raise ParseError(f"TOON decode failed: {str(e)}")
         else:
@@ -0,0 +1,258 @@
+import re
+import json
+from typing import Any, Dict, List, Optional
+
+from src.encoding.toon_codec import RowDecoder, parse_header, schema_decoder, column_types
+from src.evaluation.parsing import ParseError, SchemaViolation, output_schema
+from src.evaluation.correctness import (
+    GroundTruth,
+    check_task_a_row,
+    check_task_b_row,
+    check_task_c_row
+)
+
+# What the start of a `name[N]:` header can look like before its line completes
+HEADER_START_RE = re.compile(r"\w*$|\w+\[")
+
+
+class IncrementalToonDecoder:
+    """
+    Decodes a TOON reply as it streams in, one completed line at a time.
+    Uses the same header/schema/row rules as decode_from_toon; `types` is
+    the task's expected_output_schema (or {column: type}).
+    """
+    def __init__(self, types: Any = None):
+        self._buffer = ""
+        self._state = "header"
+        self._types = column_types(types)
+        self._row_decoder: Optional[RowDecoder] = None
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Returns the rows completed by this chunk. Raises ParseError on malformed input."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        rows = self._decode_lines(lines)
+
+        # A header that cannot start with "name[" is already fatal mid-line
+        if self._state == "header":
+            partial = self._buffer.lstrip()
+            fence = partial.startswith("```") or "```".startswith(partial)
+            if not fence and not HEADER_START_RE.match(partial):
+                raise ParseError(f"TOON decode failed: Invalid collection header: {partial[:80]}")
+        return rows
+
+    def finish(self) -> List[Dict]:
+        """Flushes a final line that had no trailing newline."""
+        lines, self._buffer = [self._buffer], ""
+        return self._decode_lines(lines)
+
+    def _decode_lines(self, lines: List[str]) -> List[Dict]:
+        rows = []
+        for line in lines:
+            line = line.strip()
+            # Blank lines and markdown fences are stripped by parse_output too
+            if not line or line.startswith("```"):
+                continue
+            try:
+                if self._state == "header":
+                    parse_header(line)
+                    self._state = "schema"
+                elif self._state == "schema":
+                    self._row_decoder = schema_decoder(line, self._types)
+                    self._state = "rows"
+                else:
+                    rows.append(self._row_decoder.decode(line))
+            except Exception as e:
+                raise ParseError(f"TOON decode failed: {str(e)}")
+        return rows
+
+
+class IncrementalJsonArrayDecoder:
+    """
+    Decodes the elements of a top-level JSON array as they stream in.
+
+    Text before the first '[' (chatter, markdown fences) is skipped, mirroring
+    the embedded-array fallback in parse_output. An element is only handed to
+    json.loads once its closing brace/delimiter has arrived, so a decode
+    failure always means the element is malformed, never just incomplete.
+    """
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self.closed = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        self._buffer += chunk
+        return self._drain(final=False)
+
+    def finish(self) -> List[Any]:
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> List[Any]:
+        elements = []
+        buf = self._buffer
+
+        if not self._started:
+            start = buf.find("[", self._pos)
+            if start == -1:
+                self._pos = len(buf)
+                return elements
+            self._started = True
+            self._pos = start + 1
+
+        while not self.closed:
+            # Skip whitespace and separators
+            while self._pos < len(buf) and buf[self._pos] in " \t\r\n,":
+                self._pos += 1
+            if self._pos >= len(buf):
+                break
+            if buf[self._pos] == "]":
+                self.closed = True
+                self._pos += 1
+                break
+
+            end = self._find_element_end(buf, self._pos, final)
+            if end is None:
+                break
+            raw = buf[self._pos:end]
+            try:
+                elements.append(json.loads(raw))
+            except json.JSONDecodeError as e:
+                raise ParseError(f"JSON decode failed: {str(e)}")
+            self._pos = end
+
+        # Drop consumed text so the buffer stays bounded
+        self._buffer = buf[self._pos:]
+        self._pos = 0
+        return elements
+
+    @staticmethod
+    def _find_element_end(buf: str, start: int, final: bool) -> Optional[int]:
+        """Index just past the element starting at `start`, or None if incomplete."""
+        first = buf[start]
+        if first in "{[":
+            depth = 0
+            in_string = False
+            escape = False
+            for i in range(start, len(buf)):
+                c = buf[i]
+                if in_string:
+                    if escape:
+                        escape = False
+                    elif c == "\\":
+                        escape = True
+                    elif c == '"':
+                        in_string = False
+                elif c == '"':
+                    in_string = True
+                elif c in "{[":
+                    depth += 1
+                elif c in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        return i + 1
+            return None
+
+        # Scalar element: runs until the next separator
+        for i in range(start, len(buf)):
+            if buf[i] in ",]\n":
+                return i
+        return len(buf) if final else None
+
+
+class StreamingValidator:
+    """
+    Consumes a streamed reply chunk by chunk and checks each completed row
+    against the ground truth with the same row checks as check_task_*.
+
+    feed() returns False once the result is definitely wrong, i.e. the final
+    evaluation could no longer pass: malformed rows, hallucinated ids/types,
+    rows that differ from their input record, or more rows than can be valid.
+    It never rejects on rows that are merely missing so far.
+    """
+    def __init__(self, task_name: str, format_name: str, context: GroundTruth):
+        self.task_name = task_name
+        self.context = context
+        if format_name.upper() == "TOON":
+            self.decoder = IncrementalToonDecoder(output_schema(task_name))
+        else:
+            self.decoder = IncrementalJsonArrayDecoder()
+
+        self.rows_checked = 0
+        self.abort_reason: Optional[str] = None
+        self._seen_types = set()
+
+    @property
+    def aborted(self) -> bool:
+        return self.abort_reason is not None
+
+    def feed(self, chunk: str) -> bool:
+        """Feeds a chunk. Returns True while the reply can still be correct."""
+        if self.aborted:
+            return False
+        try:
+            rows = self.decoder.feed(chunk)
+        except (ParseError, SchemaViolation) as e:
+            self.abort_reason = f"{type(e).__name__}: {str(e)}"
+            return False
+        return self._check_rows(rows)
+
+    def finish(self) -> bool:
+        """Checks any trailing row once the stream has ended."""
+        if self.aborted:
+            return False
+        try:
+            rows = self.decoder.finish()
+        except (ParseError, SchemaViolation) as e:
+            self.abort_reason = f"{type(e).__name__}: {str(e)}"
+            return False
+        return self._check_rows(rows)
+
+    def _check_rows(self, rows: List[Any]) -> bool:
+        ctx = self.context
+        for r in rows:
+            i = self.rows_checked
+            self.rows_checked += 1
+
+            if not isinstance(r, dict):
+                self.abort_reason = f"SchemaViolation: Row {i} is not an object"
+                return False
+
+            if "Task A" in self.task_name:
+                errors = check_task_a_row(i, r, ctx.input_map, ctx.row_digests)
+                rid = r.get("id")
+                if not errors and rid not in ctx.task_a_ids:
+                    errors = [f"Found 1 extra records that shouldn't be valid: ['{rid}']..."]
+            elif "Task B" in self.task_name:
+                errors = check_task_b_row(i, r, ctx.task_b_map, self._seen_types)
+            else:
+                errors = check_task_c_row(i, r, ctx.task_c_rows)
+                if not errors and self.rows_checked > ctx.input_count:
+                    errors = [f"Count mismatch. Input {ctx.input_count}, Output > {ctx.input_count}"]
+
+            if errors:
+                self.abort_reason = errors[0]
+                return False
+        return True
+
+    def summary(self, output_tokens: int, row_tokens_hint: float = 0.0) -> Dict[str, Any]:
+        """
+        Early-abort record for the log entry.
+
+        tokens_saved estimates the output tokens a complete reply would have
+        needed beyond what was received: expected row count times the observed
+        tokens per row (or `row_tokens_hint` if no row completed).
+        """
+        tokens_saved = 0
+        if self.aborted:
+            per_row = output_tokens / self.rows_checked if self.rows_checked else row_tokens_hint
+            projected = per_row * max(self.context.expected_rows(self.task_name), self.rows_checked)
+            tokens_saved = max(0, int(round(projected)) - output_tokens)
+
+        return {
+            "aborted_early": self.aborted,
+            "abort_reason": self.abort_reason,
+            "rows_checked": self.rows_checked,
+            "tokens_saved": tokens_saved
+        }
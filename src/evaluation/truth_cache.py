@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.evaluation.correctness import GroundTruth
+from src.evaluation.memo import EVALUATION_VERSION
+
+# Written next to the dataset file it was built from
+GROUND_TRUTH_FILENAME = "ground_truth.npz"
+
+# Bump when GroundTruth.artifacts() changes
+TRUTH_CACHE_VERSION = 2
+
+# Bytes per row digest (correctness.row_digest)
+ROW_DIGEST_SIZE = 16
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's bytes (much cheaper than GroundTruth.digest's canonical JSON)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_path_for(dataset_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(dataset_path)), GROUND_TRUTH_FILENAME)
+
+
+def save_ground_truth(truth: GroundTruth, dataset_path: str, cache_path: Optional[str] = None) -> str:
+    """
+    Saves the derived parts of `truth` (GroundTruth.artifacts) next to
+    `dataset_path` as an .npz of plain arrays: the row digests as a uint8
+    matrix, everything else as JSON bytes along with the dataset file's
+    digest, EVALUATION_VERSION and TRUTH_CACHE_VERSION. load_ground_truth
+    only accepts an exact match. The records themselves stay in the dataset file.
+    """
+    cache_path = cache_path or cache_path_for(dataset_path)
+    artifacts = truth.artifacts()
+    row_digests = b"".join(sorted(artifacts.pop("row_digests")))
+    meta = {
+        "version": TRUTH_CACHE_VERSION,
+        "evaluation_version": EVALUATION_VERSION,
+        "dataset_sha256": file_digest(dataset_path),
+        **artifacts
+    }
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+            row_digests=np.frombuffer(row_digests, dtype=np.uint8).reshape(-1, ROW_DIGEST_SIZE)
+        )
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def load_ground_truth(
+    dataset_path: str,
+    cache_path: Optional[str] = None,
+    records: Optional[List[Dict]] = None
+) -> Optional[GroundTruth]:
+    """
+    The GroundTruth of the dataset file with its derived parts read from the
+    cache (no pickle: arrays only), or None if missing / stale / unreadable.
+    `records` are the dataset's records if already loaded.
+    """
+    cache_path = cache_path or cache_path_for(dataset_path)
+    if not os.path.exists(cache_path) or not os.path.exists(dataset_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].tobytes())
+            if (meta.get("version") != TRUTH_CACHE_VERSION
+                    or meta.get("evaluation_version") != EVALUATION_VERSION
+                    or meta.get("dataset_sha256") != file_digest(dataset_path)):
+                return None
+            digests = data["row_digests"].tobytes()
+    except Exception as e:
+        print(f"Ignoring unreadable ground-truth cache {cache_path}: {e}")
+        return None
+
+    if records is None:
+        with open(dataset_path, "r") as f:
+            records = json.load(f)
+    meta["row_digests"] = [digests[i:i + ROW_DIGEST_SIZE] for i in range(0, len(digests), ROW_DIGEST_SIZE)]
+    return GroundTruth(records, artifacts=meta)
+
+
+def cached_ground_truth(dataset_path: str, records: Optional[List[Dict]] = None) -> GroundTruth:
+    """
+    Loads the GroundTruth cached next to `dataset_path`, or builds it from
+    `records` (default: the dataset file) and writes the cache. Without a
+    dataset file nothing is cached and `records` are used as given.
+    """
+    truth = load_ground_truth(dataset_path, records=records)
+    if truth is not None:
+        return truth
+
+    if records is None:
+        with open(dataset_path, "r") as f:
+            records = json.load(f)
+    truth = GroundTruth(records)
+    if os.path.exists(dataset_path):
+        try:
+            save_ground_truth(truth, dataset_path)
+        except OSError as e:
+            print(f"Could not write ground-truth cache next to {dataset_path}: {e}")
+    return truth
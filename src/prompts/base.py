@@ -1,3 +1,7 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.encoding.stream import iter_encode, rechunk
+
 SYSTEM_PROMPT = """You are a deterministic data processing system.
 Follow instructions exactly.
 Do not add explanations.
@@ -22,3 +26,85 @@ def assemble_prompt(task_description: str, format_name: str, data: str) -> str:
 
 Dataset:
 {data}"""
+
+def prompt_head(task_description: str, format_name: str) -> str:
+    """The template text of assemble_prompt that precedes the dataset."""
+    return assemble_prompt(task_description, format_name, "")
+
+def iter_assemble_prompt(task_description: str, format_name: str, data_chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Streaming form of assemble_prompt: yields the template text around the
+    dataset and passes `data_chunks` through without joining them.
+    """
+    yield prompt_head(task_description, format_name)
+    yield from data_chunks
+
+
+class PromptStream:
+    """
+    A user prompt that is produced on demand instead of held as one string:
+    the template pieces interleaved with a streaming encoder over `records`.
+
+    Iterating yields text chunks of about `chunk_chars` characters; every
+    iteration re-runs the encoder, so the stream can be sent again on a
+    retry. `len()` is the prompt's character count, so estimate_tokens()
+    works on it like on a string: the template's length plus `data_chars`
+    (the encoded dataset's length, when already known), or else counted
+    over the stream once and cached.
+    `str()` materializes the full prompt (for backends that need it whole).
+    """
+    def __init__(
+        self,
+        task_description: str,
+        format_name: str,
+        records: List[Dict[str, Any]],
+        chunk_chars: int = 64 * 1024,
+        data_chars: Optional[int] = None
+    ):
+        self.task_description = task_description
+        self.format_name = format_name
+        self.records = records
+        self.chunk_chars = chunk_chars
+        self._chars: Optional[int] = None
+        if data_chars is not None:
+            self._chars = len(prompt_head(task_description, format_name)) + data_chars
+
+    def __iter__(self) -> Iterator[str]:
+        chars = 0
+        pieces = iter_assemble_prompt(
+            self.task_description, self.format_name, iter_encode(self.format_name, self.records)
+        )
+        for chunk in rechunk(pieces, self.chunk_chars):
+            chars += len(chunk)
+            yield chunk
+        self._chars = chars
+
+    def __len__(self) -> int:
+        if self._chars is None:
+            self._chars = sum(len(chunk) for chunk in self)
+        return self._chars
+
+    def __str__(self) -> str:
+        return "".join(self)
+
+
+def prompt_text(prompt) -> str:
+    """Returns a prompt as one string, joining a PromptStream (or any chunk iterable)."""
+    return prompt if isinstance(prompt, str) else "".join(prompt)
+
+
+def parse_prompt(prompt: str) -> tuple[str, str, str]:
+    """
+    Inverse of assemble_prompt: splits a user prompt into
+    (format_name, task_description, data).
+    """
+    header, sep, rest = prompt.partition("\n\n")
+    prefix = "You are given a dataset encoded in "
+    if not sep or not header.startswith(prefix):
+        raise ValueError("Prompt does not follow the benchmark template")
+    format_name = header[len(prefix):].rstrip(".")
+    
+    task_description, sep, data = rest.partition("\n\nDataset:\n")
+    if not sep:
+        raise ValueError("Prompt has no Dataset section")
+    return format_name, task_description, data
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from src.prompts import task_a, task_b, task_c
+
+# Every benchmark task, in run order. A task module declares TASK_NAME,
+# TASK_DESCRIPTION, SPEC (its declarative definition), expected_output_schema
+# and get_prompt; the runner, the simulated backend, the parser and the
+# checkers all look tasks up here, so a new task is registered once.
+TASKS = [task_a, task_b, task_c]
+
+def find_task(task_name: Optional[str]):
+    """The task module for a logged task name (exact, then substring match)."""
+    for task in TASKS:
+        if task.TASK_NAME == task_name:
+            return task
+    for task in TASKS:
+        if task_name and task.TASK_NAME in task_name:
+            return task
+    return None
+
+def find_task_spec(task_name: Optional[str]):
+    """The SPEC of the task with that name, or None."""
+    task = find_task(task_name)
+    return task.SPEC if task is not None else None
+
+def find_task_by_description(task_description: str):
+    """The task module whose TASK_DESCRIPTION the prompt carries, or None."""
+    for task in TASKS:
+        if task.TASK_DESCRIPTION == task_description:
+            return task
+    return None
@@ -1,15 +1,18 @@
 from .templates import format_prompt
+from src.tasks.dsl import TaskSpec, Filter
 import sys
 
 TASK_NAME = "Task A - Filtering"
 
-TASK_DESCRIPTION = """Return records where:
-- status = failed
-- severity >= 3
-- env = prod"""
+SPEC = TaskSpec(TASK_NAME, [
+    Filter([("status", "==", "failed"), ("severity", ">=", 3), ("env", "==", "prod")])
+])
+
+# Return records where: status = failed, severity >= 3, env = prod
+TASK_DESCRIPTION = SPEC.describe()
 
 # Expected output is a subset of the original records, same schema.
-expected_output_schema = "Same as input schema (Subset of records)"
+expected_output_schema = SPEC.output_schema()
 
 def get_prompt(format: str, data: str) -> str:
     return format_prompt(
@@ -1,26 +1,22 @@
 from .templates import format_prompt
+from src.tasks.dsl import TaskSpec, GroupAggregate, Aggregate
 import sys
 
 TASK_NAME = "Task B - Aggregation"
 
-TASK_DESCRIPTION = """For each type:
-- total count
-- failed count
-- average severity"""
+SPEC = TaskSpec(TASK_NAME, [
+    GroupAggregate("type", [
+        Aggregate("total_count", "count"),
+        Aggregate("failed_count", "count", where={"status": "failed"}),
+        Aggregate("average_severity", "mean", "severity")
+    ])
+])
+
+# For each type: total count, failed count, average severity
+TASK_DESCRIPTION = SPEC.describe()
 
 # Expected output schema (logical)
-expected_output_schema = {
-    "type": "array",
-    "items": {
-        "type": "object",
-        "properties": {
-            "type": {"type": "string"},
-            "total_count": {"type": "integer"},
-            "failed_count": {"type": "integer"},
-            "average_severity": {"type": "number"}
-        }
-    }
-}
+expected_output_schema = SPEC.output_schema()
 
 def get_prompt(format: str, data: str) -> str:
     return format_prompt(
@@ -1,37 +1,21 @@
 from .templates import format_prompt
+from src.tasks.dsl import TaskSpec, Project
 import sys
 
 TASK_NAME = "Task C - Transformation"
 
-TASK_DESCRIPTION = """Flatten to:
-- id
-- timestamp
-- service
-- env
-- type
-- status
-- severity
-- region
-- latency_ms"""
+SPEC = TaskSpec(TASK_NAME, [
+    Project([
+        "id", "timestamp", "service", "env", "type", "status", "severity",
+        "metadata.region", "metadata.latency_ms"
+    ])
+])
+
+# Flatten to: id, timestamp, service, env, type, status, severity, region, latency_ms
+TASK_DESCRIPTION = SPEC.describe()
 
 # Expected output schema (logical)
-expected_output_schema = {
-    "type": "array",
-    "items": {
-        "type": "object",
-        "properties": {
-            "id": {"type": "string"},
-            "timestamp": {"type": "string"},
-            "service": {"type": "string"},
-            "env": {"type": "string"},
-            "type": {"type": "string"},
-            "status": {"type": "string"},
-            "severity": {"type": "integer"},
-            "region": {"type": "string"},
-            "latency_ms": {"type": "number"}
-        }
-    }
-}
+expected_output_schema = SPEC.output_schema()
 
 def get_prompt(format: str, data: str) -> str:
     return format_prompt(
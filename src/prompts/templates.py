@@ -1,4 +1,4 @@
-from .base import assemble_prompt
+from .base import assemble_prompt, PromptStream
 
 def format_prompt(task_module, format_name: str, data: str) -> str:
     """
@@ -9,3 +9,16 @@ def format_prompt(task_module, format_name: str, data: str) -> str:
         format_name=format_name,
         data=data
     )
+
+def stream_prompt(task_module, format_name: str, records: list, data_chars: int = None) -> PromptStream:
+    """
+    Like format_prompt, but encodes `records` lazily while the prompt is
+    consumed instead of taking an already encoded dataset string.
+    `data_chars` is the encoded dataset's length, if known (see PromptStream).
+    """
+    return PromptStream(
+        task_description=task_module.TASK_DESCRIPTION,
+        format_name=format_name,
+        records=records,
+        data_chars=data_chars
+    )
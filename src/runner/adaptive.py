@@ -0,0 +1,190 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.aggregation.aggregate import evaluate_verdict, build_metric
+from src.aggregation.stats import RunningStats, newcombe_interval, mean_diff_interval
+from src.evaluation.correctness import GroundTruth
+from src.evaluation.memo import EvaluationMemo
+
+# Stopping reasons recorded per task
+STOP_CONVERGED = "converged"
+STOP_MAX_ITERATIONS = "max_iterations"
+STOP_BUDGET = "budget"
+
+ADAPTIVE_DEFAULTS = {
+    "min_iterations": 5,
+    "correctness_ci_width": 0.2,
+    "token_ci_width": 0.05,
+    "confidence": 0.95,
+    "budget_usd": None
+}
+
+
+class AdaptiveStopper:
+    """
+    Decides, round by round, which tasks still need samples to compare two
+    formats (JSON vs TOON by default).
+
+    Every call is evaluated as it completes (verdicts memoized like the
+    aggregator's). Per (task, format) it keeps the success count and
+    streamed token stats. After each round, a task stops once both of
+    these intervals are narrower than their targets:
+    - the correctness delta between the formats (Newcombe interval,
+      absolute width)
+    - the token savings (Welch interval, width relative to the first
+      format's mean tokens)
+    Tasks never stop before `min_iterations`. All sampling stops once the
+    estimated spend reaches `budget_usd`.
+    """
+    def __init__(
+        self,
+        ground_truth: GroundTruth,
+        task_names: List[str],
+        formats: Tuple[str, str] = ("JSON", "TOON"),
+        min_iterations: int = 5,
+        correctness_ci_width: float = 0.2,
+        token_ci_width: float = 0.05,
+        confidence: float = 0.95,
+        budget_usd: Optional[float] = None,
+        memo: Optional[EvaluationMemo] = None
+    ):
+        self.ground_truth = ground_truth
+        self.task_names = list(task_names)
+        self.formats = formats
+        self.min_iterations = min_iterations
+        self.correctness_ci_width = correctness_ci_width
+        self.token_ci_width = token_ci_width
+        self.confidence = confidence
+        self.budget_usd = budget_usd
+        self.memo = memo if memo is not None else EvaluationMemo()
+
+        cells = [(t, f) for t in self.task_names for f in formats]
+        self.correct = {cell: 0 for cell in cells}
+        self.calls = {cell: 0 for cell in cells}
+        self.tokens = {cell: RunningStats() for cell in cells}
+        self.spent_usd = 0.0
+        self.stopped: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, raw_log: Dict[str, Any]):
+        """Evaluates one logged call and adds it to its cell."""
+        key = EvaluationMemo.key_for_log(raw_log, self.ground_truth.digest)
+        verdict = self.memo.get(key) if key is not None else None
+        if verdict is None:
+            verdict = evaluate_verdict(raw_log, self.ground_truth)
+            if key is not None:
+                self.memo.put(key, verdict)
+        metric = build_metric(raw_log, verdict)
+
+        cell = (metric["task"], metric["format"])
+        if cell not in self.calls:
+            return
+        self.calls[cell] += 1
+        self.correct[cell] += int(bool(metric["is_correct"]))
+        self.tokens[cell].add(metric["total_tokens"])
+        self.spent_usd += metric["estimated_cost"] + metric["wasted_cost"]
+
+    def active_tasks(self) -> List[str]:
+        return [t for t in self.task_names if t not in self.stopped]
+
+    def over_budget(self) -> bool:
+        return self.budget_usd is not None and self.spent_usd >= self.budget_usd
+
+    def intervals(self, task_name: str) -> Dict[str, Optional[Tuple[float, float, float]]]:
+        """(estimate, low, high) of the task's correctness delta (second format minus first) and token savings."""
+        a, b = (task_name, self.formats[0]), (task_name, self.formats[1])
+        if not self.calls[a] or not self.calls[b]:
+            return {"correctness_delta": None, "token_savings": None}
+        return {
+            "correctness_delta": newcombe_interval(
+                self.correct[b], self.calls[b], self.correct[a], self.calls[a], self.confidence
+            ),
+            "token_savings": mean_diff_interval(self.tokens[a], self.tokens[b], self.confidence)
+        }
+
+    def _converged(self, task_name: str) -> bool:
+        if min(self.calls[(task_name, f)] for f in self.formats) < self.min_iterations:
+            return False
+        intervals = self.intervals(task_name)
+        _, low, high = intervals["correctness_delta"]
+        if high - low > self.correctness_ci_width:
+            return False
+        _, low, high = intervals["token_savings"]
+        baseline = self.tokens[(task_name, self.formats[0])].mean
+        return baseline > 0 and (high - low) / baseline <= self.token_ci_width
+
+    def stop(self, task_name: str, reason: str, iterations: int):
+        self.stopped[task_name] = {"reason": reason, "iterations": iterations}
+
+    def end_round(self, iterations_done: int, max_iterations: int) -> List[str]:
+        """Stops the tasks that converged or ran out of iterations. Returns the tasks stopped now."""
+        stopped_now = []
+        for task_name in self.active_tasks():
+            if self.over_budget():
+                self.stop(task_name, STOP_BUDGET, iterations_done)
+            elif self._converged(task_name):
+                self.stop(task_name, STOP_CONVERGED, iterations_done)
+            elif iterations_done >= max_iterations:
+                self.stop(task_name, STOP_MAX_ITERATIONS, iterations_done)
+            else:
+                continue
+            stopped_now.append(task_name)
+        return stopped_now
+
+    def summary(self) -> Dict[str, Any]:
+        """Settings, spend and per-task stopping reason with final intervals (for the run manifest)."""
+        tasks = {}
+        for task_name in self.task_names:
+            intervals = self.intervals(task_name)
+            tasks[task_name] = {
+                **self.stopped.get(task_name, {"reason": None, "iterations": None}),
+                "calls": {f: self.calls[(task_name, f)] for f in self.formats},
+                **{
+                    name: {"estimate": round(v[0], 6), "low": round(v[1], 6), "high": round(v[2], 6)}
+                    if v is not None else None
+                    for name, v in intervals.items()
+                }
+            }
+        return {
+            "min_iterations": self.min_iterations,
+            "correctness_ci_width": self.correctness_ci_width,
+            "token_ci_width": self.token_ci_width,
+            "confidence": self.confidence,
+            "budget_usd": self.budget_usd,
+            "spent_usd": round(self.spent_usd, 6),
+            "tasks": tasks
+        }
+
+
+def create_adaptive_stopper(
+    ground_truth: GroundTruth,
+    task_names: List[str],
+    options: Optional[Dict[str, Any]] = None
+) -> AdaptiveStopper:
+    """Builds an AdaptiveStopper from flat options (keys of ADAPTIVE_DEFAULTS)."""
+    return AdaptiveStopper(ground_truth, task_names, **{**ADAPTIVE_DEFAULTS, **(options or {})})
+
+def add_adaptive_arguments(parser):
+    """Registers adaptive stopping CLI options on an argparse parser (--iterations becomes the cap)."""
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Stop sampling a task once its JSON-vs-TOON intervals are narrow enough")
+    parser.add_argument("--min-iterations", type=int, default=ADAPTIVE_DEFAULTS["min_iterations"],
+                        help="Iterations per task before it may stop")
+    parser.add_argument("--target-correctness-ci", type=float, default=ADAPTIVE_DEFAULTS["correctness_ci_width"],
+                        help="Target width of the correctness-delta interval (absolute)")
+    parser.add_argument("--target-token-ci", type=float, default=ADAPTIVE_DEFAULTS["token_ci_width"],
+                        help="Target width of the token-savings interval, relative to JSON's mean tokens")
+    parser.add_argument("--confidence", type=float, default=ADAPTIVE_DEFAULTS["confidence"],
+                        help="Confidence level of the intervals")
+    parser.add_argument("--budget-usd", type=float, default=None,
+                        help="Stop sampling once the run's estimated spend reaches this")
+
+def adaptive_options_from_args(args) -> Optional[Dict[str, Any]]:
+    """Adaptive options, or None when --adaptive is off."""
+    if not args.adaptive:
+        return None
+    return {
+        "min_iterations": args.min_iterations,
+        "correctness_ci_width": args.target_correctness_ci,
+        "token_ci_width": args.target_token_ci,
+        "confidence": args.confidence,
+        "budget_usd": args.budget_usd
+    }
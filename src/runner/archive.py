@@ -0,0 +1,255 @@
+import os
+import bz2
+import glob
+import gzip
+import json
+import lzma
+import time
+import struct
+import bisect
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.runner.logger import load_run_manifest
+from src.runner.segments import SEGMENTS_DIR, SegmentWriter, list_segments, index_path
+from src.runner.async_logger import SPILL_PREFIX
+
+# Packed run logs: runs/<run_id>/logs.pack, next to manifest.json and dataset.json
+PACK_FILENAME = "logs.pack"
+PACK_VERSION = 1
+
+# Layout: MAGIC, compressed blocks of JSON lines, JSON index, trailer
+# (index offset, index length, MAGIC). The index lists each block's
+# (byte offset, compressed length, first record, record count).
+MAGIC = b"TJBPACK1"
+TRAILER = struct.Struct("<QQ")
+
+DEFAULT_CODEC = "gzip"
+# Uncompressed bytes per block: the unit of decompression and of random access
+DEFAULT_BLOCK_BYTES = 1024 * 1024
+
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "gzip": (lambda data: gzip.compress(data, compresslevel=6, mtime=0), gzip.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+    "bz2": (bz2.compress, bz2.decompress)
+}
+
+
+def pack_path(run_dir: str) -> str:
+    return os.path.join(run_dir, PACK_FILENAME)
+
+
+def loose_log_paths(run_dir: str) -> List[str]:
+    """Every loose log file of a run: segments and their indexes, spills, per-file logs."""
+    segments = list_segments(os.path.join(run_dir, SEGMENTS_DIR))
+    paths = segments + [index_path(p) for p in segments if os.path.exists(index_path(p))]
+    paths += sorted(glob.glob(os.path.join(run_dir, f"{SPILL_PREFIX}*.jsonl")))
+    paths += sorted(p for p in glob.glob(os.path.join(run_dir, "*", "*.json")) if os.path.isfile(p))
+    return paths
+
+
+def write_pack(
+    path: str,
+    records: Iterable[Dict[str, Any]],
+    manifest: Optional[Dict[str, Any]] = None,
+    codec: str = DEFAULT_CODEC,
+    block_bytes: int = DEFAULT_BLOCK_BYTES
+) -> Dict[str, Any]:
+    """
+    Writes records to a pack file (atomically, via a temporary file) with
+    the run's manifest embedded in its index. Returns the index.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Expected one of {tuple(CODECS)}")
+    compress = CODECS[codec][0]
+
+    blocks: List[List[int]] = []
+    counts: Dict[str, int] = {}
+    total = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+
+        def write_block(lines: List[bytes], first_record: int):
+            data = compress(b"".join(lines))
+            blocks.append([f.tell(), len(data), first_record, len(lines)])
+            f.write(data)
+
+        lines: List[bytes] = []
+        pending = 0
+        for record in records:
+            line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+            lines.append(line)
+            pending += len(line)
+            key = f"{record.get('task_name')}|{record.get('format')}"
+            counts[key] = counts.get(key, 0) + 1
+            if pending >= block_bytes:
+                write_block(lines, total)
+                total += len(lines)
+                lines, pending = [], 0
+        if lines:
+            write_block(lines, total)
+            total += len(lines)
+
+        index = {
+            "version": PACK_VERSION,
+            "codec": codec,
+            "records": total,
+            "blocks": blocks,
+            "counts": counts,
+            "manifest": manifest,
+            "packed_at": time.time()
+        }
+        data = json.dumps(index).encode("utf-8")
+        index_offset = f.tell()
+        f.write(data)
+        f.write(TRAILER.pack(index_offset, len(data)) + MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return index
+
+
+def read_pack_index(path: str) -> Dict[str, Any]:
+    """Reads a pack's index from its trailer (without touching the blocks)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a run log pack")
+        f.seek(-(TRAILER.size + len(MAGIC)), os.SEEK_END)
+        trailer = f.read(TRAILER.size + len(MAGIC))
+        if trailer[TRAILER.size:] != MAGIC:
+            raise ValueError(f"{path} is truncated (no trailer)")
+        index_offset, index_length = TRAILER.unpack(trailer[:TRAILER.size])
+        f.seek(index_offset)
+        index = json.loads(f.read(index_length))
+    if index.get("version") != PACK_VERSION:
+        raise ValueError(f"{path} has pack version {index.get('version')}, expected {PACK_VERSION}")
+    return index
+
+
+def iter_pack_records(path: str, start: int = 0, index: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Streams (record_no, record) from record `start` on, one decompressed
+    block in memory at a time. The index locates the first block to read.
+    """
+    index = index or read_pack_index(path)
+    decompress = CODECS[index["codec"]][1]
+    blocks = index["blocks"]
+    first = max(bisect.bisect_right([b[2] for b in blocks], start) - 1, 0)
+    with open(path, "rb") as f:
+        for offset, length, first_record, _ in blocks[first:]:
+            f.seek(offset)
+            lines = decompress(f.read(length)).splitlines()
+            for i in range(max(start - first_record, 0), len(lines)):
+                yield first_record + i, json.loads(lines[i])
+
+
+def read_pack_record(path: str, record_no: int, index: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """One record by number, decompressing only its block."""
+    index = index or read_pack_index(path)
+    if not 0 <= record_no < index["records"]:
+        raise IndexError(f"Record {record_no} out of range (pack has {index['records']})")
+    return next(iter_pack_records(path, record_no, index))[1]
+
+
+def pack_run(
+    run_dir: str,
+    codec: str = DEFAULT_CODEC,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+    keep_loose: bool = False,
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Compacts a run's logs (an existing pack, then segments, spills and
+    per-file logs, read like the aggregator does: once per entry_id) into
+    runs/<run_id>/logs.pack, then removes the loose files unless
+    `keep_loose`. Runs whose manifest says "running" are refused unless
+    `force`. Returns the pack's index.
+    """
+    # Imported here: the aggregator itself reads packs through this module
+    from src.aggregation.aggregate import iter_run_logs
+
+    manifest = load_run_manifest(run_dir)
+    if manifest is not None and manifest.get("status") == "running" and not force:
+        raise ValueError(f"{run_dir} is still running; pass force=True to pack it anyway")
+
+    loose = loose_log_paths(run_dir)
+    index = write_pack(
+        pack_path(run_dir), (raw_log for _, raw_log in iter_run_logs(run_dir)),
+        manifest=manifest, codec=codec, block_bytes=block_bytes
+    )
+
+    if not keep_loose:
+        for path in loose:
+            os.remove(path)
+        for sub_dir in {os.path.dirname(p) for p in loose} - {os.path.normpath(run_dir)}:
+            if os.path.isdir(sub_dir) and not os.listdir(sub_dir):
+                os.rmdir(sub_dir)
+    return index
+
+
+def unpack_run(run_dir: str) -> int:
+    """
+    Writes a packed run's records back to log segments (e.g. to resume the
+    run) and removes the pack. Returns the number of records.
+    """
+    path = pack_path(run_dir)
+    writer = SegmentWriter(os.path.join(run_dir, SEGMENTS_DIR))
+    try:
+        count = writer.append_many(record for _, record in iter_pack_records(path))
+    finally:
+        writer.close()
+    os.remove(path)
+    return count
+
+
+def _dir_bytes(paths: List[str]) -> int:
+    return sum(os.path.getsize(p) for p in paths)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack run logs into one compressed, indexed archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_pack = sub.add_parser("pack", help="Pack run directories")
+    p_pack.add_argument("run_dirs", nargs="+", help="Run directories (e.g. runs/run_xyz)")
+    p_pack.add_argument("--codec", choices=sorted(CODECS), default=DEFAULT_CODEC)
+    p_pack.add_argument("--block-bytes", type=int, default=DEFAULT_BLOCK_BYTES, help="Uncompressed bytes per block")
+    p_pack.add_argument("--keep-loose", action="store_true", help="Keep the loose log files")
+    p_pack.add_argument("--force", action="store_true", help="Pack runs still marked running")
+
+    p_unpack = sub.add_parser("unpack", help="Restore packed runs to log segments")
+    p_unpack.add_argument("run_dirs", nargs="+")
+
+    p_info = sub.add_parser("info", help="Show a packed run's index")
+    p_info.add_argument("run_dir")
+
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        for run_dir in args.run_dirs:
+            if not os.path.exists(pack_path(run_dir)) and not loose_log_paths(run_dir):
+                print(f"Skipping {run_dir}: no logs")
+                continue
+            before = _dir_bytes(loose_log_paths(run_dir) + [p for p in [pack_path(run_dir)] if os.path.exists(p)])
+            try:
+                index = pack_run(run_dir, args.codec, args.block_bytes, args.keep_loose, args.force)
+            except ValueError as e:
+                print(f"Skipping {run_dir}: {e}")
+                continue
+            after = os.path.getsize(pack_path(run_dir))
+            print(f"Packed {index['records']} records of {run_dir} into {len(index['blocks'])} {args.codec} blocks: "
+                  f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    elif args.command == "unpack":
+        for run_dir in args.run_dirs:
+            print(f"Unpacked {unpack_run(run_dir)} records of {run_dir}")
+    elif args.command == "info":
+        index = read_pack_index(pack_path(args.run_dir))
+        manifest = index.get("manifest") or {}
+        print(f"{pack_path(args.run_dir)}: {index['records']} records, {len(index['blocks'])} {index['codec']} blocks, "
+              f"{os.path.getsize(pack_path(args.run_dir)) / 1e6:.1f} MB")
+        print(f"run {manifest.get('run_id')} ({manifest.get('model')}, size {manifest.get('dataset_size')}, "
+              f"status {manifest.get('status')})")
+        for key, n in sorted(index["counts"].items()):
+            print(f"  {key}: {n}")
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from typing import Dict, Any, List, Optional
+
+from src.runner.logger import RunLogger
+
+# Entries that could not be written by the background thread end up here
+# (runs/<run_id>/spill-<pid>.jsonl); the aggregator reads them like a segment.
+SPILL_PREFIX = "spill-"
+
+_STOP = object()
+
+# How often a producer blocked on a full queue checks that the writer is still alive
+PUT_POLL_S = 0.1
+
+
+class AsyncRunLogger:
+    """
+    Moves RunLogger writes off the execution path.
+
+    log_task_execution() only builds the entry and hands it to a bounded queue;
+    a dedicated writer thread drains the queue in batches. When the queue is
+    full the producer blocks (backpressure) instead of growing memory.
+
+    Entries are never dropped: a batch that fails to write is retried, then
+    kept and re-attempted on close(), and as a last resort spilled to a plain
+    JSONL file in the run directory.
+    """
+    def __init__(
+        self,
+        logger: RunLogger,
+        max_queue: int = 1024,
+        batch_size: int = 64,
+        max_write_attempts: int = 3
+    ):
+        self.logger = logger
+        self.run_id = logger.run_id
+        self.run_dir = logger.run_dir
+        self.batch_size = batch_size
+        self.max_write_attempts = max_write_attempts
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._failed: List[Dict[str, Any]] = []
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self.last_error: Optional[BaseException] = None
+
+        self._counters = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "max_queue_depth": 0,
+            "backpressure_waits": 0,
+            "backpressure_wait_ms": 0.0,
+            "write_errors": 0,
+            "write_ms_total": 0.0,
+            "write_ms_max": 0.0,
+            "spilled": 0
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{self.run_id}", daemon=True)
+        self._thread.start()
+
+        # Interpreter shutdown (including an unhandled KeyboardInterrupt) still drains the queue
+        atexit.register(self.close)
+
+    # Producer side
+
+    def log_task_execution(
+        self,
+        task_name: str,
+        format_name: str,
+        model_name: str,
+        execution_result: Dict[str, Any]
+    ):
+        """Queues a single task execution result for the writer thread."""
+        entry = self.logger.build_log_entry(task_name, format_name, model_name, execution_result)
+        self.enqueue(entry)
+
+    def enqueue(self, entry: Dict[str, Any]):
+        if self._closed:
+            raise ValueError("AsyncRunLogger is closed")
+
+        if not self._thread.is_alive():
+            # Writer is gone: hand off synchronously rather than lose the entry
+            self._write_batch([entry])
+            return
+
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            start = time.perf_counter()
+            queued = self._put(entry)
+            with self._stats_lock:
+                self._counters["backpressure_waits"] += 1
+                self._counters["backpressure_wait_ms"] += (time.perf_counter() - start) * 1000
+            if not queued:
+                self._write_batch([entry])
+                return
+
+        with self._stats_lock:
+            self._counters["enqueued"] += 1
+            depth = self._queue.qsize()
+            if depth > self._counters["max_queue_depth"]:
+                self._counters["max_queue_depth"] = depth
+
+    def _put(self, item) -> bool:
+        """Blocking put that gives up if the writer thread dies meanwhile. Returns whether it queued."""
+        while True:
+            try:
+                self._queue.put(item, timeout=PUT_POLL_S)
+                return True
+            except queue.Full:
+                if not self._thread.is_alive():
+                    return False
+
+    # Writer side
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+
+            # Opportunistically drain whatever else is already queued
+            taken = 1
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+                    self.logger.flush()
+            except Exception as e:
+                # Keep the thread alive: entries written but not flushed stay
+                # buffered in the logger and are flushed again on close()
+                self.last_error = e
+                with self._stats_lock:
+                    self._counters["write_errors"] += 1
+                print(f"Warning: log writer flush failed ({e})")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        for attempt in range(self.max_write_attempts):
+            start = time.perf_counter()
+            try:
+                self.logger.write_entries(batch)
+            except Exception as e:
+                self.last_error = e
+                with self._stats_lock:
+                    self._counters["write_errors"] += 1
+                time.sleep(0.01 * (attempt + 1))
+                continue
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._counters["written"] += len(batch)
+                self._counters["batches"] += 1
+                self._counters["write_ms_total"] += elapsed_ms
+                self._counters["write_ms_max"] = max(self._counters["write_ms_max"], elapsed_ms)
+            return
+
+        print(f"Warning: log writer failed {self.max_write_attempts} times ({self.last_error}); keeping {len(batch)} entries for retry on close")
+        with self._stats_lock:
+            self._failed.extend(batch)
+
+    # Lifecycle
+
+    def flush(self):
+        """Blocks until every queued entry has been handed to the underlying logger."""
+        if self._thread.is_alive():
+            self._queue.join()
+        self.logger.flush()
+
+    def close(self):
+        """Drains the queue, retries failed batches, spills leftovers and closes the logger."""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._thread.is_alive() and self._put(_STOP):
+            self._thread.join()
+
+        # Anything still queued (the writer died) goes through the retry-or-spill path
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._failed.append(item)
+
+        if self._failed:
+            pending, self._failed = self._failed, []
+            try:
+                self.logger.write_entries(pending)
+                with self._stats_lock:
+                    self._counters["written"] += len(pending)
+            except Exception as e:
+                self.last_error = e
+                self._spill(pending)
+
+        try:
+            self.logger.close()
+        finally:
+            atexit.unregister(self.close)
+
+    def _spill(self, entries: List[Dict[str, Any]]):
+        path = os.path.join(self.run_dir, f"{SPILL_PREFIX}{os.getpid()}.jsonl")
+        with open(path, "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        with self._stats_lock:
+            self._counters["spilled"] += len(entries)
+        print(f"Warning: spilled {len(entries)} log entries to {path}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and write latency counters."""
+        with self._stats_lock:
+            c = dict(self._counters)
+        c["queue_depth"] = self._queue.qsize()
+        c["mean_batch_write_ms"] = round(c["write_ms_total"] / c["batches"], 3) if c["batches"] else 0.0
+        c["write_ms_total"] = round(c["write_ms_total"], 3)
+        c["write_ms_max"] = round(c["write_ms_max"], 3)
+        c["backpressure_wait_ms"] = round(c["backpressure_wait_ms"], 3)
+        return c
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
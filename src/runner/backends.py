@@ -0,0 +1,120 @@
+from typing import Dict, Any, Optional
+
+from src.runner.executor import MockBackend
+from src.runner.simulated import SimulatedBackend, LatencyModel
+from src.runner.http_backend import HTTPBackend
+from src.runner.stub_server import StubChatServer, StubBackend
+
+BACKENDS = ["mock", "simulated", "http", "stub"]
+
+HTTP_OPTIONS = ["api_key", "pool_size", "timeout", "compress", "compress_min_bytes", "streaming"]
+
+def _create_simulated(options: Dict[str, Any]) -> SimulatedBackend:
+    distribution = options.pop("latency_distribution", "fixed")
+    jitter_ms = options.pop("latency_jitter_ms", 0.0)
+    ttft = LatencyModel(options.pop("ttft_ms", 0.0), distribution, jitter_ms)
+    per_token = LatencyModel(options.pop("per_token_ms", 0.0), distribution, jitter_ms)
+    return SimulatedBackend(ttft=ttft, per_token=per_token, **options)
+
+def create_backend(name: str = "mock", options: Optional[Dict[str, Any]] = None):
+    """
+    Builds a model backend by name.
+
+    Options:
+    - mock: first_token_delay_ms, per_token_delay_ms, prefill_ms_per_1k_tokens
+    - simulated: seed, drop_rate, hallucination_rate, drift_rate, format_break_rate,
+      error_rate, rate_limit_rate, retry_after_s, ttft_ms, per_token_ms, latency_distribution, latency_jitter_ms,
+      prefill_ms_per_1k_tokens
+    - http: base_url, api_key, pool_size, timeout, compress, compress_min_bytes, streaming
+    - stub: the http options (minus base_url) plus the simulated options and
+      server_latency_ms; starts an in-process StubChatServer and talks to it over HTTP
+      (the backend's close() stops the server)
+    """
+    options = dict(options or {})
+
+    if name == "mock":
+        return MockBackend(**options)
+
+    if name == "simulated":
+        return _create_simulated(options)
+
+    if name == "http":
+        return HTTPBackend(**options)
+
+    if name == "stub":
+        http_options = {k: options.pop(k) for k in HTTP_OPTIONS if k in options}
+        options.pop("base_url", None)
+        server_latency = LatencyModel(options.pop("server_latency_ms", 0.0))
+        server = StubChatServer(backend=_create_simulated(options), latency=server_latency).start()
+        return StubBackend(server, **http_options)
+
+    raise ValueError(f"Unknown backend '{name}'. Expected one of {BACKENDS}")
+
+def add_backend_arguments(parser):
+    """Registers --backend and per-backend CLI options on an argparse parser."""
+    parser.add_argument("--backend", type=str, default="mock", choices=BACKENDS, help="Model backend")
+    parser.add_argument("--mock-ttft-ms", type=float, default=0.0, help="Mock backend delay before the first token")
+    parser.add_argument("--mock-token-delay-ms", type=float, default=0.0, help="Mock backend delay per output token")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="Mock/simulated prefill delay per 1k input tokens")
+    parser.add_argument("--sim-seed", type=int, default=0, help="Simulated backend error-injection seed")
+    parser.add_argument("--sim-drop-rate", type=float, default=0.0, help="Probability of dropping each answer row")
+    parser.add_argument("--sim-hallucination-rate", type=float, default=0.0,
+                        help="Probability of inserting a fabricated row after each row")
+    parser.add_argument("--sim-drift-rate", type=float, default=0.0,
+                        help="Probability of perturbing a numeric field in each row")
+    parser.add_argument("--sim-format-break-rate", type=float, default=0.0,
+                        help="Probability of breaking the reply format")
+    parser.add_argument("--sim-error-rate", type=float, default=0.0,
+                        help="Probability of a call failing with HTTP 503")
+    parser.add_argument("--sim-rate-limit-rate", type=float, default=0.0,
+                        help="Probability of a call failing with HTTP 429")
+    parser.add_argument("--sim-retry-after-s", type=float, default=None,
+                        help="Retry-After sent with simulated 429s")
+    parser.add_argument("--sim-ttft-ms", type=float, default=0.0, help="Simulated time to first token")
+    parser.add_argument("--sim-token-ms", type=float, default=0.0, help="Simulated delay per output token")
+    parser.add_argument("--sim-latency-dist", type=str, default="fixed", choices=["fixed", "uniform", "lognormal"],
+                        help="Distribution of simulated latencies")
+    parser.add_argument("--sim-latency-jitter-ms", type=float, default=0.0, help="Jitter for --sim-latency-dist uniform")
+    parser.add_argument("--http-base-url", type=str, default="https://api.openai.com",
+                        help="OpenAI-compatible endpoint for --backend http")
+    parser.add_argument("--http-pool-size", type=int, default=8, help="Keep-alive connections per host")
+    parser.add_argument("--http-timeout", type=float, default=60.0, help="Socket timeout in seconds")
+    parser.add_argument("--http-compress", action="store_true", help="gzip-compress request bodies")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Extra per-request latency for --backend stub")
+
+def backend_options_from_args(args) -> Dict[str, Any]:
+    """Picks the options relevant to args.backend out of parsed CLI args."""
+    http_options = {
+        "pool_size": args.http_pool_size,
+        "timeout": args.http_timeout,
+        "compress": args.http_compress
+    }
+    if args.backend == "http":
+        return {"base_url": args.http_base_url, **http_options}
+
+    if args.backend in ("simulated", "stub"):
+        options = {
+            "seed": args.sim_seed,
+            "drop_rate": args.sim_drop_rate,
+            "hallucination_rate": args.sim_hallucination_rate,
+            "drift_rate": args.sim_drift_rate,
+            "format_break_rate": args.sim_format_break_rate,
+            "error_rate": args.sim_error_rate,
+            "rate_limit_rate": args.sim_rate_limit_rate,
+            "retry_after_s": args.sim_retry_after_s,
+            "ttft_ms": args.sim_ttft_ms,
+            "per_token_ms": args.sim_token_ms,
+            "latency_distribution": args.sim_latency_dist,
+            "latency_jitter_ms": args.sim_latency_jitter_ms,
+            "prefill_ms_per_1k_tokens": args.prefill_ms_per_1k
+        }
+        if args.backend == "stub":
+            options.update(http_options, server_latency_ms=args.stub_latency_ms)
+        return options
+
+    return {
+        "first_token_delay_ms": args.mock_ttft_ms,
+        "per_token_delay_ms": args.mock_token_delay_ms,
+        "prefill_ms_per_1k_tokens": args.prefill_ms_per_1k
+    }
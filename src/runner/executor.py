@@ -1,42 +1,231 @@
 import time
-from typing import Dict, Any
+import uuid
+import datetime
+from typing import Dict, Any, Iterator, List, Optional
+
+# Mock token counting (rough approximation: 1 token ~= 4 chars)
+CHARS_PER_TOKEN = 4
+
+# Shortest decode span (after the first chunk) a tokens/sec rate is reported for
+MIN_DECODE_S = 0.001
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+def estimate_tokens_stream(chunks) -> int:
+    """estimate_tokens over an iterable of text chunks, without joining them."""
+    return sum(len(chunk) for chunk in chunks) // CHARS_PER_TOKEN
+
+
+class BackendError(Exception):
+    """
+    Raised by a backend when a model call fails.
+    `status` is the HTTP status (None for transport errors) and `retry_after`
+    the server-requested delay in seconds, if any.
+    """
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class MockBackend:
+    """
+    Placeholder backend for scaffolding.
+    In a real implementation, this would call OpenAI/Anthropic/Gemini APIs.
+
+    Streams its output in ~1-token chunks, optionally sleeping before the first
+    chunk (fixed delay plus prefill proportional to prompt tokens) and between
+    chunks (decode) to simulate latency.
+    """
+    def __init__(
+        self,
+        first_token_delay_ms: float = 0.0,
+        per_token_delay_ms: float = 0.0,
+        prefill_ms_per_1k_tokens: float = 0.0
+    ):
+        self.first_token_delay_ms = first_token_delay_ms
+        self.per_token_delay_ms = per_token_delay_ms
+        self.prefill_ms_per_1k_tokens = prefill_ms_per_1k_tokens
+
+    def stream(self, model_name: str, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        # Simple mock output based on system prompt presence to ensure flow works
+        mock_output = f"[MOCK_OUTPUT] Processed input length {len(user_prompt)} chars."
+
+        prefill_ms = self.prefill_ms_per_1k_tokens * (estimate_tokens(system_prompt) + estimate_tokens(user_prompt)) / 1000
+        if self.first_token_delay_ms or prefill_ms:
+            time.sleep((self.first_token_delay_ms + prefill_ms) / 1000)
+
+        for i in range(0, len(mock_output), CHARS_PER_TOKEN):
+            if i and self.per_token_delay_ms:
+                time.sleep(self.per_token_delay_ms / 1000)
+            yield mock_output[i:i + CHARS_PER_TOKEN]
+
+    def sample(self, model_name: str, system_prompt: str, user_prompt: str, n: int) -> List[str]:
+        """n completions from one request: prefill once, samples decode in parallel."""
+        chunks = list(self.stream(model_name, system_prompt, user_prompt))
+        return ["".join(chunks)] * n
+
+
+class StreamingResponse:
+    """
+    Iterates output chunks from a backend stream while recording timing:
+    request start, time to first chunk, total latency and output tokens/sec.
+
+    Iterate it to consume the stream, or call collect(). cancel() stops the
+    underlying generation early.
+    """
+    def __init__(self, chunks: Iterator[str], input_tokens: int):
+        self.input_tokens = input_tokens
+        self.request_start = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.cancelled = False
+
+        self._chunks = chunks
+        self._parts: List[str] = []
+        self._start = time.perf_counter()
+        self._first_chunk_at: Optional[float] = None
+        self._first_chunk_chars = 0
+        self._finished_at: Optional[float] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            if self._first_chunk_at is None:
+                self._first_chunk_at = time.perf_counter()
+                self._first_chunk_chars = len(chunk)
+            self._parts.append(chunk)
+            yield chunk
+            if self.cancelled:
+                return
+        self._finished_at = time.perf_counter()
+
+    def collect(self) -> Dict[str, Any]:
+        """Consumes the remaining stream and returns the execution result."""
+        for _ in self:
+            pass
+        return self.result()
+
+    def cancel(self):
+        """Stops the generation; output received so far is kept."""
+        self.cancelled = True
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+        if self._finished_at is None:
+            self._finished_at = time.perf_counter()
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def timing(self) -> Dict[str, Any]:
+        end = self._finished_at if self._finished_at is not None else time.perf_counter()
+
+        ttft_ms = None
+        tokens_per_sec = None
+        if self._first_chunk_at is not None:
+            ttft_ms = (self._first_chunk_at - self._start) * 1000
+            # Decode throughput: tokens after the first chunk over the time after it.
+            # A reply that arrived in one chunk (non-streaming backends) has none.
+            decode_s = end - self._first_chunk_at
+            if len(self._parts) > 1 and decode_s >= MIN_DECODE_S:
+                tokens_per_sec = estimate_tokens(self.text[self._first_chunk_chars:]) / decode_s
+
+        return {
+            "request_start": self.request_start,
+            "ttft_ms": round(ttft_ms, 3) if ttft_ms is not None else None,
+            "latency_ms": round((end - self._start) * 1000, 3),
+            "output_tokens_per_sec": round(tokens_per_sec, 2) if tokens_per_sec is not None else None
+        }
+
+    def result(self) -> Dict[str, Any]:
+        raw_output = self.text
+        output_tokens = estimate_tokens(raw_output)
+        return {
+            "raw_output": raw_output,
+            "usage": {
+                "input_tokens": self.input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": self.input_tokens + output_tokens
+            },
+            "timing": self.timing()
+        }
+
 
 class ModelExecutor:
     """
     Wraps interaction with a language model.
-    Currently implements a mock interface or placeholder for actual API calls.
+    Delegates generation to a streaming backend (MockBackend by default).
     """
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, backend=None):
         self.api_key = api_key
+        self.backend = backend or MockBackend()
+
+    def stream(self, model_name: str, system_prompt: str, user_prompt: str) -> StreamingResponse:
+        """
+        Starts a streaming execution. The request clock starts here.
+        """
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        chunks = self.backend.stream(model_name, system_prompt, user_prompt)
+        return StreamingResponse(chunks, input_tokens=input_tokens)
 
     def execute(self, model_name: str, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
         """
         Executes a prompt against the specified model.
-        
+
         Returns:
             Dict containing:
             - raw_output (str)
             - usage (dict): {input_tokens, output_tokens, total_tokens}
+            - timing (dict): {request_start, ttft_ms, latency_ms, output_tokens_per_sec}
         """
-        
-        # MOCK IMPLEMENTATION for scaffolding
-        # In a real implementation, this would call OpenAI/Anthropic/Gemini APIs
-        
-        # Simulate some latency
-        # time.sleep(0.1) 
-        
-        # Simple mock output based on system prompt presence to ensure flow works
-        mock_output = f"[MOCK_OUTPUT] Processed input length {len(user_prompt)} chars."
-        
-        # Mock token counting (rough approximation: 1 token ~= 4 chars)
-        input_tokens = len(system_prompt) // 4 + len(user_prompt) // 4
-        output_tokens = len(mock_output) // 4
-        
-        return {
-            "raw_output": mock_output,
-            "usage": {
-                "input_tokens": input_tokens,
-                "output_tokens": output_tokens,
-                "total_tokens": input_tokens + output_tokens
-            }
-        }
+        return self.stream(model_name, system_prompt, user_prompt).collect()
+
+    def execute_n(self, model_name: str, system_prompt: str, user_prompt: str, n: int) -> List[Dict[str, Any]]:
+        """
+        Requests `n` completions of one prompt and returns one result per sample.
+
+        Backends with a `sample()` method answer all n from a single request,
+        so the prompt is sent (and billed) once: each sample's usage carries
+        `billed_input_tokens` = its 1/n share of the input. Other backends
+        fall back to n separate calls, each billed in full.
+
+        Every result has a `sampling` record {request_id, sample_index, n_samples};
+        samples of one request share its timing.
+        """
+        request_id = uuid.uuid4().hex
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+
+        sample = getattr(self.backend, "sample", None)
+        if sample is None or n == 1:
+            results = [self.execute(model_name, system_prompt, user_prompt) for _ in range(n)]
+            for result in results:
+                result["usage"]["billed_input_tokens"] = input_tokens
+        else:
+            request_start = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            start = time.perf_counter()
+            texts = sample(model_name, system_prompt, user_prompt, n)
+            latency_s = time.perf_counter() - start
+
+            results = []
+            for text in texts:
+                output_tokens = estimate_tokens(text)
+                results.append({
+                    "raw_output": text,
+                    "usage": {
+                        "input_tokens": input_tokens,
+                        "billed_input_tokens": round(input_tokens / len(texts), 3),
+                        "output_tokens": output_tokens,
+                        "total_tokens": input_tokens + output_tokens
+                    },
+                    "timing": {
+                        "request_start": request_start,
+                        # Not streamed: the first token arrives with the whole reply
+                        "ttft_ms": round(latency_s * 1000, 3),
+                        "latency_ms": round(latency_s * 1000, 3),
+                        "output_tokens_per_sec": round(output_tokens / latency_s, 2) if latency_s > 0 else None
+                    }
+                })
+
+        for i, result in enumerate(results):
+            result["sampling"] = {"request_id": request_id, "sample_index": i, "n_samples": len(results)}
+        return results
@@ -0,0 +1,561 @@
+import os
+import ssl
+import gzip
+import json
+import zlib
+import queue
+import asyncio
+import threading
+import http.client
+from urllib.parse import urlsplit
+from typing import Dict, Any, Callable, Iterable, Iterator, AsyncIterator, List, Optional, Tuple, Union
+
+from src.runner.executor import BackendError
+
+CHAT_COMPLETIONS_PATH = "/v1/chat/completions"
+
+# Errors that mean a pooled keep-alive connection went stale between requests
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError
+)
+
+
+def build_chat_payload(
+    model_name: str,
+    system_prompt: str,
+    user_prompt: str,
+    stream: bool,
+    n: int = 1
+) -> Dict[str, Any]:
+    """OpenAI-compatible chat completion request body."""
+    payload = {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": 0,
+        "stream": stream
+    }
+    if n > 1:
+        payload["n"] = n
+    return payload
+
+
+# Placeholder for the user message while the rest of the payload is serialized
+_USER_CONTENT_MARKER = "\x00user-prompt\x00"
+
+
+def iter_chat_payload(
+    model_name: str,
+    system_prompt: str,
+    user_chunks: Iterable[str],
+    stream: bool,
+    n: int = 1
+) -> Iterator[bytes]:
+    """
+    Streaming form of json.dumps(build_chat_payload(...)): the user message
+    is JSON-escaped chunk by chunk (string escaping is per character, so
+    chunk boundaries do not matter) and never joined into one string.
+    """
+    payload = build_chat_payload(model_name, system_prompt, _USER_CONTENT_MARKER, stream=stream, n=n)
+    head, tail = json.dumps(payload).split(json.dumps(_USER_CONTENT_MARKER)[1:-1])
+    yield head.encode("utf-8")
+    for chunk in user_chunks:
+        if chunk:
+            yield json.dumps(chunk)[1:-1].encode("utf-8")
+    yield tail.encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 5) -> Iterator[bytes]:
+    """Gzip-compresses a byte stream incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class StreamingBody:
+    """
+    Re-iterable request body: each iteration calls `factory` for a fresh
+    byte stream, so a request can be re-sent (stale connection retry)
+    without buffering the body. http.client sends an iterable body with
+    Transfer-Encoding: chunked.
+    """
+    def __init__(self, factory: Callable[[], Iterable[bytes]]):
+        self.factory = factory
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.factory())
+
+
+def encode_chat_request(
+    model_name: str,
+    system_prompt: str,
+    user_prompt,
+    stream: bool,
+    n: int = 1,
+    compress: bool = False,
+    compress_min_bytes: int = 1024
+) -> Tuple[Union[bytes, StreamingBody], Dict[str, str]]:
+    """
+    Returns (body, content headers) for a chat request.
+
+    A string prompt gives a bytes body. Any other prompt (a PromptStream or
+    iterable of text chunks) gives a StreamingBody sent chunked; its size
+    is unknown up front, so it is compressed whenever `compress` is set.
+    """
+    headers = {"Content-Type": "application/json"}
+    if isinstance(user_prompt, str):
+        body = json.dumps(build_chat_payload(model_name, system_prompt, user_prompt, stream=stream, n=n)).encode("utf-8")
+        if compress and len(body) >= compress_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def factory() -> Iterable[bytes]:
+        chunks = iter_chat_payload(model_name, system_prompt, user_prompt, stream=stream, n=n)
+        return gzip_chunks(chunks) if compress else chunks
+
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingBody(factory), headers
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def iter_sse_content(lines: Iterator[bytes]) -> Iterator[str]:
+    """Yields delta content from an OpenAI-style server-sent event stream."""
+    for raw in lines:
+        line = raw.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            return
+        event = json.loads(data)
+        for choice in event.get("choices", []):
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections to a single host.
+    At most `size` connections exist at once; callers block for a free one.
+    """
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.stats = {"connections_created": 0, "requests": 0, "reused": 0, "stale_retries": 0}
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.stats["connections_created"] += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout,
+                                               context=ssl.create_default_context())
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Returns (connection, reused)."""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool):
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Union[bytes, StreamingBody],
+        headers: Dict[str, str]
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Sends a request on a pooled connection and returns (connection, response).
+        The caller must read the response and then release() the connection.
+        A stale reused connection is replaced once, transparently.
+        A StreamingBody is sent with chunked transfer encoding.
+        """
+        conn, reused = self.acquire()
+        for attempt in range(2):
+            try:
+                conn.request(method, self.base_path + path, body=body, headers=headers)
+                response = conn.getresponse()
+                with self._lock:
+                    self.stats["requests"] += 1
+                    if reused:
+                        self.stats["reused"] += 1
+                return conn, response
+            except STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                if not reused or attempt:
+                    self._slots.release()
+                    raise BackendError(f"Connection failed: {e}") from e
+                with self._lock:
+                    self.stats["stale_retries"] += 1
+                conn, reused = self._new_connection(), False
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                self._slots.release()
+                raise BackendError(f"Request failed: {e}") from e
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HTTPBackend:
+    """
+    Backend for OpenAI-compatible chat completion endpoints.
+
+    Requests go over a pool of keep-alive connections, so TCP/TLS setup is
+    paid once per pooled connection rather than once per call. Request bodies
+    at least `compress_min_bytes` long are gzip-compressed when `compress` is set.
+    A non-string user prompt (PromptStream) is sent as a chunked body.
+    """
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        pool_size: int = 8,
+        timeout: float = 60.0,
+        compress: bool = False,
+        compress_min_bytes: int = 1024,
+        streaming: bool = True
+    ):
+        self.base_url = base_url
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        self.streaming = streaming
+        self.pool = ConnectionPool(base_url, size=pool_size, timeout=timeout)
+
+    def _request_body(
+        self,
+        model_name: str,
+        system_prompt: str,
+        user_prompt,
+        stream: bool,
+        n: int = 1
+    ) -> Tuple[Union[bytes, StreamingBody], Dict[str, str]]:
+        body, headers = encode_chat_request(
+            model_name, system_prompt, user_prompt, stream=stream, n=n,
+            compress=self.compress, compress_min_bytes=self.compress_min_bytes
+        )
+        headers.update({
+            "Accept": "text/event-stream" if stream else "application/json",
+            "Accept-Encoding": "identity" if stream else "gzip",
+            "Connection": "keep-alive"
+        })
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return body, headers
+
+    @staticmethod
+    def _raise_for_status(response: http.client.HTTPResponse):
+        if response.status < 400:
+            return
+        detail = response.read()[:500].decode("utf-8", "replace")
+        raise BackendError(
+            f"HTTP {response.status}: {detail}",
+            status=response.status,
+            retry_after=parse_retry_after(response.getheader("Retry-After"))
+        )
+
+    def complete(self, model_name: str, system_prompt: str, user_prompt: str, n: int = 1) -> Dict[str, Any]:
+        """Non-streaming call. Returns the decoded response JSON."""
+        body, headers = self._request_body(model_name, system_prompt, user_prompt, stream=False, n=n)
+
+        conn, response = self.pool.request("POST", CHAT_COMPLETIONS_PATH, body, headers)
+        try:
+            self._raise_for_status(response)
+            data = response.read()
+        finally:
+            # Only a fully read response leaves the connection usable
+            self.pool.release(conn, response.isclosed() and not response.will_close)
+
+        if response.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        return json.loads(data)
+
+    def sample(self, model_name: str, system_prompt: str, user_prompt: str, n: int) -> List[str]:
+        """n completions from one non-streaming request (the `n` request parameter)."""
+        choices = self.complete(model_name, system_prompt, user_prompt, n=n)["choices"]
+        return [c["message"]["content"] for c in sorted(choices, key=lambda c: c.get("index", 0))]
+
+    def stream(self, model_name: str, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        if not self.streaming:
+            data = self.complete(model_name, system_prompt, user_prompt)
+            yield data["choices"][0]["message"]["content"]
+            return
+
+        body, headers = self._request_body(model_name, system_prompt, user_prompt, stream=True)
+
+        conn, response = self.pool.request("POST", CHAT_COMPLETIONS_PATH, body, headers)
+        try:
+            self._raise_for_status(response)
+            yield from iter_sse_content(iter(response.readline, b""))
+            # Consume the terminating chunk so the connection can be reused
+            response.read()
+        finally:
+            # A cancelled stream leaves unread bytes on the socket: drop the connection
+            self.pool.release(conn, response.isclosed() and not response.will_close)
+
+    def close(self):
+        self.pool.close()
+
+
+class _AsyncConnection:
+    """Minimal HTTP/1.1 client connection over asyncio streams."""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+
+    async def send(self, method: str, target: str, host: str, headers: Dict[str, str], body):
+        """Sends bytes with Content-Length, or an iterable of bytes chunked."""
+        chunked = not isinstance(body, bytes)
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}"]
+        lines.append("Transfer-Encoding: chunked" if chunked else f"Content-Length: {len(body)}")
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        if not chunked:
+            self.writer.write(head + body)
+            await self.writer.drain()
+            return
+
+        self.writer.write(head)
+        for chunk in body:
+            if chunk:
+                self.writer.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                # Wait for the socket to drain so at most one chunk is buffered
+                await self.writer.drain()
+        self.writer.write(b"0\r\n\r\n")
+        await self.writer.drain()
+
+    async def read_head(self) -> Tuple[int, Dict[str, str]]:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if headers.get("connection", "").lower() == "close":
+            self.reusable = False
+        return status, headers
+
+    async def iter_body(self, headers: Dict[str, str]) -> AsyncIterator[bytes]:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await self.reader.readline()
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await self.reader.readline()
+                    return
+                chunk = await self.reader.readexactly(size)
+                await self.reader.readexactly(2)
+                yield chunk
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length:
+                yield await self.reader.readexactly(length)
+        else:
+            self.reusable = False
+            yield await self.reader.read()
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+
+class AsyncHTTPBackend:
+    """
+    asyncio counterpart of HTTPBackend with its own keep-alive pool, for
+    driving many concurrent calls from one event loop.
+    """
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        pool_size: int = 8,
+        timeout: float = 60.0,
+        compress: bool = False,
+        compress_min_bytes: int = 1024
+    ):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+
+        self._idle: List[_AsyncConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.stats = {"connections_created": 0, "requests": 0, "reused": 0}
+
+    async def _acquire(self) -> Tuple[_AsyncConnection, bool]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop(), True
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=(self.scheme == "https")),
+                timeout=self.timeout
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        self.stats["connections_created"] += 1
+        return _AsyncConnection(reader, writer), False
+
+    def _release(self, conn: _AsyncConnection):
+        if conn.reusable:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def _prepare(
+        self,
+        model_name: str,
+        system_prompt: str,
+        user_prompt,
+        stream: bool
+    ) -> Tuple[Union[bytes, StreamingBody], Dict[str, str]]:
+        body, headers = encode_chat_request(
+            model_name, system_prompt, user_prompt, stream=stream,
+            compress=self.compress, compress_min_bytes=self.compress_min_bytes
+        )
+        headers["Connection"] = "keep-alive"
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return body, headers
+
+    async def _send(self, body: Union[bytes, StreamingBody], headers: Dict[str, str]) -> Tuple[_AsyncConnection, int, Dict[str, str]]:
+        """
+        Sends a request on a pooled connection and returns (connection, status,
+        headers). The caller must read the body and then _release() the
+        connection. On any failure (including cancellation) the connection is
+        closed and its slot freed; timeouts and transport errors become BackendError.
+        """
+        conn, reused = await self._acquire()
+        try:
+            for attempt in range(2):
+                try:
+                    await conn.send("POST", self.base_path + CHAT_COMPLETIONS_PATH, self.host, headers, body)
+                    status, resp_headers = await asyncio.wait_for(conn.read_head(), timeout=self.timeout)
+                    self.stats["requests"] += 1
+                    if reused:
+                        self.stats["reused"] += 1
+                    return conn, status, resp_headers
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    conn.close()
+                    if not reused or attempt:
+                        raise BackendError(f"Connection failed: {e}") from e
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port, ssl=(self.scheme == "https")),
+                        timeout=self.timeout
+                    )
+                    self.stats["connections_created"] += 1
+                    conn, reused = _AsyncConnection(reader, writer), False
+        except asyncio.TimeoutError as e:
+            conn.close()
+            self._slots.release()
+            raise BackendError(f"Request timed out after {self.timeout}s") from e
+        except OSError as e:
+            conn.close()
+            self._slots.release()
+            raise BackendError(f"Request failed: {e}") from e
+        except BaseException:
+            conn.close()
+            self._slots.release()
+            raise
+
+    async def complete(self, model_name: str, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        body, headers = self._prepare(model_name, system_prompt, user_prompt, stream=False)
+        conn, status, resp_headers = await self._send(body, headers)
+        try:
+            data = b"".join([chunk async for chunk in conn.iter_body(resp_headers)])
+        except BaseException:
+            conn.close()
+            self._release(conn)
+            raise
+        self._release(conn)
+
+        if resp_headers.get("content-encoding") == "gzip":
+            data = gzip.decompress(data)
+        if status >= 400:
+            raise BackendError(f"HTTP {status}: {data[:500].decode('utf-8', 'replace')}", status=status,
+                               retry_after=parse_retry_after(resp_headers.get("retry-after")))
+        return json.loads(data)
+
+    async def stream(self, model_name: str, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        body, headers = self._prepare(model_name, system_prompt, user_prompt, stream=True)
+        conn, status, resp_headers = await self._send(body, headers)
+        finished = False
+        try:
+            if status >= 400:
+                detail = b"".join([chunk async for chunk in conn.iter_body(resp_headers)])
+                finished = True
+                raise BackendError(f"HTTP {status}: {detail[:500].decode('utf-8', 'replace')}", status=status,
+                                   retry_after=parse_retry_after(resp_headers.get("retry-after")))
+            pending = b""
+            async for chunk in conn.iter_body(resp_headers):
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for content in iter_sse_content(iter(lines)):
+                    yield content
+            finished = True
+        finally:
+            if not finished:
+                conn.close()
+            self._release(conn)
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop().close()
@@ -1,18 +1,86 @@
 import os
 import json
+import time
+import uuid
 import datetime
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, List, Optional
+
+from src.runner.segments import (
+    SEGMENTS_DIR,
+    DEFAULT_MAX_SEGMENT_BYTES,
+    SegmentWriter,
+    iter_segment_records
+)
+
+FORMAT_DIRS = ["JSON", "TOON"]
+LOG_LAYOUTS = ("segments", "files")
+DATASET_FILENAME = "dataset.json"
+MANIFEST_FILENAME = "manifest.json"
+
+
+def sanitize_task_name(task_name: str) -> str:
+    """Sanitize task name for filename"""
+    return task_name.replace(" ", "_").replace("-", "_").lower()
+
 
 class RunLogger:
-    def __init__(self, run_id: str, base_dir: str = "runs"):
+    """
+    Persists task execution results for a run.
+
+    Layouts:
+    - segments (default): compact JSON lines appended to size-rotated segments
+      under runs/<run_id>/segments/.
+    - files: one pretty-printed JSON file per execution under
+      runs/<run_id>/<FORMAT>/, convenient for manual inspection.
+    """
+    def __init__(
+        self,
+        run_id: str,
+        base_dir: str = "runs",
+        layout: str = "segments",
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        fsync: str = "rotate"
+    ):
+        if layout not in LOG_LAYOUTS:
+            raise ValueError(f"Unknown log layout '{layout}'. Expected one of {LOG_LAYOUTS}")
+
         self.run_id = run_id
         self.base_dir = base_dir
+        self.layout = layout
         self.run_dir = os.path.join(base_dir, run_id)
         os.makedirs(self.run_dir, exist_ok=True)
-        
-        # Create subdirectories for formats makes manual inspection easier
-        os.makedirs(os.path.join(self.run_dir, "JSON"), exist_ok=True)
-        os.makedirs(os.path.join(self.run_dir, "TOON"), exist_ok=True)
+
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._max_segment_bytes = max_segment_bytes
+        self._fsync = fsync
+        # The segment writer is opened on the first write, so a logger used
+        # only for the dataset/manifest leaves no empty segment behind
+        self._writer: Optional[SegmentWriter] = None
+        self._writer_lock = threading.Lock()
+        if layout == "files":
+            # Create subdirectories for formats makes manual inspection easier
+            for fmt in FORMAT_DIRS:
+                os.makedirs(os.path.join(self.run_dir, fmt), exist_ok=True)
+
+    def _segment_writer(self) -> SegmentWriter:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = SegmentWriter(
+                    os.path.join(self.run_dir, SEGMENTS_DIR),
+                    max_segment_bytes=self._max_segment_bytes,
+                    fsync=self._fsync
+                )
+            return self._writer
+
+    def build_log_entry(
+        self,
+        task_name: str,
+        format_name: str,
+        model_name: str,
+        execution_result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return build_log_entry(self.run_id, task_name, format_name, model_name, execution_result)
 
     def log_task_execution(
         self,
@@ -22,33 +90,141 @@ class RunLogger:
         execution_result: Dict[str, Any]
     ):
         """
-        Logs a single task execution result to a structured file.
+        Logs a single task execution result.
         """
-        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        
-        log_entry = {
-            "timestamp": timestamp,
-            "run_id": self.run_id,
-            "task_name": task_name,
-            "format": format_name,
-            "model": model_name,
-            "usage": execution_result.get("usage", {}),
-            "raw_output": execution_result.get("raw_output", "")
-        }
-        
-        # Sanitize task name for filename
-        sanitized_task = task_name.replace(" ", "_").replace("-", "_").lower()
-        filename = f"{sanitized_task}.json"
-        
-        # Path: runs/<run_id>/<FORMAT>/<task_name>.json
-        # If repeated runs happen in same session, we might want to append or sequence.
-        # For now, we assume one execution per task per run_id, or append to a log list file.
-        # Let's write individual event files with timestamps to allow multiple iterations clearly.
-        
-        filename = f"{sanitized_task}_{int(time.time()*1000)}.json"
-        file_path = os.path.join(self.run_dir, format_name, filename)
-        
-        with open(file_path, "w") as f:
-            json.dump(log_entry, f, indent=2)
+        self.write_entries([
+            self.build_log_entry(task_name, format_name, model_name, execution_result)
+        ])
 
-import time
+    def write_entries(self, entries: List[Dict[str, Any]]):
+        """Writes already-built log entries in order."""
+        if self.layout == "segments":
+            self._segment_writer().append_many(entries)
+            return
+
+        for entry in entries:
+            write_entry_file(self.run_dir, entry)
+
+    def write_dataset(self, records: List[Dict[str, Any]]) -> str:
+        """Stores the run's input records (compact JSON) next to its logs."""
+        path = os.path.join(self.run_dir, DATASET_FILENAME)
+        with open(path, "w") as f:
+            json.dump(records, f, separators=(",", ":"))
+        return path
+
+    def write_manifest(self, manifest: Dict[str, Any]) -> str:
+        """Stores the run's configuration and status as runs/<run_id>/manifest.json."""
+        path = os.path.join(self.run_dir, MANIFEST_FILENAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        # Atomic replace: readers never see a half-written manifest
+        os.replace(tmp_path, path)
+        self._manifest = manifest
+        return path
+
+    def update_manifest(self, **fields) -> str:
+        """Merges fields into the stored manifest (e.g. status on completion)."""
+        manifest = self._manifest or load_run_manifest(self.run_dir) or {}
+        return self.write_manifest({**manifest, **fields})
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def build_log_entry(
+    run_id: str,
+    task_name: str,
+    format_name: str,
+    model_name: str,
+    execution_result: Dict[str, Any]
+) -> Dict[str, Any]:
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    return {
+        # Unique per execution; lets readers de-duplicate exported copies
+        "entry_id": uuid.uuid4().hex,
+        "timestamp": timestamp,
+        "run_id": run_id,
+        "task_name": task_name,
+        "format": format_name,
+        "model": model_name,
+        "usage": execution_result.get("usage", {}),
+        "timing": execution_result.get("timing", {}),
+        "early_abort": execution_result.get("early_abort", {}),
+        "resilience": execution_result.get("resilience", {}),
+        "error": execution_result.get("error"),
+        "sampling": execution_result.get("sampling", {}),
+        "raw_output": execution_result.get("raw_output", "")
+    }
+
+
+def load_run_manifest(run_dir: str) -> Optional[Dict[str, Any]]:
+    """Returns the run's manifest, or None for runs written before manifests existed."""
+    path = os.path.join(run_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_entry_file(run_dir: str, entry: Dict[str, Any], sequence: Optional[int] = None) -> str:
+    """
+    Writes one entry as a pretty-printed file: <run_dir>/<FORMAT>/<task>_<suffix>.json.
+    The suffix is the sequence number if given, else a millisecond timestamp
+    followed by the entry_id, so entries written within the same millisecond
+    never overwrite each other.
+    """
+    sanitized_task = sanitize_task_name(entry.get("task_name", "unknown"))
+    if sequence is not None:
+        suffix = f"{sequence:06d}"
+    else:
+        suffix = f"{int(time.time() * 1000)}_{entry.get('entry_id') or uuid.uuid4().hex}"
+
+    fmt_dir = os.path.join(run_dir, entry.get("format", "UNKNOWN"))
+    os.makedirs(fmt_dir, exist_ok=True)
+
+    file_path = os.path.join(fmt_dir, f"{sanitized_task}_{suffix}.json")
+    with open(file_path, "w") as f:
+        json.dump(entry, f, indent=2)
+    return file_path
+
+
+def export_per_file(run_dir: str, output_dir: Optional[str] = None) -> int:
+    """
+    Exports a segmented run log to the per-file layout
+    (<output_dir>/<FORMAT>/<task>_<seq>.json) for manual inspection.
+    Defaults to writing next to the segments in the run directory; the
+    aggregator de-duplicates exported copies by entry_id.
+
+    Returns the number of files written.
+    """
+    output_dir = output_dir or run_dir
+    count = 0
+    for entry in iter_segment_records(os.path.join(run_dir, SEGMENTS_DIR)):
+        write_entry_file(output_dir, entry, sequence=count)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export a segmented run log to per-file JSON")
+    parser.add_argument("run_dir", type=str, help="Run directory (e.g. runs/run_xyz)")
+    parser.add_argument("--output-dir", type=str, default=None, help="Defaults to the run directory")
+    args = parser.parse_args()
+
+    written = export_per_file(args.run_dir, args.output_dir)
+    print(f"Exported {written} log entries from {args.run_dir}")
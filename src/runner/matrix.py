@@ -0,0 +1,284 @@
+import json
+import time
+import uuid
+import datetime
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, List, Optional
+
+from src.prompts import task_a, task_b, task_c
+from src.runner.executor import ModelExecutor, estimate_tokens
+from src.runner.backends import create_backend
+from src.runner.resilience import create_resilient_executor
+from src.runner.logger import RunLogger
+from src.runner.orchestrator import DATASET_SEED, FORMATS, TASKS, prepare_run_inputs, execute_task
+from src.evaluation.correctness import GroundTruth
+from src.evaluation.truth_cache import save_ground_truth
+
+# Short task keys accepted in sweep specs (full TASK_NAMEs work too)
+TASK_KEYS = {"A": task_a, "B": task_b, "C": task_c}
+
+SPEC_DEFAULTS = {
+    "models": ["mock-model"],
+    "sizes": [10],
+    "formats": FORMATS,
+    "tasks": ["A", "B", "C"],
+    "iterations": 1,
+    "workers": 4,
+    "model_concurrency": {},
+    "default_model_concurrency": 2,
+    "backend": "mock",
+    "backend_options": {},
+    "model_backends": {},
+    "resilience_options": {},
+    "early_abort": False,
+    "log_layout": "segments",
+    "fsync": "rotate"
+}
+
+
+def resolve_task(name: str):
+    if name.upper() in TASK_KEYS:
+        return TASK_KEYS[name.upper()]
+    for task in TASKS:
+        if task.TASK_NAME == name:
+            return task
+    raise ValueError(f"Unknown task '{name}'. Expected one of {list(TASK_KEYS)} or a TASK_NAME")
+
+
+def normalize_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fills defaults into a sweep spec and validates it.
+
+    A spec is a dict (or JSON file, see load_sweep_spec) with keys:
+    - models, sizes, formats, tasks, iterations: the sweep axes
+    - workers: size of the worker pool shared by all jobs
+    - model_concurrency: {model: max in-flight calls}; default_model_concurrency otherwise
+    - backend, backend_options: backend for every model, overridable per
+      model via model_backends: {model: {"backend": ..., "backend_options": {...}}}
+    - resilience_options, early_abort, log_layout, fsync: as for run_orchestrator
+    """
+    unknown = set(spec) - set(SPEC_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown sweep spec keys: {sorted(unknown)}")
+
+    spec = {**SPEC_DEFAULTS, **spec}
+    for fmt in spec["formats"]:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'. Expected one of {FORMATS}")
+    for name in spec["tasks"]:
+        resolve_task(name)
+    if spec["iterations"] < 1 or spec["workers"] < 1:
+        raise ValueError("iterations and workers must be at least 1")
+    return spec
+
+
+def load_sweep_spec(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return normalize_spec(json.load(f))
+
+
+def expand_jobs(spec: Dict[str, Any], inputs: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Expands a normalized spec into one job per call:
+    models x sizes x iterations x tasks x formats.
+
+    Prompts are rendered once per (size, task, format) and shared by every
+    model and iteration that uses them.
+    """
+    prompts: Dict[tuple, str] = {}
+    jobs = []
+    for model in spec["models"]:
+        for size in spec["sizes"]:
+            for iteration in range(spec["iterations"]):
+                for task_name in spec["tasks"]:
+                    task = resolve_task(task_name)
+                    for fmt in spec["formats"]:
+                        key = (size, task.TASK_NAME, fmt)
+                        if key not in prompts:
+                            prompts[key] = task.get_prompt(fmt, inputs[size]["data_map"][fmt])
+                        jobs.append({
+                            "model": model,
+                            "size": size,
+                            "iteration": iteration,
+                            "task": task,
+                            "format": fmt,
+                            "prompt": prompts[key],
+                            "prompt_tokens": estimate_tokens(prompts[key])
+                        })
+    return jobs
+
+
+def order_jobs(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Longest-processing-time-first: biggest prompts start first so the
+    makespan is not dominated by a large job picked up last.
+    """
+    return sorted(jobs, key=lambda j: (-j["prompt_tokens"], j["iteration"]))
+
+
+class MatrixScheduler:
+    """
+    Runs jobs on a shared worker pool without exceeding a per-model cap on
+    in-flight calls (provider rate limits are per model).
+
+    Jobs are dispatched in the given order; when a job's model is at its
+    cap, the next job for another model is dispatched instead, so workers
+    do not sit blocked on a saturated model.
+    """
+    def __init__(self, workers: int, model_concurrency: Optional[Dict[str, int]] = None, default_cap: int = 2):
+        self.workers = workers
+        self.model_concurrency = model_concurrency or {}
+        self.default_cap = default_cap
+        self.stats = {"jobs": 0, "max_in_flight": 0, "max_in_flight_per_model": {}}
+
+    def cap(self, model: str) -> int:
+        return max(1, self.model_concurrency.get(model, self.default_cap))
+
+    def run(self, jobs: List[Dict[str, Any]], fn: Callable[[Dict[str, Any]], Any]):
+        pending = list(jobs)
+        in_flight = {}
+        per_model = defaultdict(int)
+        peaks = self.stats["max_in_flight_per_model"]
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="matrix") as pool:
+            try:
+                while pending or in_flight:
+                    i = 0
+                    while len(in_flight) < self.workers and i < len(pending):
+                        model = pending[i]["model"]
+                        if per_model[model] >= self.cap(model):
+                            i += 1
+                            continue
+                        job = pending.pop(i)
+                        per_model[model] += 1
+                        peaks[model] = max(peaks.get(model, 0), per_model[model])
+                        in_flight[pool.submit(fn, job)] = job
+                    self.stats["max_in_flight"] = max(self.stats["max_in_flight"], len(in_flight))
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = in_flight.pop(future)
+                        per_model[job["model"]] -= 1
+                        self.stats["jobs"] += 1
+                        # Re-raise job failures (the run loggers are closed by the caller)
+                        future.result()
+            except BaseException:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+
+def run_matrix(spec: Dict[str, Any], base_dir: str = "runs") -> Dict[str, Any]:
+    """
+    Runs a whole sweep. Each (model, dataset size) pair gets its own run
+    directory, with its dataset, manifest and logs, so it can be aggregated
+    like any orchestrator run.
+
+    Returns {matrix_id, runs: [{run_id, model, dataset_size}], elapsed_s, scheduler}.
+    """
+    spec = normalize_spec(spec)
+    matrix_id = f"matrix_{uuid.uuid4().hex[:8]}"
+    print(f"Starting Matrix: {matrix_id}")
+    print(f"Models: {spec['models']}, Sizes: {spec['sizes']}, Iterations: {spec['iterations']}")
+
+    # 1. One dataset and one encoding per format for each size, shared by all models
+    inputs = {size: prepare_run_inputs(size) for size in spec["sizes"]}
+    abort_contexts = {
+        size: GroundTruth(inputs[size]["records"]) if spec["early_abort"] else None
+        for size in spec["sizes"]
+    }
+
+    # 2. One executor per model (latency history for hedging is per model)
+    executors = {}
+    backends = []
+    for model in spec["models"]:
+        override = spec["model_backends"].get(model, {})
+        backend = create_backend(
+            override.get("backend", spec["backend"]),
+            override.get("backend_options", spec["backend_options"])
+        )
+        backends.append(backend)
+        executors[model] = create_resilient_executor(ModelExecutor(backend=backend), spec["resilience_options"])
+
+    # 3. One run (logger + manifest) per (model, size)
+    loggers: Dict[tuple, RunLogger] = {}
+    runs = []
+    created_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    for model in spec["models"]:
+        override = spec["model_backends"].get(model, {})
+        for size in spec["sizes"]:
+            run_id = f"run_{uuid.uuid4().hex[:8]}"
+            logger = RunLogger(run_id=run_id, base_dir=base_dir, layout=spec["log_layout"], fsync=spec["fsync"])
+            dataset_path = logger.write_dataset(inputs[size]["records"])
+            if abort_contexts[size] is not None:
+                # Saves the aggregator rebuilding the expectations per run
+                save_ground_truth(abort_contexts[size], dataset_path)
+            logger.write_manifest({
+                "run_id": run_id,
+                "matrix_id": matrix_id,
+                "status": "running",
+                "created_at": created_at,
+                "model": model,
+                "dataset_size": size,
+                "seed": DATASET_SEED,
+                "iterations": spec["iterations"],
+                "backend": override.get("backend", spec["backend"]),
+                "backend_options": override.get("backend_options", spec["backend_options"]),
+                "resilience_options": spec["resilience_options"],
+                "early_abort": spec["early_abort"],
+                "tasks": [resolve_task(t).TASK_NAME for t in spec["tasks"]],
+                "formats": spec["formats"]
+            })
+            loggers[(model, size)] = logger
+            runs.append({"run_id": run_id, "model": model, "dataset_size": size})
+
+    # 4. Schedule
+    jobs = order_jobs(expand_jobs(spec, inputs))
+    total = len(jobs)
+    progress = {"done": 0}
+    progress_lock = threading.Lock()
+
+    def run_job(job: Dict[str, Any]):
+        task = job["task"]
+        result = execute_task(
+            executors[job["model"]], job["model"], task.TASK_NAME, job["format"], job["prompt"],
+            abort_context=abort_contexts[job["size"]],
+            row_tokens_hint=inputs[job["size"]]["row_tokens_hint"][job["format"]]
+        )
+        loggers[(job["model"], job["size"])].log_task_execution(
+            task_name=task.TASK_NAME,
+            format_name=job["format"],
+            model_name=job["model"],
+            execution_result=result
+        )
+        with progress_lock:
+            progress["done"] += 1
+            print(f"[{progress['done']}/{total}] {job['model']} size={job['size']} "
+                  f"{task.TASK_NAME} in {job['format']}")
+
+    scheduler = MatrixScheduler(spec["workers"], spec["model_concurrency"], spec["default_model_concurrency"])
+    start = time.perf_counter()
+    status = "failed"
+    try:
+        scheduler.run(jobs, run_job)
+        status = "complete"
+    finally:
+        completed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        for logger in loggers.values():
+            logger.close()
+            logger.update_manifest(status=status, completed_at=completed_at)
+        for backend in backends:
+            close = getattr(backend, "close", None)
+            if close is not None:
+                close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Matrix {matrix_id} complete: {total} calls in {elapsed:.2f}s across {len(runs)} runs")
+    return {
+        "matrix_id": matrix_id,
+        "runs": runs,
+        "elapsed_s": round(elapsed, 3),
+        "scheduler": scheduler.stats
+    }
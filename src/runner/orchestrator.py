@@ -3,90 +3,382 @@ import os
 import uuid
 import json
 import argparse
-from typing import List
+import datetime
+from typing import List, Dict, Any, Optional
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 from src.dataset.generator import DatasetGenerator
 from src.encoding.toon_codec import encode_to_toon
-from src.prompts import base, task_a, task_b, task_c
-from src.runner.executor import ModelExecutor
-from src.runner.logger import RunLogger
+from src.encoding.stream import iter_encode
+from src.prompts import base
+from src.prompts.registry import TASKS
+from src.prompts.templates import stream_prompt
+from src.runner.executor import CHARS_PER_TOKEN, ModelExecutor, BackendError, estimate_tokens
+from src.runner.backends import create_backend, add_backend_arguments, backend_options_from_args
+from src.evaluation.correctness import GroundTruth
+from src.evaluation.streaming import StreamingValidator
+from src.evaluation.truth_cache import cached_ground_truth
+from src.runner.logger import RunLogger, build_log_entry
+from src.runner.async_logger import AsyncRunLogger
+from src.runner.resilience import create_resilient_executor, add_resilience_arguments, resilience_options_from_args
+from src.runner.adaptive import create_adaptive_stopper, add_adaptive_arguments, adaptive_options_from_args
 
-TASKS = [task_a, task_b, task_c]
 FORMATS = ["JSON", "TOON"]
+DATASET_SEED = 42
+
+def execute_with_early_abort(
+    executor: ModelExecutor,
+    validator: StreamingValidator,
+    model_name: str,
+    system_prompt: str,
+    user_prompt: str,
+    row_tokens_hint: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Streams a call through the validator and cancels the generation as soon
+    as the reply is definitely wrong. The result carries an `early_abort`
+    record (aborted_early, abort_reason, rows_checked, tokens_saved).
+    """
+    response = executor.stream(
+        model_name=model_name,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt
+    )
+    for chunk in response:
+        if not validator.feed(chunk):
+            response.cancel()
+            break
+    else:
+        validator.finish()
+
+    result = response.result()
+    result["early_abort"] = validator.summary(
+        output_tokens=result["usage"]["output_tokens"],
+        row_tokens_hint=row_tokens_hint
+    )
+    if getattr(response, "resilience", None) is not None:
+        result["resilience"] = response.resilience
+    return result
+
+def failed_call_result(error: BackendError) -> Dict[str, Any]:
+    """Execution result for a call that failed after all retries."""
+    return {
+        "raw_output": "",
+        "usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+        "timing": {},
+        "error": {"status": error.status, "message": str(error)[:500]},
+        "resilience": getattr(error, "resilience", {})
+    }
+
+def prepare_run_inputs(dataset_size: int, seed: int = DATASET_SEED, stream_prompts: bool = False) -> Dict[str, Any]:
+    """
+    Generates the dataset and encodes it once per format.
+    Returns {records, data_map, data_chars, row_tokens_hint}; shared by every call on that dataset.
+    With `stream_prompts`, data_map is empty and prompts are encoded on the fly (see build_prompt).
+    """
+    generator = DatasetGenerator(count=dataset_size, seed=seed)
+    return encode_run_inputs(generator.generate(), stream_prompts=stream_prompts)
+
+def encode_run_inputs(records: List[Dict[str, Any]], stream_prompts: bool = False) -> Dict[str, Any]:
+    """Encodes an existing dataset once per format (see prepare_run_inputs)."""
+    if stream_prompts:
+        # Only the lengths are kept; the encodings are regenerated per call
+        data_chars = {fmt: sum(len(chunk) for chunk in iter_encode(fmt, records)) for fmt in FORMATS}
+        row_tokens_hint = {
+            fmt: (chars // CHARS_PER_TOKEN) / max(len(records), 1) for fmt, chars in data_chars.items()
+        }
+        return {"records": records, "data_map": {}, "data_chars": data_chars, "row_tokens_hint": row_tokens_hint}
+
+    # Pre-compute formats
+    data_map = {
+        "JSON": json.dumps(records, indent=2),
+        "TOON": encode_to_toon(records)
+    }
+    row_tokens_hint = {
+        fmt: estimate_tokens(text) / max(len(records), 1) for fmt, text in data_map.items()
+    }
+    data_chars = {fmt: len(text) for fmt, text in data_map.items()}
+    return {"records": records, "data_map": data_map, "data_chars": data_chars, "row_tokens_hint": row_tokens_hint}
+
+def build_prompt(task, fmt: str, inputs: Dict[str, Any]):
+    """
+    The user prompt for one task/format: a string from the pre-encoded
+    data_map, or a PromptStream that encodes the records as it is sent
+    when the inputs were prepared with stream_prompts. Its length comes from
+    data_chars, so estimating its tokens does not encode the dataset again.
+    """
+    if fmt in inputs["data_map"]:
+        return task.get_prompt(fmt, inputs["data_map"][fmt])
+    return stream_prompt(task, fmt, inputs["records"], data_chars=inputs["data_chars"][fmt])
+
+def execute_task(
+    executor,
+    model_name: str,
+    task_name: str,
+    fmt: str,
+    prompt_text: str,
+    abort_context: Optional[GroundTruth] = None,
+    row_tokens_hint: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Runs one prompt, with streaming validation when `abort_context` is given.
+    A call that still fails after retries yields a failed result instead of raising.
+    """
+    try:
+        if abort_context is not None:
+            result = execute_with_early_abort(
+                executor,
+                StreamingValidator(task_name, fmt, abort_context),
+                model_name=model_name,
+                system_prompt=base.SYSTEM_PROMPT,
+                user_prompt=prompt_text,
+                row_tokens_hint=row_tokens_hint
+            )
+            if result["early_abort"]["aborted_early"]:
+                print(f"    Aborted early: {result['early_abort']['abort_reason'][:120]}")
+            return result
+
+        return executor.execute(
+            model_name=model_name,
+            system_prompt=base.SYSTEM_PROMPT,
+            user_prompt=prompt_text
+        )
+    except BackendError as e:
+        # Retries exhausted: record the failure and keep going
+        print(f"    Call failed: {e}")
+        return failed_call_result(e)
+
+def execute_task_samples(
+    executor,
+    model_name: str,
+    fmt: str,
+    prompt_text: str,
+    n: int
+) -> List[Dict[str, Any]]:
+    """
+    Runs one prompt as a single request for `n` completions (see
+    ModelExecutor.execute_n). A failed request yields n failed results.
+    """
+    try:
+        return executor.execute_n(
+            model_name=model_name,
+            system_prompt=base.SYSTEM_PROMPT,
+            user_prompt=prompt_text,
+            n=n
+        )
+    except BackendError as e:
+        print(f"    Call failed: {e}")
+        failed = failed_call_result(e)
+        return [
+            {**failed, "sampling": {"request_id": None, "sample_index": i, "n_samples": n}}
+            for i in range(n)
+        ]
 
 def run_orchestrator(
     model_name: str = "mock-model",
     iterations: int = 1,
-    dataset_size: int = 10
-):
+    dataset_size: int = 10,
+    log_layout: str = "segments",
+    fsync: str = "rotate",
+    async_log: bool = False,
+    log_queue_size: int = 1024,
+    backend: str = "mock",
+    backend_options: Optional[Dict[str, Any]] = None,
+    early_abort: bool = False,
+    resilience_options: Optional[Dict[str, Any]] = None,
+    samples_per_request: int = 1,
+    stream_prompts: bool = False,
+    adaptive: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Runs every task in every format `iterations` times against one model and
+    dataset size. Returns the run id (logs are in runs/<run_id>).
+
+    With samples_per_request > 1 the iterations are gathered into requests
+    for n completions each, so the prompt is sent (and its input tokens
+    billed) once per request instead of once per iteration.
+
+    With stream_prompts the datasets are not kept encoded: each prompt is a
+    PromptStream encoded while it is sent (chunked over HTTP), so peak
+    memory does not grow with the prompt size.
+
+    With `adaptive` options (see src.runner.adaptive), `iterations` is a
+    cap: each call is evaluated as it completes, and a task stops being
+    sampled once its JSON-vs-TOON intervals are narrow enough or the
+    budget is spent. Stopping reasons go to the run manifest.
+    """
+    if samples_per_request > 1 and early_abort:
+        raise ValueError("early_abort streams single replies; it cannot be combined with samples_per_request > 1")
+
     run_id = f"run_{uuid.uuid4().hex[:8]}"
     print(f"Starting Benchmark Run: {run_id}")
     print(f"Model: {model_name}, Iterations: {iterations}, Dataset Size: {dataset_size}")
     
-    # 1. Generate Dataset (One dataset for the entire run to be consistent?)
-    # Usually we want fresh data or fixed data?
-    # Spec says "Deterministic via fixed seed". Let's stick to a fixed seed for now or consistent dataset.
-    # We will generate a fresh dataset here to simulate the flow.
-    
+    # 1. Generate Dataset (one fixed-seed dataset for the entire run)
     print("Generating dataset...")
-    generator = DatasetGenerator(count=dataset_size, seed=42)
-    records = generator.generate()
-    
-    # Pre-compute formats
-    data_map = {
-        "JSON": json.dumps(records, indent=2),
-        "TOON": encode_to_toon(records)
-    }
+    inputs = prepare_run_inputs(dataset_size, stream_prompts=stream_prompts)
+    records = inputs["records"]
     
     # 2. Components
-    executor = ModelExecutor()
-    logger = RunLogger(run_id=run_id)
+    model_backend = create_backend(backend, backend_options)
+    executor = create_resilient_executor(ModelExecutor(backend=model_backend), resilience_options)
+    logger = RunLogger(run_id=run_id, layout=log_layout, fsync=fsync)
+    # Keep the exact input with the logs: regenerating it later does not
+    # reproduce the timestamps (they are relative to generation time)
+    dataset_path = logger.write_dataset(records)
+
+    # Expectations for streaming validation, built once per run and cached
+    # next to the dataset for the aggregator
+    abort_context = cached_ground_truth(dataset_path, records) if early_abort else None
+
+    stopper = None
+    if adaptive is not None:
+        ground_truth = abort_context or cached_ground_truth(dataset_path, records)
+        stopper = create_adaptive_stopper(ground_truth, [t.TASK_NAME for t in TASKS], adaptive)
+
+    logger.write_manifest({
+        "run_id": run_id,
+        "status": "running",
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "model": model_name,
+        "dataset_size": dataset_size,
+        "seed": DATASET_SEED,
+        "iterations": iterations,
+        "backend": backend,
+        "backend_options": backend_options or {},
+        "resilience_options": resilience_options or {},
+        "early_abort": early_abort,
+        "samples_per_request": samples_per_request,
+        "stream_prompts": stream_prompts,
+        "adaptive": adaptive,
+        "tasks": [t.TASK_NAME for t in TASKS],
+        "formats": FORMATS
+    })
+    run_logger = logger
+    if async_log:
+        # Writes happen on a background thread; the loop only enqueues
+        logger = AsyncRunLogger(logger, max_queue=log_queue_size)
     
     # 3. Execution Loop
-    total_steps = len(TASKS) * len(FORMATS) * iterations
+    # Each request covers `n` iterations (n = 1 unless sampling several completions)
+    batches = [
+        (start, min(samples_per_request, iterations - start))
+        for start in range(0, iterations, max(samples_per_request, 1))
+    ]
+    total_steps = len(TASKS) * len(FORMATS) * len(batches)
     current_step = 0
     
-    for i in range(iterations):
-        print(f"Iteration {i+1}/{iterations}...")
+    try:
+        for start, n in batches:
+            tasks = TASKS
+            if stopper is not None:
+                tasks = [t for t in TASKS if t.TASK_NAME in stopper.active_tasks()]
+                if not tasks:
+                    break
+            if n == 1:
+                print(f"Iteration {start+1}/{iterations}...")
+            else:
+                print(f"Iterations {start+1}-{start+n}/{iterations} ({n} samples per request)...")
         
-        for task in TASKS:
-            for fmt in FORMATS:
-                current_step += 1
-                print(f"[{current_step}/{total_steps}] Running {task.TASK_NAME} in {fmt}...")
+            for task in tasks:
+                # Checked per (task, iteration), not between formats: a JSON sample
+                # logged without its TOON pair would skew the paired comparison
+                if stopper is not None and stopper.over_budget():
+                    break
+                for fmt in FORMATS:
+                    current_step += 1
+                    print(f"[{current_step}/{total_steps}] Running {task.TASK_NAME} in {fmt}...")
                 
-                # Build Prompt
-                prompt_text = task.get_prompt(fmt, data_map[fmt])
+                    # Build Prompt
+                    prompt_text = build_prompt(task, fmt, inputs)
                 
-                # Execute
-                result = executor.execute(
-                    model_name=model_name,
-                    system_prompt=base.SYSTEM_PROMPT,
-                    user_prompt=prompt_text
-                )
+                    # Execute
+                    if samples_per_request > 1:
+                        results = execute_task_samples(executor, model_name, fmt, prompt_text, n)
+                    else:
+                        results = [execute_task(
+                            executor, model_name, task.TASK_NAME, fmt, prompt_text,
+                            abort_context=abort_context,
+                            row_tokens_hint=inputs["row_tokens_hint"][fmt]
+                        )]
                 
-                # Log
-                logger.log_task_execution(
-                    task_name=task.TASK_NAME,
-                    format_name=fmt,
-                    model_name=model_name,
-                    execution_result=result
-                )
+                    # Log
+                    for result in results:
+                        logger.log_task_execution(
+                            task_name=task.TASK_NAME,
+                            format_name=fmt,
+                            model_name=model_name,
+                            execution_result=result
+                        )
+                        if stopper is not None:
+                            stopper.record(build_log_entry(run_id, task.TASK_NAME, fmt, model_name, result))
+
+            if stopper is not None:
+                for task_name in stopper.end_round(start + n, iterations):
+                    print(f"  Stopped sampling {task_name}: {stopper.stopped[task_name]['reason']} "
+                          f"after {start + n} iterations")
                 
+    finally:
+        # Drain queued entries and seal the active segment even if the loop
+        # is interrupted (KeyboardInterrupt on SIGINT lands here)
+        logger.close()
+        # Release pooled connections (and stop the stub backend's server)
+        close = getattr(model_backend, "close", None)
+        if close is not None:
+            close()
+
+    if async_log:
+        print(f"Async log writer stats: {logger.stats()}")
+
+    completion = {
+        "status": "complete",
+        "completed_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+    }
+    if stopper is not None:
+        completion["adaptive_stopping"] = stopper.summary()
+        print(f"Adaptive stopping: estimated spend ${stopper.spent_usd:.6f}")
+    run_logger.update_manifest(**completion)
     print(f"Run {run_id} complete. Logs saved to runs/{run_id}")
+    return run_id
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run TOON vs JSON Benchmark Orchestrator")
     parser.add_argument("--model", type=str, default="mock-model", help="Model name to run")
     parser.add_argument("--iterations", type=int, default=1, help="Number of iterations per task/format")
     parser.add_argument("--size", type=int, default=5, help="Dataset size for this run")
+    parser.add_argument("--log-layout", type=str, default="segments", choices=["segments", "files"],
+                        help="Run log layout: JSONL segments or one JSON file per call")
+    parser.add_argument("--fsync", type=str, default="rotate", choices=["never", "rotate", "always"],
+                        help="fsync policy for segment logs")
+    parser.add_argument("--async-log", action="store_true", help="Write logs from a background thread")
+    parser.add_argument("--log-queue-size", type=int, default=1024, help="Bounded queue size for --async-log")
+    add_backend_arguments(parser)
+    add_resilience_arguments(parser)
+    parser.add_argument("--early-abort", action="store_true",
+                        help="Validate streamed replies row by row and cancel definitely-wrong generations")
+    parser.add_argument("--samples-per-request", type=int, default=1,
+                        help="Ask for n completions per request; iterations are grouped into requests of n")
+    parser.add_argument("--stream-prompts", action="store_true",
+                        help="Encode each prompt while it is sent instead of keeping full encodings in memory")
+    add_adaptive_arguments(parser)
     
     args = parser.parse_args()
     
     run_orchestrator(
         model_name=args.model,
         iterations=args.iterations,
-        dataset_size=args.size
+        dataset_size=args.size,
+        log_layout=args.log_layout,
+        fsync=args.fsync,
+        async_log=args.async_log,
+        log_queue_size=args.log_queue_size,
+        backend=args.backend,
+        backend_options=backend_options_from_args(args),
+        early_abort=args.early_abort,
+        resilience_options=resilience_options_from_args(args),
+        samples_per_request=args.samples_per_request,
+        stream_prompts=args.stream_prompts,
+        adaptive=adaptive_options_from_args(args)
     )
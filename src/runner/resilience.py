@@ -0,0 +1,395 @@
+import time
+import queue
+import random
+import threading
+import collections
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from src.runner.executor import BackendError, ModelExecutor, StreamingResponse, estimate_tokens
+from src.aggregation.stats import percentile
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class DeadlineExceeded(BackendError):
+    """Raised when a call (including its retries) runs past its deadline."""
+
+
+class RetryPolicy:
+    """
+    Classifies backend errors and computes backoff delays.
+
+    Transport errors (status None) and RETRYABLE_STATUSES are retried, other
+    HTTP errors (e.g. 400/401) are not. Delays use "full jitter" exponential
+    backoff: uniform in [0, min(max_delay_ms, base_delay_ms * multiplier**n)],
+    but never shorter than the server's Retry-After.
+    """
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay_ms: float = 250.0,
+        max_delay_ms: float = 10_000.0,
+        multiplier: float = 2.0,
+        retry_statuses: Tuple[int, ...] = RETRYABLE_STATUSES
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_ms = base_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.multiplier = multiplier
+        self.retry_statuses = retry_statuses
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, DeadlineExceeded) or not isinstance(error, BackendError):
+            return False
+        return error.status is None or error.status in self.retry_statuses
+
+    def backoff_ms(self, retry_index: int, rng: random.Random, retry_after: Optional[float] = None) -> float:
+        cap = min(self.max_delay_ms, self.base_delay_ms * self.multiplier ** retry_index)
+        delay = rng.uniform(0, cap)
+        if retry_after is not None:
+            delay = max(delay, retry_after * 1000)
+        return delay
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies, used to pick the hedge delay."""
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._values = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms: float):
+        with self._lock:
+            self._values.append(latency_ms)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """None until `min_samples` latencies have been recorded."""
+        with self._lock:
+            if len(self._values) < self.min_samples:
+                return None
+            values = list(self._values)
+        return percentile(values, pct)
+
+
+def _describe_error(error: Exception) -> str:
+    status = getattr(error, "status", None)
+    return f"{status or type(error).__name__}: {str(error)[:200]}"
+
+
+class ResilientExecutor:
+    """
+    Wraps a ModelExecutor with retries, a per-call deadline and hedging.
+
+    - Retries: failed attempts that the RetryPolicy classifies as transient
+      are retried after a jittered exponential backoff (honouring Retry-After).
+    - Deadline: `deadline_ms` bounds the whole call, retries included; the
+      call raises DeadlineExceeded once it is spent.
+    - Hedging: when an attempt has not finished after the p`hedge_percentile`
+      of recent latencies (or a fixed `hedge_delay_ms`), a duplicate request
+      is sent and whichever answers first wins. The loser is cancelled and
+      its tokens so far are counted as wasted (input and output apart, as
+      they are priced differently).
+
+    Results carry a `resilience` record: attempts, retries, hedged, hedge_won,
+    wasted_tokens (= wasted_input_tokens + wasted_output_tokens), backoff_ms
+    and the errors seen. Final failures re-raise the
+    last error with the record attached as `error.resilience`.
+
+    stream() (used by early-abort validation) only retries failures that
+    happen before the first chunk; it does not hedge or enforce the deadline.
+    """
+    def __init__(
+        self,
+        executor: ModelExecutor,
+        policy: Optional[RetryPolicy] = None,
+        deadline_ms: Optional[float] = None,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_delay_ms: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        seed: int = 0
+    ):
+        self.executor = executor
+        self.policy = policy or RetryPolicy()
+        self.deadline_ms = deadline_ms
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay_ms = hedge_delay_ms
+        self.tracker = LatencyTracker(min_samples=hedge_min_samples)
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    @staticmethod
+    def _new_record() -> Dict[str, Any]:
+        return {
+            "attempts": 0,
+            "retries": 0,
+            "hedged": False,
+            "hedge_won": False,
+            "wasted_tokens": 0,
+            "wasted_input_tokens": 0,
+            "wasted_output_tokens": 0,
+            "backoff_ms": 0.0,
+            "errors": []
+        }
+
+    def _backoff(self, error: Exception, retry_index: int, record: Dict[str, Any], deadline: Optional[float]):
+        with self._rng_lock:
+            delay_ms = self.policy.backoff_ms(retry_index, self._rng, getattr(error, "retry_after", None))
+        if deadline is not None and time.perf_counter() + delay_ms / 1000 >= deadline:
+            raise DeadlineExceeded(f"Deadline of {self.deadline_ms} ms exceeded while backing off")
+        time.sleep(delay_ms / 1000)
+        record["backoff_ms"] = round(record["backoff_ms"] + delay_ms, 3)
+        record["retries"] += 1
+
+    def _hedge_after_s(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        delay_ms = self.hedge_delay_ms
+        if delay_ms is None:
+            delay_ms = self.tracker.percentile(self.hedge_percentile)
+        return delay_ms / 1000 if delay_ms is not None else None
+
+    # Blocking execution
+
+    def execute(self, model_name: str, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        record = self._new_record()
+        start = time.perf_counter()
+        deadline = start + self.deadline_ms / 1000 if self.deadline_ms else None
+
+        retry_index = 0
+        while True:
+            try:
+                response, attempt_start = self._attempt(model_name, system_prompt, user_prompt, record, deadline)
+                break
+            except Exception as e:
+                record["errors"].append(_describe_error(e))
+                if not self.policy.is_retryable(e) or retry_index + 1 >= self.policy.max_attempts:
+                    e.resilience = record
+                    raise
+                try:
+                    self._backoff(e, retry_index, record, deadline)
+                except DeadlineExceeded as deadline_error:
+                    record["errors"].append(_describe_error(deadline_error))
+                    deadline_error.resilience = record
+                    raise deadline_error from e
+                retry_index += 1
+
+        end = time.perf_counter()
+        result = response.result()
+        # The attempt's own service time feeds the hedge threshold; the
+        # logged timing is what the caller saw, retries and backoff included
+        self.tracker.record(result["timing"]["latency_ms"])
+        offset_ms = (attempt_start - start) * 1000
+        if result["timing"].get("ttft_ms") is not None:
+            result["timing"]["ttft_ms"] = round(result["timing"]["ttft_ms"] + offset_ms, 3)
+        result["timing"]["latency_ms"] = round((end - start) * 1000, 3)
+        result["resilience"] = record
+        return result
+
+    def execute_n(self, model_name: str, system_prompt: str, user_prompt: str, n: int) -> List[Dict[str, Any]]:
+        """
+        ModelExecutor.execute_n with retries (no hedging: a duplicate
+        multi-sample request would double the cost of the whole batch).
+        """
+        record = self._new_record()
+        start = time.perf_counter()
+        deadline = start + self.deadline_ms / 1000 if self.deadline_ms else None
+
+        retry_index = 0
+        while True:
+            record["attempts"] += 1
+            try:
+                results = self.executor.execute_n(model_name, system_prompt, user_prompt, n)
+                break
+            except Exception as e:
+                record["errors"].append(_describe_error(e))
+                if not self.policy.is_retryable(e) or retry_index + 1 >= self.policy.max_attempts:
+                    e.resilience = record
+                    raise
+                self._backoff(e, retry_index, record, deadline)
+                retry_index += 1
+
+        for result in results:
+            result["resilience"] = record
+        return results
+
+    def _attempt(
+        self,
+        model_name: str,
+        system_prompt: str,
+        user_prompt: str,
+        record: Dict[str, Any],
+        deadline: Optional[float]
+    ) -> Tuple[StreamingResponse, float]:
+        """
+        Runs one attempt, hedged if it outlives the hedge delay.
+        Returns (winning response, its start time).
+        """
+        done: "queue.Queue" = queue.Queue()
+        cancel = threading.Event()
+        responses: List[Optional[StreamingResponse]] = []
+        failed: List[bool] = []
+
+        def run(index: int):
+            started = time.perf_counter()
+            try:
+                response = self.executor.stream(model_name, system_prompt, user_prompt)
+                responses[index] = response
+                for _ in response:
+                    if cancel.is_set():
+                        response.cancel()
+                        break
+                done.put((index, started, response, None))
+            except Exception as e:
+                failed[index] = True
+                done.put((index, started, None, e))
+
+        def launch():
+            responses.append(None)
+            failed.append(False)
+            record["attempts"] += 1
+            index = len(responses) - 1
+            if index == 0 and deadline is None and not self.hedge:
+                # Nothing to race against: run on the calling thread
+                run(index)
+            else:
+                threading.Thread(target=run, args=(index,), name="hedged-call", daemon=True).start()
+
+        launch()
+        hedge_at = self._hedge_after_s()
+        if hedge_at is not None:
+            hedge_at += time.perf_counter()
+
+        pending = 1
+        error: Optional[Exception] = None
+        while pending:
+            now = time.perf_counter()
+            waits = [t - now for t in (hedge_at, deadline) if t is not None]
+            try:
+                index, started, response, attempt_error = done.get(timeout=max(min(waits), 0) if waits else None)
+            except queue.Empty:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    cancel.set()
+                    self._add_waste(record, responses, failed, None, system_prompt, user_prompt)
+                    raise DeadlineExceeded(f"Deadline of {self.deadline_ms} ms exceeded")
+                # Primary is slower than usual: race a duplicate request
+                hedge_at = None
+                record["hedged"] = True
+                launch()
+                pending += 1
+                continue
+
+            pending -= 1
+            if attempt_error is not None:
+                error = error or attempt_error
+                continue
+
+            cancel.set()
+            record["hedge_won"] = index > 0
+            self._add_waste(record, responses, failed, index, system_prompt, user_prompt)
+            return response, started
+
+        raise error
+
+    @staticmethod
+    def _add_waste(
+        record: Dict[str, Any],
+        responses: List[Optional[StreamingResponse]],
+        failed: List[bool],
+        winner: Optional[int],
+        system_prompt: str,
+        user_prompt: str
+    ):
+        """
+        Adds the billed tokens of abandoned requests (all but `winner`) to the
+        record: full input plus output streamed so far. Requests that failed
+        before any output (e.g. a 429 or 503) are not billed.
+        """
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        for i, response in enumerate(responses):
+            output_tokens = estimate_tokens(response.text) if response is not None else 0
+            if i == winner or (failed[i] and not output_tokens):
+                continue
+            record["wasted_input_tokens"] += input_tokens
+            record["wasted_output_tokens"] += output_tokens
+            record["wasted_tokens"] += input_tokens + output_tokens
+
+    # Streaming execution
+
+    def stream(self, model_name: str, system_prompt: str, user_prompt: str) -> StreamingResponse:
+        record = self._new_record()
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        response = StreamingResponse(
+            self._retrying_chunks(model_name, system_prompt, user_prompt, record),
+            input_tokens=input_tokens
+        )
+        response.resilience = record
+        return response
+
+    def _retrying_chunks(
+        self,
+        model_name: str,
+        system_prompt: str,
+        user_prompt: str,
+        record: Dict[str, Any]
+    ) -> Iterator[str]:
+        retry_index = 0
+        while True:
+            record["attempts"] += 1
+            chunks = self.executor.backend.stream(model_name, system_prompt, user_prompt)
+            try:
+                first = next(chunks)
+            except StopIteration:
+                return
+            except Exception as e:
+                record["errors"].append(_describe_error(e))
+                if not self.policy.is_retryable(e) or retry_index + 1 >= self.policy.max_attempts:
+                    e.resilience = record
+                    raise
+                self._backoff(e, retry_index, record, None)
+                retry_index += 1
+                continue
+
+            yield first
+            yield from chunks
+            return
+
+
+def create_resilient_executor(executor: ModelExecutor, options: Optional[Dict[str, Any]] = None) -> ResilientExecutor:
+    """
+    Builds a ResilientExecutor from flat options: max_attempts, base_delay_ms,
+    max_delay_ms, deadline_ms, hedge, hedge_percentile, hedge_delay_ms, seed.
+    """
+    options = dict(options or {})
+    policy = RetryPolicy(
+        max_attempts=options.pop("max_attempts", 3),
+        base_delay_ms=options.pop("base_delay_ms", 250.0),
+        max_delay_ms=options.pop("max_delay_ms", 10_000.0)
+    )
+    return ResilientExecutor(executor, policy=policy, **options)
+
+def add_resilience_arguments(parser):
+    """Registers retry, deadline and hedging CLI options on an argparse parser."""
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per call, retries included (1 disables retries)")
+    parser.add_argument("--retry-base-ms", type=float, default=250.0, help="Base delay of the exponential backoff")
+    parser.add_argument("--retry-max-ms", type=float, default=10_000.0, help="Cap on a single backoff delay")
+    parser.add_argument("--deadline-ms", type=float, default=None, help="Deadline per call, retries included")
+    parser.add_argument("--hedge", action="store_true", help="Send a duplicate request when a call is slower than usual")
+    parser.add_argument("--hedge-percentile", type=float, default=95.0,
+                        help="Latency percentile of recent calls after which to hedge")
+    parser.add_argument("--hedge-delay-ms", type=float, default=None,
+                        help="Fixed hedge delay instead of the observed percentile")
+
+def resilience_options_from_args(args) -> Dict[str, Any]:
+    return {
+        "max_attempts": args.max_attempts,
+        "base_delay_ms": args.retry_base_ms,
+        "max_delay_ms": args.retry_max_ms,
+        "deadline_ms": args.deadline_ms,
+        "hedge": args.hedge,
+        "hedge_percentile": args.hedge_percentile,
+        "hedge_delay_ms": args.hedge_delay_ms
+    }
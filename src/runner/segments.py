@@ -0,0 +1,225 @@
+import os
+import json
+import threading
+from typing import Dict, Any, List, Generator, Iterator, Iterable, Tuple, Optional
+
+# Segment layout: runs/<run_id>/segments/segment-000000.jsonl (+ segment-000000.idx)
+SEGMENTS_DIR = "segments"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+
+# Sparse index granularity: one (record_no, byte_offset) pair every N records
+INDEX_STRIDE = 256
+
+# never: leave durability to the OS
+# rotate: fsync when a segment is sealed (and on close)
+# always: fsync after every flush
+FSYNC_POLICIES = ("never", "rotate", "always")
+
+
+def segment_name(segment_no: int) -> str:
+    return f"{SEGMENT_PREFIX}{segment_no:06d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(segment_dir: str) -> List[str]:
+    """Returns segment file paths in write order."""
+    if not os.path.isdir(segment_dir):
+        return []
+    names = [
+        n for n in os.listdir(segment_dir)
+        if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)
+    ]
+    return [os.path.join(segment_dir, n) for n in sorted(names)]
+
+
+def index_path(segment_path: str) -> str:
+    return segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+def load_segment_index(segment_path: str) -> Optional[Dict[str, Any]]:
+    """Loads the index of a sealed segment, or None if it is still open / missing."""
+    path = index_path(segment_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class SegmentWriter:
+    """
+    Append-only writer for compact JSON-lines log segments.
+
+    Records are buffered and appended to the active segment. Once a segment
+    grows past `max_segment_bytes` it is sealed (flushed, optionally fsynced,
+    and given a small index file) and a new segment is started.
+    Safe to share between threads.
+    """
+    def __init__(
+        self,
+        segment_dir: str,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+        fsync: str = "rotate"
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'. Expected one of {FSYNC_POLICIES}")
+
+        self.segment_dir = segment_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.buffer_bytes = buffer_bytes
+        self.fsync = fsync
+
+        os.makedirs(segment_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+        self._closed = False
+
+        # Never append to a segment written by an earlier process: start a fresh one
+        existing = list_segments(segment_dir)
+        if existing:
+            last = os.path.basename(existing[-1])
+            self._segment_no = int(last[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1
+        else:
+            self._segment_no = 0
+        self._open_segment()
+
+    @property
+    def current_segment(self) -> str:
+        return os.path.join(self.segment_dir, segment_name(self._segment_no))
+
+    def _open_segment(self):
+        self._file = open(self.current_segment, "ab", buffering=self.buffer_bytes)
+        self._offset = self._file.tell()
+        self._records = 0
+        self._sparse_offsets = []
+        self._counts = {}
+
+    def _seal_segment(self):
+        self._file.flush()
+        if self.fsync in ("rotate", "always"):
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+        index = {
+            "segment": segment_name(self._segment_no),
+            "records": self._records,
+            "bytes": self._offset,
+            "stride": INDEX_STRIDE,
+            "sparse_offsets": self._sparse_offsets,
+            "counts": self._counts
+        }
+        with open(index_path(self.current_segment), "w") as f:
+            json.dump(index, f)
+
+    def _append_locked(self, record: Dict[str, Any]) -> Tuple[str, int]:
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+
+        # Rotate before writing so a single record never straddles segments
+        if self._records > 0 and self._offset + len(line) > self.max_segment_bytes:
+            self._seal_segment()
+            self._segment_no += 1
+            self._open_segment()
+
+        offset = self._offset
+        if self._records % INDEX_STRIDE == 0:
+            self._sparse_offsets.append([self._records, offset])
+
+        self._file.write(line)
+        self._offset += len(line)
+        self._records += 1
+
+        key = f"{record.get('task_name')}|{record.get('format')}"
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+        return segment_name(self._segment_no), offset
+
+    def append(self, record: Dict[str, Any]) -> Tuple[str, int]:
+        """Appends one record. Returns (segment name, byte offset)."""
+        with self._lock:
+            if self._closed:
+                raise ValueError("SegmentWriter is closed")
+            loc = self._append_locked(record)
+            if self.fsync == "always":
+                self._flush_locked()
+            return loc
+
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Appends a batch of records under a single lock acquisition."""
+        count = 0
+        with self._lock:
+            if self._closed:
+                raise ValueError("SegmentWriter is closed")
+            for record in records:
+                self._append_locked(record)
+                count += 1
+            if self.fsync == "always":
+                self._flush_locked()
+        return count
+
+    def _flush_locked(self):
+        self._file.flush()
+        if self.fsync == "always":
+            os.fsync(self._file.fileno())
+
+    def flush(self):
+        with self._lock:
+            if not self._closed:
+                self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._seal_segment()
+            self._closed = True
+
+
+def read_segment(segment_path: str, start_offset: int = 0) -> Generator[Tuple[int, Dict[str, Any]], None, int]:
+    """
+    Sequentially reads a segment, yielding (byte_offset, record).
+
+    A trailing line without a newline is a write still in progress (or a crash
+    mid-write) and is not yielded, so callers can resume from the last offset.
+    The generator returns the offset just past the last complete line.
+    """
+    with open(segment_path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            record_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield record_offset, json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping corrupt record in {segment_path} at offset {record_offset}: {e}")
+    return offset
+
+
+def read_segment_delta(segment_path: str, start_offset: int = 0) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+    """
+    Reads the records appended since `start_offset`.
+    Returns ([(byte_offset, record)], next_offset), where next_offset is
+    just past the last complete line, i.e. where the next delta starts.
+    """
+    records = []
+    reader = read_segment(segment_path, start_offset)
+    while True:
+        try:
+            records.append(next(reader))
+        except StopIteration as done:
+            return records, done.value
+
+
+def iter_segment_records(segment_dir: str) -> Iterator[Dict[str, Any]]:
+    """Yields every record of every segment in write order."""
+    for path in list_segments(segment_dir):
+        for _, record in read_segment(path):
+            yield record
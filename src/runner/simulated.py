@@ -0,0 +1,257 @@
+import json
+import time
+import uuid
+import random
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from src.prompts.registry import find_task_by_description
+from src.prompts.base import parse_prompt, prompt_text
+from src.encoding.toon_codec import FIELDS, encode_table, decode_from_toon
+from src.tasks.engine import ColumnarDataset, execute
+from src.runner.executor import CHARS_PER_TOKEN, BackendError, estimate_tokens
+
+FORMAT_BREAKS = ["truncate", "chatter", "delimiter"]
+
+
+class LatencyModel:
+    """
+    Draws a latency in milliseconds.
+
+    Distributions:
+    - fixed: always `mean_ms`
+    - uniform: uniform in [mean_ms - jitter_ms, mean_ms + jitter_ms]
+    - lognormal: lognormal with median `mean_ms` and shape `sigma` (heavy tail)
+    """
+    def __init__(self, mean_ms: float = 0.0, distribution: str = "fixed", jitter_ms: float = 0.0, sigma: float = 0.5):
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+        self.mean_ms = mean_ms
+        self.distribution = distribution
+        self.jitter_ms = jitter_ms
+        self.sigma = sigma
+
+    def sample(self, rng: random.Random) -> float:
+        if self.mean_ms <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            return max(0.0, rng.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms))
+        if self.distribution == "lognormal":
+            return rng.lognormvariate(0.0, self.sigma) * self.mean_ms
+        return self.mean_ms
+
+
+class SimulatedBackend:
+    """
+    Offline stand-in for a model that actually solves the benchmark tasks.
+
+    It parses the dataset out of the prompt (JSON or TOON), computes the true
+    answer for Task A/B/C and replies in the prompt's format. Seeded error
+    injection makes it a realistic load generator for the whole pipeline:
+
+    - drop_rate: each answer row is omitted with this probability
+    - hallucination_rate: a fabricated row is inserted after each row with this probability
+    - drift_rate: each row has one numeric field perturbed with this probability
+    - format_break_rate: the whole reply is broken (truncated, wrapped in chatter,
+      or a delimiter removed) with this probability
+    - error_rate / rate_limit_rate: the call fails with a BackendError (HTTP 503,
+      or 429 with a Retry-After of `retry_after_s`) with this probability
+
+    The RNG for a call is derived from (seed, prompt digest, repeat count of
+    that prompt), so results do not depend on how calls interleave.
+    """
+    def __init__(
+        self,
+        seed: int = 0,
+        drop_rate: float = 0.0,
+        hallucination_rate: float = 0.0,
+        drift_rate: float = 0.0,
+        format_break_rate: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after_s: Optional[float] = None,
+        ttft: Optional[LatencyModel] = None,
+        per_token: Optional[LatencyModel] = None,
+        prefill_ms_per_1k_tokens: float = 0.0
+    ):
+        self.seed = seed
+        self.drop_rate = drop_rate
+        self.hallucination_rate = hallucination_rate
+        self.drift_rate = drift_rate
+        self.format_break_rate = format_break_rate
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_s = retry_after_s
+        self.ttft = ttft or LatencyModel()
+        self.per_token = per_token or LatencyModel()
+        self.prefill_ms_per_1k_tokens = prefill_ms_per_1k_tokens
+
+        self._lock = threading.Lock()
+        self._prompt_counts: Dict[str, int] = {}
+        self._dataset_cache: Dict[str, ColumnarDataset] = {}
+
+    def _call_rng(self, system_prompt: str, user_prompt: str) -> random.Random:
+        digest = hashlib.sha256((system_prompt + "\0" + user_prompt).encode("utf-8")).hexdigest()
+        with self._lock:
+            repeat = self._prompt_counts.get(digest, 0)
+            self._prompt_counts[digest] = repeat + 1
+        return random.Random(f"{self.seed}:{digest}:{repeat}")
+
+    # Answering
+
+    def _load_dataset(self, format_name: str, data: str) -> ColumnarDataset:
+        key = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._dataset_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if format_name.upper() == "TOON":
+            records = decode_from_toon(data, schema=FIELDS)
+        else:
+            records = json.loads(data)
+        dataset = ColumnarDataset.from_records(records, columns=[])
+
+        with self._lock:
+            self._dataset_cache[key] = dataset
+        return dataset
+
+    @staticmethod
+    def _spec(task_description: str):
+        task = find_task_by_description(task_description)
+        if task is None:
+            raise ValueError("Unrecognized task description")
+        return task.SPEC
+
+    def solve(self, task_description: str, dataset: ColumnarDataset) -> List[Dict]:
+        """Computes the true answer rows for the task described in the prompt."""
+        with self._lock:
+            # Columns are loaded into the shared cached dataset on first use
+            return execute(self._spec(task_description), dataset)
+
+    # Error injection
+
+    def _inject_row_errors(self, rows: List[Dict], rng: random.Random) -> List[Dict]:
+        out = []
+        for row in rows:
+            if self.drop_rate and rng.random() < self.drop_rate:
+                continue
+
+            if self.drift_rate and rng.random() < self.drift_rate:
+                row = self._drift(row, rng)
+            out.append(row)
+
+            if self.hallucination_rate and rng.random() < self.hallucination_rate:
+                out.append(self._hallucinate(row, rng))
+        return out
+
+    @staticmethod
+    def _drift(row: Dict, rng: random.Random) -> Dict:
+        row = json.loads(json.dumps(row))
+        candidates = [
+            ("severity", None), ("total_count", None), ("failed_count", None),
+            ("average_severity", None), ("latency_ms", None),
+            ("retry_count", "metadata"), ("latency_ms", "metadata")
+        ]
+        targets = [(k, p) for k, p in candidates if k in (row.get(p, {}) if p else row)]
+        if not targets:
+            return row
+        key, parent = rng.choice(targets)
+        container = row[parent] if parent else row
+        value = container[key]
+        if isinstance(value, float):
+            container[key] = round(value * (1 + rng.choice([-1, 1]) * rng.uniform(0.01, 0.1)), 2)
+        else:
+            container[key] = value + rng.choice([-1, 1])
+        return row
+
+    @staticmethod
+    def _hallucinate(row: Dict, rng: random.Random) -> Dict:
+        fake = json.loads(json.dumps(row))
+        if "id" in fake:
+            fake["id"] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        else:
+            fake["type"] = rng.choice(["cache", "queue", "storage", "billing"])
+        return fake
+
+    def _inject_failure(self, rng: random.Random):
+        if self.rate_limit_rate and rng.random() < self.rate_limit_rate:
+            raise BackendError("Simulated rate limit", status=429, retry_after=self.retry_after_s)
+        if self.error_rate and rng.random() < self.error_rate:
+            raise BackendError("Simulated server error", status=503)
+
+    @staticmethod
+    def _break_format(text: str, rng: random.Random) -> str:
+        kind = rng.choice(FORMAT_BREAKS)
+        if kind == "truncate":
+            return text[:rng.randint(0, max(len(text) - 1, 0))]
+        if kind == "chatter":
+            return "Sure! Here is the requested output.\n\n" + text + "\n\nLet me know if you need anything else."
+        # delimiter: drop one separator so a row loses a column / the JSON breaks
+        positions = [i for i, c in enumerate(text) if c == ","]
+        if not positions:
+            return text + ","
+        i = rng.choice(positions)
+        return text[:i] + text[i + 1:]
+
+    # Backend interface
+
+    def complete(self, model_name: str, system_prompt: str, user_prompt: str, rng: Optional[random.Random] = None) -> str:
+        """Returns the full simulated reply text."""
+        # The simulated model reads the whole prompt, like a server would
+        user_prompt = prompt_text(user_prompt)
+        rng = rng or self._call_rng(system_prompt, user_prompt)
+        self._inject_failure(rng)
+        format_name, task_description, data = parse_prompt(user_prompt)
+        dataset = self._load_dataset(format_name, data)
+
+        rows = self._inject_row_errors(self.solve(task_description, dataset), rng)
+
+        if format_name.upper() == "TOON":
+            spec = self._spec(task_description)
+            name = "events" if spec.shape is None else "results"
+            text = encode_table(name, spec.output_columns(), rows)
+        else:
+            text = json.dumps(rows, indent=2)
+
+        if self.format_break_rate and rng.random() < self.format_break_rate:
+            text = self._break_format(text, rng)
+        return text
+
+    def _sleep_for_reply(self, system_prompt: str, user_prompt: str, output_chars: int, rng: random.Random):
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        delay_ms = self.ttft.sample(rng) + self.prefill_ms_per_1k_tokens * input_tokens / 1000
+        for _ in range(1, -(-output_chars // CHARS_PER_TOKEN)):
+            delay_ms += self.per_token.sample(rng)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+    def sample(self, model_name: str, system_prompt: str, user_prompt: str, n: int) -> List[str]:
+        """
+        n independent replies from one request (each with its own error
+        injection). Prefill is paid once and the samples decode in parallel,
+        so latency follows the longest reply.
+        """
+        user_prompt = prompt_text(user_prompt)
+        rngs = [self._call_rng(system_prompt, user_prompt) for _ in range(n)]
+        texts = [self.complete(model_name, system_prompt, user_prompt, rng=rng) for rng in rngs]
+        self._sleep_for_reply(system_prompt, user_prompt, max(len(t) for t in texts), rngs[0])
+        return texts
+
+    def stream(self, model_name: str, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        user_prompt = prompt_text(user_prompt)
+        rng = self._call_rng(system_prompt, user_prompt)
+        text = self.complete(model_name, system_prompt, user_prompt, rng=rng)
+
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        ttft_ms = self.ttft.sample(rng) + self.prefill_ms_per_1k_tokens * input_tokens / 1000
+        if ttft_ms:
+            time.sleep(ttft_ms / 1000)
+
+        for i in range(0, len(text), CHARS_PER_TOKEN):
+            if i:
+                delay_ms = self.per_token.sample(rng)
+                if delay_ms:
+                    time.sleep(delay_ms / 1000)
+            yield text[i:i + CHARS_PER_TOKEN]
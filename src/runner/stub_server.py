@@ -0,0 +1,238 @@
+import gzip
+import json
+import itertools
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+from src.runner.executor import BackendError, estimate_tokens
+from src.runner.http_backend import CHAT_COMPLETIONS_PATH, HTTPBackend
+from src.runner.simulated import SimulatedBackend, LatencyModel
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.record_connection()
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _read_chunked(self) -> bytes:
+        parts = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                # Skip trailers up to the blank line
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(parts)
+            parts.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = self._read_chunked()
+        else:
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def _send_json(self, status: int, payload: Dict[str, Any], extra_headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (extra_headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    def do_POST(self):
+        stub = self.server.stub
+        if self.path.rstrip("/") != CHAT_COMPLETIONS_PATH:
+            self._read_body()
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        try:
+            request = json.loads(self._read_body())
+            messages = {m["role"]: m["content"] for m in request["messages"]}
+            model = request.get("model", "stub-model")
+            system_prompt = messages.get("system", "")
+            user_prompt = messages["user"]
+            n = int(request.get("n", 1))
+            if n > 1 and request.get("stream"):
+                raise ValueError("n > 1 is only supported without streaming")
+        except Exception as e:
+            self._send_json(400, {"error": {"message": f"Bad request: {e}"}})
+            return
+
+        stub.record_request()
+        stub.inject_latency()
+
+        try:
+            if request.get("stream"):
+                # Pull the first chunk before committing to a 200 so backend errors map to a status
+                chunks = stub.backend.stream(model, system_prompt, user_prompt)
+                head = list(itertools.islice(chunks, 1))
+            elif n > 1:
+                texts = stub.backend.sample(model, system_prompt, user_prompt, n)
+            else:
+                texts = [stub.backend.complete(model, system_prompt, user_prompt)]
+        except BackendError as e:
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after is not None else None
+            self._send_json(e.status or 500, {"error": {"message": str(e)}}, headers)
+            return
+
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for content in itertools.chain(head, chunks):
+                    event = {"choices": [{"index": 0, "delta": {"content": content}}]}
+                    self._write_chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # Client cancelled the stream and dropped the connection
+                self.close_connection = True
+            return
+
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        output_tokens = sum(estimate_tokens(text) for text in texts)
+        self._send_json(200, {
+            "object": "chat.completion",
+            "model": model,
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {
+                "prompt_tokens": input_tokens,
+                "completion_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens
+            }
+        })
+
+
+class StubChatServer:
+    """
+    Local OpenAI-compatible chat completions server answering from a
+    SimulatedBackend, with optional extra per-request latency.
+
+    Runs in-process on a background thread:
+
+        with StubChatServer() as server:
+            backend = HTTPBackend(server.url)
+
+    `stats()` reports TCP connections accepted vs requests served, which
+    shows how well a client reuses keep-alive connections.
+    """
+    def __init__(
+        self,
+        backend: Optional[SimulatedBackend] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: Optional[LatencyModel] = None,
+        seed: int = 0
+    ):
+        self.backend = backend or SimulatedBackend()
+        self.latency = latency or LatencyModel()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"connections": 0, "requests": 0}
+
+        self._httpd = ThreadingHTTPServer((host, port), _ChatHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_connection(self):
+        with self._lock:
+            self._counters["connections"] += 1
+
+    def record_request(self):
+        with self._lock:
+            self._counters["requests"] += 1
+
+    def inject_latency(self):
+        with self._lock:
+            delay_ms = self.latency.sample(self._rng)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def start(self) -> "StubChatServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-chat-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves on the calling thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class StubBackend(HTTPBackend):
+    """
+    HTTPBackend bound to a started StubChatServer it owns: close() also
+    stops the server, so its socket and thread do not outlive the run.
+    """
+    def __init__(self, server: StubChatServer, **http_options):
+        super().__init__(server.url, **http_options)
+        self.server = server
+
+    def close(self):
+        super().close()
+        self.server.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the simulated model over an OpenAI-compatible HTTP API")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Extra latency per request")
+    parser.add_argument("--latency-dist", type=str, default="fixed", choices=["fixed", "uniform", "lognormal"])
+    args = parser.parse_args()
+
+    server = StubChatServer(host=args.host, port=args.port, latency=LatencyModel(args.latency_ms, args.latency_dist))
+    print(f"Stub chat server listening on {server.url}{CHAT_COMPLETIONS_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,536 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import datetime
+import threading
+from typing import Dict, Any, Optional
+
+from src.runner.executor import ModelExecutor
+from src.runner.backends import create_backend
+from src.runner.resilience import create_resilient_executor
+from src.runner.logger import RunLogger, DATASET_FILENAME, build_log_entry, load_run_manifest
+from src.runner.orchestrator import (
+    DATASET_SEED, FORMATS, TASKS, prepare_run_inputs, encode_run_inputs, execute_task
+)
+from src.evaluation.correctness import GroundTruth
+from src.evaluation.truth_cache import load_ground_truth, save_ground_truth
+
+DEFAULT_LEASE_S = 120.0
+DEFAULT_MAX_JOB_ATTEMPTS = 3
+JOB_STATES = ("pending", "leased", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    base_dir TEXT NOT NULL,
+    config TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    iteration INTEGER NOT NULL,
+    task_name TEXT NOT NULL,
+    format TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    committed_at REAL,
+    UNIQUE (run_id, iteration, task_name, format)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    job_id INTEGER PRIMARY KEY REFERENCES jobs(job_id),
+    run_id TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    exported INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_export ON results (exported, run_id);
+"""
+
+
+def connect(db_path: str, journal_mode: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Opens the queue database (creating the schema if needed).
+
+    Every process/thread uses its own connection; state changes run in
+    BEGIN IMMEDIATE transactions. The journal mode is a property of the
+    database file, chosen by submit_run (`journal_mode` sets it, None keeps
+    it): WAL lets workers read while another commits, but needs shared
+    memory and so only works for processes on one host. A queue on a network
+    filesystem, shared by several hosts, uses the rollback journal (DELETE)
+    and relies on the filesystem's POSIX locks.
+    """
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if journal_mode is not None:
+        mode = conn.execute(f"PRAGMA journal_mode={journal_mode}").fetchone()[0]
+        if mode.lower() != journal_mode.lower():
+            conn.close()
+            raise ValueError(f"Could not switch {db_path} to journal_mode={journal_mode} (still {mode}); "
+                             "stop the workers using it first")
+    if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK: takes the write lock up front."""
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+# Coordinator side
+
+def submit_run(
+    db_path: str,
+    model_name: str = "mock-model",
+    iterations: int = 1,
+    dataset_size: int = 10,
+    backend: str = "mock",
+    backend_options: Optional[Dict[str, Any]] = None,
+    resilience_options: Optional[Dict[str, Any]] = None,
+    early_abort: bool = False,
+    log_layout: str = "segments",
+    base_dir: str = "runs",
+    shared_storage: bool = False
+) -> str:
+    """
+    Creates a run (dataset + manifest in <base_dir>/<run_id>) and enqueues one
+    job per (iteration, task, format). Returns the run id.
+
+    The dataset is also stored in the queue, so workers on other hosts do not
+    need access to the run directory. Set `shared_storage` when the queue
+    file is on a network filesystem used by workers on several hosts: the
+    database then uses a rollback journal instead of WAL (see connect).
+    """
+    run_id = f"run_{uuid.uuid4().hex[:8]}"
+    records = prepare_run_inputs(dataset_size)["records"]
+    config = {
+        "model": model_name,
+        "dataset_size": dataset_size,
+        "iterations": iterations,
+        "backend": backend,
+        "backend_options": backend_options or {},
+        "resilience_options": resilience_options or {},
+        "early_abort": early_abort,
+        "log_layout": log_layout
+    }
+
+    logger = RunLogger(run_id=run_id, base_dir=base_dir, layout=log_layout)
+    dataset_path = logger.write_dataset(records)
+    if early_abort:
+        # Workers sharing the run directory load the streaming expectations from here
+        save_ground_truth(GroundTruth(records), dataset_path)
+    logger.write_manifest({
+        "run_id": run_id,
+        "status": "queued",
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "seed": DATASET_SEED,
+        "queue": os.path.abspath(db_path),
+        **config,
+        "tasks": [t.TASK_NAME for t in TASKS],
+        "formats": FORMATS
+    })
+
+    conn = connect(db_path, journal_mode="DELETE" if shared_storage else "WAL")
+    try:
+        with _Transaction(conn):
+            conn.execute(
+                "INSERT INTO runs (run_id, base_dir, config, dataset, created_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, base_dir, json.dumps(config), json.dumps(records, separators=(",", ":")),
+                 datetime.datetime.now(datetime.timezone.utc).isoformat())
+            )
+            conn.executemany(
+                "INSERT INTO jobs (run_id, iteration, task_name, format) VALUES (?, ?, ?, ?)",
+                [(run_id, i, task.TASK_NAME, fmt) for i in range(iterations) for task in TASKS for fmt in FORMATS]
+            )
+    finally:
+        conn.close()
+
+    print(f"Submitted {run_id}: {iterations * len(TASKS) * len(FORMATS)} jobs")
+    return run_id
+
+
+def queue_status(db_path: str) -> Dict[str, Any]:
+    """Job counts per run and state, plus expired leases and active workers."""
+    conn = connect(db_path)
+    try:
+        now = time.time()
+        runs: Dict[str, Dict[str, int]] = {}
+        for row in conn.execute("SELECT run_id, state, COUNT(*) AS n FROM jobs GROUP BY run_id, state"):
+            counts = runs.setdefault(row["run_id"], {state: 0 for state in JOB_STATES})
+            counts[row["state"]] = row["n"]
+        for row in conn.execute("SELECT run_id, COUNT(*) AS n FROM results WHERE exported = 0 GROUP BY run_id"):
+            runs.setdefault(row["run_id"], {state: 0 for state in JOB_STATES})["unexported"] = row["n"]
+
+        expired = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'leased' AND lease_expires < ?", (now,)
+        ).fetchone()[0]
+        workers = [r[0] for r in conn.execute(
+            "SELECT DISTINCT lease_owner FROM jobs WHERE state = 'leased' AND lease_expires >= ?", (now,)
+        )]
+        return {"runs": runs, "expired_leases": expired, "active_workers": workers}
+    finally:
+        conn.close()
+
+
+def requeue(db_path: str, include_failed: bool = False) -> int:
+    """
+    Returns expired leases (and, optionally, failed jobs) to pending.
+    Returns the number of jobs requeued.
+    """
+    conn = connect(db_path)
+    try:
+        with _Transaction(conn):
+            cur = conn.execute(
+                "UPDATE jobs SET state = 'pending', lease_owner = NULL, lease_token = NULL, lease_expires = NULL "
+                "WHERE state = 'leased' AND lease_expires < ?",
+                (time.time(),)
+            )
+            count = cur.rowcount
+            if include_failed:
+                cur = conn.execute(
+                    "UPDATE jobs SET state = 'pending', attempts = 0, last_error = NULL WHERE state = 'failed'"
+                )
+                count += cur.rowcount
+        return count
+    finally:
+        conn.close()
+
+
+def export_results(db_path: str) -> Dict[str, int]:
+    """
+    Appends committed results that have not been exported yet to their run's
+    logs, then marks them exported. Entries keep the entry_id assigned at
+    commit, so re-exporting after a crash between the two steps only appends
+    copies, which the aggregators count once per entry_id (iter_run_logs).
+
+    Runs whose jobs are all settled get status "complete" in their manifest.
+    Returns {run_id: entries exported}.
+    """
+    conn = connect(db_path)
+    exported: Dict[str, int] = {}
+    try:
+        run_rows = {r["run_id"]: r for r in conn.execute("SELECT run_id, base_dir, config FROM runs")}
+        for run_id, run in run_rows.items():
+            rows = conn.execute(
+                "SELECT job_id, entry FROM results WHERE run_id = ? AND exported = 0 ORDER BY job_id", (run_id,)
+            ).fetchall()
+
+            if rows:
+                config = json.loads(run["config"])
+                with RunLogger(run_id=run_id, base_dir=run["base_dir"], layout=config["log_layout"]) as logger:
+                    logger.write_entries([json.loads(r["entry"]) for r in rows])
+                with _Transaction(conn):
+                    conn.executemany("UPDATE results SET exported = 1 WHERE job_id = ?", [(r["job_id"],) for r in rows])
+                exported[run_id] = len(rows)
+
+            open_jobs = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE run_id = ? AND state IN ('pending', 'leased')", (run_id,)
+            ).fetchone()[0]
+            run_dir = os.path.join(run["base_dir"], run_id)
+            manifest = load_run_manifest(run_dir)
+            if open_jobs == 0 and manifest and manifest.get("status") != "complete":
+                failed = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE run_id = ? AND state = 'failed'", (run_id,)
+                ).fetchone()[0]
+                RunLogger(run_id=run_id, base_dir=run["base_dir"], layout="segments").update_manifest(
+                    status="complete",
+                    failed_jobs=failed,
+                    completed_at=datetime.datetime.now(datetime.timezone.utc).isoformat()
+                )
+        return exported
+    finally:
+        conn.close()
+
+
+# Worker side
+
+class _Heartbeat(threading.Thread):
+    """Extends a job's lease until stopped; notices when the lease was lost."""
+    def __init__(self, db_path: str, job_id: int, token: str, lease_s: float, interval_s: float):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.db_path = db_path
+        self.job_id = job_id
+        self.token = token
+        self.lease_s = lease_s
+        self.interval_s = interval_s
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = connect(self.db_path)
+        try:
+            while not self._stop_event.wait(self.interval_s):
+                cur = conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND lease_token = ? AND state = 'leased'",
+                    (time.time() + self.lease_s, self.job_id, self.token)
+                )
+                if cur.rowcount == 0:
+                    self.lost = True
+                    return
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class QueueWorker:
+    """
+    Claims jobs from the queue, executes them and commits each result
+    exactly once.
+
+    A claim takes a lease (owner, random token, expiry) on one pending job or
+    on a job whose lease expired. While the call runs a heartbeat extends the
+    lease. The result is committed in the same transaction that moves the job
+    to done, and only if the lease token still matches, so a worker that
+    lost its lease (e.g. stalled past expiry while another worker re-ran the
+    job) has its result discarded instead of duplicated.
+
+    Jobs that raise are retried by later claims until `max_job_attempts`,
+    then marked failed.
+    """
+    def __init__(
+        self,
+        db_path: str,
+        worker_id: Optional[str] = None,
+        lease_s: float = DEFAULT_LEASE_S,
+        heartbeat_s: Optional[float] = None,
+        max_job_attempts: int = DEFAULT_MAX_JOB_ATTEMPTS
+    ):
+        self.db_path = db_path
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_s = lease_s
+        self.heartbeat_s = heartbeat_s or lease_s / 3
+        self.max_job_attempts = max_job_attempts
+        self.stats = {"claimed": 0, "committed": 0, "discarded": 0, "errors": 0}
+
+        self._conn = connect(db_path)
+        self._runs: Dict[str, Dict[str, Any]] = {}
+
+    def claim(self) -> Optional[sqlite3.Row]:
+        """Leases the next runnable job, or returns None if there is none."""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with _Transaction(self._conn) as conn:
+            # Jobs whose workers keep dying (lease expired on every attempt) are given up on
+            conn.execute(
+                "UPDATE jobs SET state = 'failed', last_error = 'lease expired' "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_job_attempts)
+            )
+            row = conn.execute(
+                "SELECT job_id FROM jobs "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY job_id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', lease_owner = ?, lease_token = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE job_id = ?",
+                (self.worker_id, token, now + self.lease_s, row["job_id"])
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+        self.stats["claimed"] += 1
+        return job
+
+    def _run_context(self, run_id: str) -> Dict[str, Any]:
+        """Executor, encoded inputs and prompts for a run, built once per worker."""
+        if run_id not in self._runs:
+            row = self._conn.execute(
+                "SELECT base_dir, config, dataset FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            config = json.loads(row["config"])
+            inputs = encode_run_inputs(json.loads(row["dataset"]))
+            abort_context = None
+            if config["early_abort"]:
+                # Cached next to the run's dataset when this host can see it
+                dataset_path = os.path.join(row["base_dir"], run_id, DATASET_FILENAME)
+                abort_context = load_ground_truth(dataset_path, records=inputs["records"])
+                if abort_context is None:
+                    abort_context = GroundTruth(inputs["records"])
+            backend = create_backend(config["backend"], config["backend_options"])
+            self._runs[run_id] = {
+                "config": config,
+                "inputs": inputs,
+                "backend": backend,
+                "executor": create_resilient_executor(ModelExecutor(backend=backend), config["resilience_options"]),
+                "abort_context": abort_context
+            }
+        return self._runs[run_id]
+
+    def execute(self, job: sqlite3.Row) -> Dict[str, Any]:
+        """Runs the job's call and returns the log entry to commit."""
+        ctx = self._run_context(job["run_id"])
+        config = ctx["config"]
+        task = next(t for t in TASKS if t.TASK_NAME == job["task_name"])
+        fmt = job["format"]
+
+        prompt_text = task.get_prompt(fmt, ctx["inputs"]["data_map"][fmt])
+        result = execute_task(
+            ctx["executor"], config["model"], task.TASK_NAME, fmt, prompt_text,
+            abort_context=ctx["abort_context"],
+            row_tokens_hint=ctx["inputs"]["row_tokens_hint"][fmt]
+        )
+        entry = build_log_entry(job["run_id"], task.TASK_NAME, fmt, config["model"], result)
+        entry["job_id"] = job["job_id"]
+        entry["worker_id"] = self.worker_id
+        return entry
+
+    def commit(self, job: sqlite3.Row, entry: Dict[str, Any]) -> bool:
+        """Stores the result iff this worker still holds the lease. Returns True if committed."""
+        with _Transaction(self._conn) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET state = 'done', committed_at = ?, lease_expires = NULL "
+                "WHERE job_id = ? AND lease_token = ? AND state = 'leased'",
+                (time.time(), job["job_id"], job["lease_token"])
+            )
+            if cur.rowcount == 0:
+                return False
+            conn.execute(
+                "INSERT INTO results (job_id, run_id, entry) VALUES (?, ?, ?)",
+                (job["job_id"], job["run_id"], json.dumps(entry, separators=(",", ":")))
+            )
+        return True
+
+    def release(self, job: sqlite3.Row, error: Exception):
+        """Gives up a job after an unexpected error (failed once out of attempts)."""
+        state = "failed" if job["attempts"] >= self.max_job_attempts else "pending"
+        with _Transaction(self._conn) as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, lease_owner = NULL, lease_token = NULL, lease_expires = NULL, "
+                "last_error = ? WHERE job_id = ? AND lease_token = ?",
+                (state, f"{type(error).__name__}: {error}"[:500], job["job_id"], job["lease_token"])
+            )
+
+    def run_one(self) -> bool:
+        """Claims and processes one job. Returns False when the queue has nothing runnable."""
+        job = self.claim()
+        if job is None:
+            return False
+
+        heartbeat = _Heartbeat(self.db_path, job["job_id"], job["lease_token"], self.lease_s, self.heartbeat_s)
+        heartbeat.start()
+        try:
+            entry = self.execute(job)
+        except Exception as e:
+            heartbeat.stop()
+            self.stats["errors"] += 1
+            print(f"    Job {job['job_id']} failed: {e}")
+            self.release(job, e)
+            return True
+        heartbeat.stop()
+
+        if not heartbeat.lost and self.commit(job, entry):
+            self.stats["committed"] += 1
+        else:
+            # Another worker owns the job now; its result will be the one kept
+            self.stats["discarded"] += 1
+        return True
+
+    def run(self, max_jobs: Optional[int] = None, poll_s: float = 1.0, exit_when_idle: bool = True) -> Dict[str, int]:
+        """
+        Processes jobs until `max_jobs` were handled or, with
+        `exit_when_idle`, nothing is pending or leased by anyone.
+        """
+        handled = 0
+        try:
+            while max_jobs is None or handled < max_jobs:
+                if self.run_one():
+                    handled += 1
+                    print(f"[{self.worker_id}] {self.stats}")
+                    continue
+                if exit_when_idle and not self._conn.execute(
+                    "SELECT 1 FROM jobs WHERE state IN ('pending', 'leased') LIMIT 1"
+                ).fetchone():
+                    break
+                # Remaining jobs are leased by others; wait in case their leases expire
+                time.sleep(poll_s)
+        finally:
+            self._conn.close()
+            for ctx in self._runs.values():
+                close = getattr(ctx["backend"], "close", None)
+                if close is not None:
+                    close()
+        return self.stats
+
+
+if __name__ == "__main__":
+    import argparse
+    from src.runner.backends import add_backend_arguments, backend_options_from_args
+    from src.runner.resilience import add_resilience_arguments, resilience_options_from_args
+
+    parser = argparse.ArgumentParser(description="SQLite work queue for running experiments on several workers")
+    parser.add_argument("--db", type=str, default="queue.sqlite", help="Queue database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="Create a run and enqueue its jobs")
+    submit_parser.add_argument("--model", type=str, default="mock-model")
+    submit_parser.add_argument("--iterations", type=int, default=1)
+    submit_parser.add_argument("--size", type=int, default=5)
+    submit_parser.add_argument("--log-layout", type=str, default="segments", choices=["segments", "files"])
+    submit_parser.add_argument("--early-abort", action="store_true")
+    submit_parser.add_argument("--shared-storage", action="store_true",
+                               help="The queue file is on a network filesystem shared by several hosts")
+    add_backend_arguments(submit_parser)
+    add_resilience_arguments(submit_parser)
+
+    worker_parser = commands.add_parser("worker", help="Claim and execute jobs")
+    worker_parser.add_argument("--worker-id", type=str, default=None)
+    worker_parser.add_argument("--lease-s", type=float, default=DEFAULT_LEASE_S)
+    worker_parser.add_argument("--max-jobs", type=int, default=None)
+    worker_parser.add_argument("--poll-s", type=float, default=1.0)
+    worker_parser.add_argument("--wait", action="store_true", help="Keep polling when the queue is empty")
+
+    commands.add_parser("status", help="Show progress per run")
+    requeue_parser = commands.add_parser("requeue", help="Return expired leases to pending")
+    requeue_parser.add_argument("--failed", action="store_true", help="Also retry failed jobs")
+    commands.add_parser("export", help="Append committed results to the run logs")
+
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        submit_run(
+            args.db,
+            model_name=args.model,
+            iterations=args.iterations,
+            dataset_size=args.size,
+            backend=args.backend,
+            backend_options=backend_options_from_args(args),
+            resilience_options=resilience_options_from_args(args),
+            early_abort=args.early_abort,
+            log_layout=args.log_layout,
+            shared_storage=args.shared_storage
+        )
+    elif args.command == "worker":
+        stats = QueueWorker(args.db, worker_id=args.worker_id, lease_s=args.lease_s).run(
+            max_jobs=args.max_jobs, poll_s=args.poll_s, exit_when_idle=not args.wait
+        )
+        print(f"Worker done: {stats}")
+    elif args.command == "status":
+        print(json.dumps(queue_status(args.db), indent=2))
+    elif args.command == "requeue":
+        print(f"Requeued {requeue(args.db, include_failed=args.failed)} jobs")
+    elif args.command == "export":
+        for run_id, count in export_results(args.db).items():
+            print(f"Exported {count} entries to {run_id}")
@@ -0,0 +1,180 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.encoding.toon_codec import FIELDS, EVENT_TYPES, PREDICATE_OPS, normalize_where
+
+# How predicate operators read in a task description
+OP_WORDS = {"==": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "in": "in"}
+
+AGGREGATE_FUNCS = ["count", "sum", "mean", "min", "max"]
+
+# Output schema of tasks that return a subset of the input records
+SAME_AS_INPUT = "Same as input schema (Subset of records)"
+
+
+def input_type(column: str) -> str:
+    """JSON-schema type of an input column ("metadata.region" style names)."""
+    return EVENT_TYPES.get(column, "string")
+
+
+class Filter:
+    """
+    Keeps the rows matching every predicate: (column, op, value) triples
+    with op in PREDICATE_OPS, or a {column: value} dict of equalities.
+    """
+    def __init__(self, where: Union[List[Tuple], Dict[str, Any]]):
+        self.predicates = normalize_where(where)
+        for column, op, _ in self.predicates:
+            if op not in PREDICATE_OPS:
+                raise ValueError(f"Unknown predicate operator '{op}' for column '{column}'")
+
+    def input_columns(self) -> List[str]:
+        return [column for column, _, _ in self.predicates]
+
+    def describe(self, last: bool) -> str:
+        lines = ["Return records where:" if last else "Using only records where:"]
+        for column, op, value in self.predicates:
+            shown = ", ".join(str(v) for v in value) if op == "in" else value
+            lines.append(f"- {column} {OP_WORDS[op]} {shown}")
+        return "\n".join(lines)
+
+
+class Aggregate:
+    """
+    One output column of a GroupAggregate: `func` (see AGGREGATE_FUNCS) over
+    `column`, optionally counting/summing only rows matching `where`.
+    `label` is how the description names it (default: name with spaces).
+    """
+    def __init__(self, name: str, func: str, column: Optional[str] = None,
+                 where: Optional[Union[List[Tuple], Dict[str, Any]]] = None, label: Optional[str] = None):
+        if func not in AGGREGATE_FUNCS:
+            raise ValueError(f"Unknown aggregate '{func}'. Expected one of {AGGREGATE_FUNCS}")
+        if func != "count" and column is None:
+            raise ValueError(f"Aggregate '{name}' ({func}) needs a column")
+        self.name = name
+        self.func = func
+        self.column = column
+        self.where = Filter(where) if where else None
+        self.label = label or name.replace("_", " ")
+
+    def input_columns(self) -> List[str]:
+        columns = [self.column] if self.column else []
+        return columns + (self.where.input_columns() if self.where else [])
+
+    def output_type(self) -> str:
+        if self.func == "count":
+            return "integer"
+        if self.func == "mean":
+            return "number"
+        return input_type(self.column)
+
+
+class GroupAggregate:
+    """
+    One output row per distinct value of `key` (sorted), with the aggregates
+    as columns. The key's output column is `name` (default: the last part
+    of a dotted key, "metadata.region" -> "region").
+    """
+    def __init__(self, key: str, aggregates: List[Aggregate], name: Optional[str] = None):
+        self.key = key
+        self.name = name or key.split(".")[-1]
+        self.aggregates = aggregates
+
+    def input_columns(self) -> List[str]:
+        return [self.key] + [c for agg in self.aggregates for c in agg.input_columns()]
+
+    def output_types(self) -> Dict[str, str]:
+        return {self.name: input_type(self.key), **{agg.name: agg.output_type() for agg in self.aggregates}}
+
+    def describe(self, last: bool) -> str:
+        return "\n".join([f"For each {self.name}:"] + [f"- {agg.label}" for agg in self.aggregates])
+
+
+class Project:
+    """
+    Reshapes each row to the given columns: names, or (name, source column)
+    pairs to rename. Nested fields are lifted to the top level under the
+    last part of their name ("metadata.region" -> "region").
+    """
+    def __init__(self, columns: List[Union[str, Tuple[str, str]]]):
+        self.sources = [(c.split(".")[-1], c) if isinstance(c, str) else tuple(c) for c in columns]
+
+    def input_columns(self) -> List[str]:
+        return [source for _, source in self.sources]
+
+    def output_types(self) -> Dict[str, str]:
+        return {name: input_type(source) for name, source in self.sources}
+
+    def describe(self, last: bool) -> str:
+        nested = any(name != source for name, source in self.sources)
+        lines = ["Flatten to:" if nested else "Keep only:"]
+        return "\n".join(lines + [f"- {name}" for name, _ in self.sources])
+
+
+class TaskSpec:
+    """
+    Declarative definition of a task: Filter steps, optionally followed by
+    one GroupAggregate or Project. From it come the prompt's task
+    description, the expected output schema, the expected rows (see
+    src.tasks.engine.execute) and the comparison rules check_task_spec
+    uses: rows are matched on `key` and "number" columns compare within
+    `tolerance`.
+    """
+    def __init__(self, name: str, steps: List[Any], key: Optional[str] = None, tolerance: float = 1e-6):
+        if not steps:
+            raise ValueError(f"Task '{name}' has no steps")
+        for step in steps[:-1]:
+            if not isinstance(step, Filter):
+                raise ValueError(f"Task '{name}': only the last step may group or project")
+        self.name = name
+        self.steps = steps
+        self.tolerance = tolerance
+
+        last = steps[-1]
+        if isinstance(last, GroupAggregate):
+            self.key = key or last.name
+        else:
+            self.key = key or "id"
+
+    @property
+    def filters(self) -> List[Filter]:
+        return [step for step in self.steps if isinstance(step, Filter)]
+
+    @property
+    def shape(self) -> Optional[Union[GroupAggregate, Project]]:
+        """The grouping / projection step, or None when the output rows are input records."""
+        last = self.steps[-1]
+        return None if isinstance(last, Filter) else last
+
+    def input_columns(self) -> List[str]:
+        """Input columns the steps read (filter-only tasks also return the records themselves)."""
+        columns = []
+        for step in self.steps:
+            for column in step.input_columns():
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    def output_types(self) -> Dict[str, str]:
+        """Output column -> JSON-schema type, in output order."""
+        if self.shape is None:
+            return {column: input_type(column) for column in FIELDS}
+        return self.shape.output_types()
+
+    def output_columns(self) -> List[str]:
+        return list(self.output_types())
+
+    def output_schema(self) -> Union[str, Dict[str, Any]]:
+        """The task's expected_output_schema."""
+        if self.shape is None:
+            return SAME_AS_INPUT
+        return {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {column: {"type": t} for column, t in self.output_types().items()}
+            }
+        }
+
+    def describe(self) -> str:
+        """The TASK_DESCRIPTION shown in the prompt."""
+        return "\n\n".join(step.describe(last=(i == len(self.steps) - 1)) for i, step in enumerate(self.steps))
@@ -0,0 +1,179 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.encoding.toon_codec import FIELDS, PREDICATE_OPS, decode_from_toon
+from src.tasks.dsl import TaskSpec, Filter, GroupAggregate, Project, input_type
+
+
+class ColumnarDataset:
+    """
+    Input records as NumPy columns ("metadata.region" style names):
+    integers and numbers as int64 / float64, strings and arrays as object
+    arrays. `records` keeps the row dicts when the dataset was built from
+    them, so filter-only tasks return the original records.
+    """
+    def __init__(self, columns: Dict[str, np.ndarray], size: int, records: Optional[List[Dict]] = None):
+        self.columns = columns
+        self.size = size
+        self.records = records
+        self._codes: Dict[str, Tuple[np.ndarray, List[Any]]] = {}
+
+    @classmethod
+    def from_records(cls, records: List[Dict], columns: Optional[List[str]] = None) -> "ColumnarDataset":
+        """Columns of `records` (all FIELDS by default); more can be added later with load()."""
+        dataset = cls({}, len(records), records)
+        dataset.load(FIELDS if columns is None else columns)
+        return dataset
+
+    def load(self, columns: List[str]):
+        """Extracts the given columns from `records` unless already loaded."""
+        for column in columns:
+            if column in self.columns:
+                continue
+            if self.records is None:
+                raise KeyError(f"Column '{column}' was not loaded and there are no records to load it from")
+            if "." in column:
+                parent, child = column.split(".", 1)
+                values = [(r.get(parent) or {}).get(child) for r in self.records]
+            else:
+                values = [r.get(column) for r in self.records]
+            self.columns[column] = to_column(values, input_type(column))
+
+    @classmethod
+    def from_toon(cls, text: str, columns: Optional[List[str]] = None) -> "ColumnarDataset":
+        """Decodes only `columns` of a TOON event table (see decode_from_toon)."""
+        rows = decode_from_toon(text, columns=columns, schema=FIELDS)
+        dataset = cls.from_records(rows, columns)
+        if columns is not None:
+            # Projected rows are not records
+            dataset.records = None
+        return dataset
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        if column not in self.columns:
+            raise KeyError(f"Column '{column}' was not loaded. Loaded: {list(self.columns)}")
+        return self.columns[column]
+
+    def codes(self, column: str) -> Tuple[np.ndarray, List[Any]]:
+        """
+        Dictionary encoding of a column for group-bys: (codes, distinct
+        values) with values[codes[i]] == column[i]. Built once per column.
+        """
+        if column not in self._codes:
+            index: Dict[Any, int] = {}
+            codes = [index.setdefault(v, len(index)) for v in self[column].tolist()]
+            self._codes[column] = (np.array(codes, dtype=np.int64), list(index))
+        return self._codes[column]
+
+
+def to_column(values: List[Any], type_name: str) -> np.ndarray:
+    if type_name == "integer":
+        return np.array(values, dtype=np.int64)
+    if type_name == "number":
+        return np.array(values, dtype=np.float64)
+    # Filling an empty object array keeps list values (tags) as elements
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def predicate_mask(data: ColumnarDataset, step: Filter) -> np.ndarray:
+    mask = np.ones(len(data), dtype=bool)
+    for column, op, value in step.predicates:
+        values = data[column]
+        if op == "in":
+            matches = np.zeros(len(data), dtype=bool)
+            for option in value:
+                matches |= values == option
+            mask &= matches
+        else:
+            mask &= PREDICATE_OPS[op](values, value).astype(bool)
+    return mask
+
+
+def group_rows(data: ColumnarDataset, step: GroupAggregate, mask: np.ndarray) -> List[Dict]:
+    codes, categories = data.codes(step.key)
+    groups = len(categories)
+
+    counts = np.bincount(codes[mask], minlength=groups)
+    columns = {}
+    for agg in step.aggregates:
+        rows = mask & predicate_mask(data, agg.where) if agg.where else mask
+        if agg.func == "count":
+            columns[agg.name] = np.bincount(codes[rows], minlength=groups)
+            continue
+
+        values = data[agg.column][rows]
+        group_codes = codes[rows]
+        if agg.func in ("sum", "mean"):
+            sums = np.bincount(group_codes, weights=values, minlength=groups)
+            if agg.func == "mean":
+                n = np.bincount(group_codes, minlength=groups)
+                columns[agg.name] = np.divide(sums, n, out=np.zeros(groups), where=n > 0)
+            elif np.issubdtype(values.dtype, np.integer):
+                # Integer sums are exact in float64 below 2**53
+                columns[agg.name] = sums.astype(np.int64)
+            else:
+                columns[agg.name] = sums
+        else:
+            reduce = np.minimum if agg.func == "min" else np.maximum
+            extremes = np.full(groups, np.inf if agg.func == "min" else -np.inf)
+            reduce.at(extremes, group_codes, values)
+            if np.issubdtype(values.dtype, np.integer):
+                # Groups with no matching rows are left at 0
+                extremes = np.where(np.isfinite(extremes), extremes, 0).astype(np.int64)
+            columns[agg.name] = extremes
+
+    present = sorted((g for g in range(groups) if counts[g]), key=lambda g: categories[g])
+    return [
+        {step.name: categories[g], **{name: column[g].item() for name, column in columns.items()}}
+        for g in present
+    ]
+
+
+def nest(flat: Dict[str, Any]) -> Dict[str, Any]:
+    """A row with dotted columns folded into nested dicts (after the flat ones, as TOON decodes them)."""
+    row, nested = {}, {}
+    for column, value in flat.items():
+        if "." in column:
+            parent, child = column.split(".", 1)
+            nested.setdefault(parent, {})[child] = value
+        else:
+            row[column] = value
+    row.update(nested)
+    return row
+
+
+def execute(spec: TaskSpec, data: ColumnarDataset) -> List[Dict]:
+    """
+    The expected output rows of `spec` on `data`: filters become boolean
+    masks, GroupAggregate bincounts over the key's codes, Project gathers
+    the selected rows column by column. Columns the spec reads are loaded
+    from `data.records` first if needed.
+    """
+    if data.records is not None:
+        data.load(spec.input_columns())
+
+    mask = np.ones(len(data), dtype=bool)
+    for step in spec.filters:
+        mask &= predicate_mask(data, step)
+
+    shape = spec.shape
+    if isinstance(shape, GroupAggregate):
+        return group_rows(data, shape, mask)
+
+    indices = np.flatnonzero(mask)
+    if isinstance(shape, Project):
+        names = [name for name, _ in shape.sources]
+        columns = [data[source][indices].tolist() for _, source in shape.sources]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    if data.records is not None:
+        records = data.records
+        return [records[i] for i in indices.tolist()]
+    columns = [data[column][indices].tolist() for column in FIELDS]
+    return [nest(dict(zip(FIELDS, values))) for values in zip(*columns)]